@@ -0,0 +1,79 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Compares tk_fusion.bulk_query.query_tools() against the per tool loop it
+replaces, on simulated comps of 100, 1000 and 5000 Loaders.
+
+Every call made on the simulated objects sleeps for --latency milliseconds,
+to emulate the IPC round trip to Fusion. Usage:
+
+    python benchmarks/bench_bulk_query.py [--latency 0.05]
+"""
+
+import time
+import argparse
+
+import fusion_sim
+from tk_fusion import bulk_query
+
+
+def run(sizes, latency):
+    kwargs = {
+        "tool_types": ["Loader"],
+        "attrs": ["TOOLST_Clip_Name"],
+        "data_keys": ["sg_metadata"],
+        "positions": True,
+    }
+    results = []
+    for size in sizes:
+        row = {"tools": size}
+        for label, func in (
+            ("per_tool", bulk_query.query_tools_per_tool),
+            ("bulk", bulk_query.query_tools),
+        ):
+            fusion = fusion_sim.Fusion(latency)
+            comp = fusion_sim.build_comp(fusion, loaders=size, savers=0)
+            start = time.perf_counter()
+            func(comp, **kwargs)
+            row[label] = {
+                "seconds": round(time.perf_counter() - start, 4),
+                "calls": fusion.total_calls,
+            }
+        results.append(row)
+        print(
+            "%6d tools | per tool: %8.3fs %6d calls | bulk: %8.3fs %2d calls"
+            % (
+                size,
+                row["per_tool"]["seconds"],
+                row["per_tool"]["calls"],
+                row["bulk"]["seconds"],
+                row["bulk"]["calls"],
+            )
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100, 1000, 5000],
+        help="Number of Loaders in the simulated comps.",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.05,
+        help="Milliseconds spent on every call made to the simulated objects.",
+    )
+    args = parser.parse_args()
+    run(args.sizes, args.latency / 1000.0)
+
+
+if __name__ == "__main__":
+    main()
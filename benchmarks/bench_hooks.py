@@ -0,0 +1,520 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Times the hooks hot paths on simulated comps of several sizes.
+
+The benchmarked entry points are:
+
+    breakdown.scan_scene          tk-multi-breakdown scan_scene()
+    breakdown.update              tk-multi-breakdown update() of every loader
+    loader.execute_actions        tk-multi-loader2 execute_multiple_actions()
+    engine.update_nodes_version   the saver update run on every save
+    publish.collect_session       tk-multi-publish2 collect_current_fusion_session()
+    workfiles.save                tk-multi-workfiles2 execute("save")
+
+Every benchmark runs on a fresh fusion_sim comp holding --sizes Loaders
+(and a tenth as many Savers), whose image sequences of --frames frames are
+created in a temp folder, and is repeated --repeat times. The time and the
+amount of Fusion calls are written as json to --output. When a --baseline
+file is given, the results are compared against it and the script exits
+with 1 if any benchmark is slower than --threshold or makes more calls.
+
+The hooks are loaded with the tk-core hook loader and run against a bench
+engine that borrows the Fusion helpers from FusionEngine, so tk-core and the
+hooks third party modules (fileseq, pyseq) must be importable. Shotgun
+lookups (publish paths, find_publish) are answered from the synthetic data.
+Usage:
+
+    PYTHONPATH=/path/to/tk-core/python python benchmarks/bench_hooks.py \\
+        --sizes 100 1000 --frames 10 50 --output bench.json
+    PYTHONPATH=... python benchmarks/bench_hooks.py --baseline bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import types
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import statistics
+import importlib.util
+
+import fusion_sim
+from fusion_sim import ROOT
+
+HOOKS = os.path.join(ROOT, "hooks")
+
+# name, relative path of the hook file
+HOOK_FILES = {
+    "breakdown": "tk-multi-breakdown/tk-fusion_scene_operations.py",
+    "loader": "tk-multi-loader2/tk-fusion_actions.py",
+    "collector": "tk-multi-publish2/basic/collector.py",
+    "workfiles": "tk-multi-workfiles2/scene_operation_tk-fusion.py",
+}
+
+# FusionEngine members the hooks rely on, borrowed by BenchEngine so the
+# benchmarks time the engine code itself
+ENGINE_MEMBERS = [
+    "fusion_connection",
+    "rpc_stats",
+    "comp_lock",
+    "fusion",
+    "get_current_comp",
+    "operation",
+    "attr_cache",
+    "tool_index",
+    "get_comp_attr",
+    "save_comp",
+    "tool_writer",
+    "query_tools",
+    "_FusionEngine__update_nodes_version",
+    "_FusionEngine__update_saver_metadata",
+]
+
+SHOT = "sh0010"
+FIRST_FRAME = 1001
+
+
+def load_engine_helpers():
+    """
+    Imports engine.py and gives BenchEngine the FusionEngine helpers.
+    """
+    spec = importlib.util.spec_from_file_location(
+        "tk_fusion_engine", os.path.join(ROOT, "engine.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    for name in ENGINE_MEMBERS:
+        setattr(BenchEngine, name, module.FusionEngine.__dict__[name])
+
+
+def tk_fusion_api():
+    """
+    Returns the tk_fusion members the engine uses, without the menu which
+    needs Qt.
+    """
+    from tk_fusion import connection, rpc_stats, bulk_query, comp_lock
+    from tk_fusion import attr_cache, tool_index, tool_writer
+
+    return types.SimpleNamespace(
+        FusionConnection=connection.FusionConnection,
+        RpcStats=rpc_stats.RpcStats,
+        query_tools=bulk_query.query_tools,
+        CompLock=comp_lock.CompLock,
+        CompAttrCache=attr_cache.CompAttrCache,
+        ToolIndex=tool_index.ToolIndex,
+        ToolRecord=tool_index.ToolRecord,
+        ToolWriter=tool_writer.ToolWriter,
+    )
+
+
+class BenchTk(object):
+    """
+    The part of the Toolkit API used by the hooks, backed by real tk-core
+    templates matching the layout fusion_sim.build_comp() generates.
+    """
+
+    def __init__(self, root):
+        from tank.template import TemplatePath
+        from tank.templatekey import StringKey, IntegerKey, SequenceKey
+
+        keys = {
+            "Shot": StringKey("Shot"),
+            "name": StringKey("name"),
+            "version": IntegerKey("version", format_spec="03"),
+            "SEQ": SequenceKey("SEQ", format_spec="04"),
+        }
+        definitions = {
+            "fusion_shot_work": "work/comp/{Shot}_v{version}.comp",
+            "fusion_shot_render": (
+                "work/renders/{name}/v{version}/{name}_v{version}.{SEQ}.exr"
+            ),
+            "fusion_shot_publish_element": (
+                "publish/elements/{name}/v{version}/{name}_v{version}.{SEQ}.exr"
+            ),
+        }
+        self.templates = dict(
+            (name, TemplatePath(definition, keys, root, name=name))
+            for name, definition in definitions.items()
+        )
+
+    def template_from_path(self, path):
+        for template in self.templates.values():
+            if template.validate(path):
+                return template
+        return None
+
+
+class BenchEngine(object):
+    """
+    Stand in for the engine, with the Fusion helpers of FusionEngine.
+    """
+
+    def __init__(self, root, logger):
+        self.logger = logger
+        self.sgtk = BenchTk(root)
+        self.context = None
+        self.settings = {}
+        self._tk_fusion = tk_fusion_api()
+
+    def get_setting(self, name, default=None):
+        return self.settings.get(name, default)
+
+    def import_module(self, name):
+        return self._tk_fusion
+
+    def change_context(self, context):
+        pass
+
+    def execute_hook_expression(self, *args, **kwargs):
+        pass
+
+
+class BenchItem(object):
+    """
+    Publish item, as handed to the collector.
+    """
+
+    def __init__(self, item_type="root", name=None):
+        self.type = item_type
+        self.name = name
+        self.properties = {}
+        self.children = []
+
+    def create_item(self, item_type, type_display, name):
+        item = BenchItem(item_type, name)
+        self.children.append(item)
+        return item
+
+    def set_icon_from_path(self, path):
+        pass
+
+
+class BenchApp(object):
+    """
+    Parent of the hooks, standing for the app they belong to.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.logger = engine.logger
+        self.sgtk = engine.sgtk
+        self.util = types.SimpleNamespace(
+            get_file_path_components=lambda path: {
+                "path": path,
+                "folder": os.path.dirname(path),
+                "filename": os.path.basename(path),
+            }
+        )
+
+
+class Scenario(object):
+    """
+    Synthetic project on disk: image sequences of the loaders (v001 and the
+    v002 the breakdown updates to) and of the publishes loaded by the loader
+    benchmark.
+    """
+
+    def __init__(self, root, size, frames, loads):
+        self.root = root
+        self.size = size
+        self.frames = frames
+        self.loads = loads
+        self.last_frame = FIRST_FRAME + frames - 1
+
+        for i in range(size):
+            for version in (1, 2):
+                self._make_sequence("plate%04d" % i, version)
+        for i in range(loads):
+            self._make_sequence("extra%04d" % i, 1)
+
+    def element_path(self, element, version):
+        return (
+            "{root}/publish/elements/{element}/v{version:03d}/"
+            "{element}_v{version:03d}.%04d.exr"
+        ).format(root=self.root, element=element, version=version)
+
+    def work_path(self, version):
+        return "%s/work/comp/%s_v%03d.comp" % (self.root, SHOT, version)
+
+    def _make_sequence(self, element, version):
+        path = self.element_path(element, version)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        for frame in range(FIRST_FRAME, self.last_frame + 1):
+            open(path % frame, "w").close()
+
+    def publish_data(self, element, version, publish_id):
+        path = self.element_path(element, version)
+        return {
+            "id": publish_id,
+            "type": "PublishedFile",
+            "code": os.path.basename(path),
+            "name": "%s.exr" % element,
+            "version_number": version,
+            "entity": {"type": "Shot", "id": 1, "name": SHOT},
+            "path": {"local_path": path},
+        }
+
+    def setup(self, latency, logger):
+        """
+        Returns a fresh (fusion, engine, app) set up on a new synthetic comp.
+        """
+        fusion = fusion_sim.Fusion(latency)
+        fusion_sim.build_comp(
+            fusion,
+            loaders=self.size,
+            savers=max(1, self.size // 10),
+            root=self.root,
+            first_frame=FIRST_FRAME,
+            last_frame=self.last_frame,
+            path=self.work_path(1),
+        )
+        fusion_sim.install(fusion)
+
+        engine = BenchEngine(self.root, logger)
+        # the publish hooks get the engine through sgtk.platform.current_engine()
+        from tank.platform.engine import set_current_engine
+
+        set_current_engine(engine)
+        return fusion, engine, BenchApp(engine)
+
+
+def load_hook(name, app):
+    from tank.hook import create_hook_instance
+
+    return create_hook_instance([os.path.join(HOOKS, HOOK_FILES[name])], app)
+
+
+# benchmarks -----------------------------------------------------------------------
+# each one takes (scenario, engine, app) and returns the callable to time
+
+
+def bench_scan_scene(scenario, engine, app):
+    hook = load_hook("breakdown", app)
+    return hook.scan_scene
+
+
+def bench_breakdown_update(scenario, engine, app):
+    hook = load_hook("breakdown", app)
+    with engine.operation("bench.setup"):
+        items = hook.scan_scene()
+    publishes = {}
+    for i, item in enumerate(items):
+        item["path"] = item["path"].replace("v001", "v002")
+        publishes[item["path"]] = scenario.publish_data(
+            "plate%04d" % i, 2, 20000 + i
+        )
+    # find_publish is a Shotgun query
+    hook.get_item_paths_list = lambda items: publishes
+    return lambda: hook.update(items)
+
+
+def bench_execute_actions(scenario, engine, app):
+    hook = load_hook("loader", app)
+    # publish paths and downloads are resolved by Shotgun and tk-core
+    hook.get_publish_path = lambda sg_data: sg_data["path"]["local_path"]
+    hook.ensure_file_is_local = lambda path, sg_data: None
+    actions = [
+        {
+            "name": "loader_node",
+            "params": None,
+            "sg_publish_data": scenario.publish_data("extra%04d" % i, 1, 30000 + i),
+        }
+        for i in range(scenario.loads)
+    ]
+    return lambda: hook.execute_multiple_actions(actions)
+
+
+def bench_update_nodes_version(scenario, engine, app):
+    work_path = scenario.work_path(2)
+    return lambda: engine._FusionEngine__update_nodes_version(work_path)
+
+
+def bench_collect_session(scenario, engine, app):
+    hook = load_hook("collector", app)
+    return lambda: hook.collect_current_fusion_session({}, BenchItem())
+
+
+def bench_workfiles_save(scenario, engine, app):
+    hook = load_hook("workfiles", app)
+    work_path = scenario.work_path(2)
+    return lambda: hook.execute(
+        "save", work_path, None, "save_file_as", None, False
+    )
+
+
+BENCHMARKS = [
+    ("breakdown.scan_scene", bench_scan_scene),
+    ("breakdown.update", bench_breakdown_update),
+    ("loader.execute_actions", bench_execute_actions),
+    ("engine.update_nodes_version", bench_update_nodes_version),
+    ("publish.collect_session", bench_collect_session),
+    ("workfiles.save", bench_workfiles_save),
+]
+
+
+def run(sizes, frames, loads, latency, repeat, selected=None):
+    load_engine_helpers()
+    logger = logging.getLogger("tk_fusion.bench")
+
+    results = []
+    for size in sizes:
+        for frame_count in frames:
+            root = tempfile.mkdtemp(prefix="tk_fusion_bench_")
+            try:
+                scenario = Scenario(root, size, frame_count, loads)
+                for name, setup in BENCHMARKS:
+                    if selected and name not in selected:
+                        continue
+                    results.append(
+                        run_one(name, setup, scenario, latency, repeat, logger)
+                    )
+            finally:
+                shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def run_one(name, setup, scenario, latency, repeat, logger):
+    label = "%-30s %6d tools %4d frames" % (name, scenario.size, scenario.frames)
+    row = {"name": name, "tools": scenario.size, "frames": scenario.frames}
+    timings = []
+    try:
+        for _ in range(repeat):
+            fusion, engine, app = scenario.setup(latency, logger)
+            func = setup(scenario, engine, app)
+            fusion.reset_calls()
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+            row["calls"] = fusion.total_calls
+    except Exception as e:
+        row["error"] = "%s: %s" % (type(e).__name__, e)
+        print("%s | ERROR %s" % (label, row["error"]))
+        return row
+
+    row["seconds"] = round(statistics.median(timings), 5)
+    row["min_seconds"] = round(min(timings), 5)
+    print("%s | %8.3fs %7d calls" % (label, row["seconds"], row["calls"]))
+    return row
+
+
+def compare(results, baseline, threshold):
+    """
+    Prints the comparison against a baseline run.
+
+    :returns: List of the regressed benchmarks.
+    """
+    previous = dict(
+        ((r["name"], r["tools"], r["frames"]), r) for r in baseline["results"]
+    )
+    regressions = []
+    for row in results:
+        key = (row["name"], row["tools"], row["frames"])
+        old = previous.get(key)
+        if not old or "seconds" not in old or "seconds" not in row:
+            continue
+        ratio = row["seconds"] / old["seconds"] if old["seconds"] else 1.0
+        more_calls = row["calls"] > old["calls"]
+        regressed = ratio > 1.0 + threshold or more_calls
+        if regressed:
+            regressions.append(key)
+        print(
+            "%-30s %6d tools %4d frames | %8.3fs -> %8.3fs (%+6.1f%%) "
+            "%7d -> %7d calls%s"
+            % (
+                row["name"],
+                row["tools"],
+                row["frames"],
+                old["seconds"],
+                row["seconds"],
+                100.0 * (ratio - 1.0),
+                old["calls"],
+                row["calls"],
+                "  REGRESSION" if regressed else "",
+            )
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100, 1000],
+        help="Number of Loaders in the simulated comps.",
+    )
+    parser.add_argument(
+        "--frames", type=int, nargs="+", default=[10, 50],
+        help="Number of frames of the image sequences.",
+    )
+    parser.add_argument(
+        "--loads", type=int, default=10,
+        help="Number of publishes loaded by the loader benchmark.",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.05,
+        help="Milliseconds spent on every call made to the simulated objects.",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Runs of every benchmark."
+    )
+    parser.add_argument(
+        "--only", nargs="+", choices=[name for name, _ in BENCHMARKS],
+        help="Only run these benchmarks.",
+    )
+    parser.add_argument("--output", help="Json file the results are written to.")
+    parser.add_argument("--baseline", help="Json results to compare against.")
+    parser.add_argument(
+        "--threshold", type=float, default=0.1,
+        help="Slowdown ratio over the baseline reported as a regression.",
+    )
+    args = parser.parse_args()
+
+    try:
+        # only checks tk-core is on PYTHONPATH, the hooks import it when loaded
+        import tank  # noqa: F401
+    except ImportError:
+        sys.exit("tk-core must be importable, add its python folder to PYTHONPATH.")
+
+    results = run(
+        args.sizes,
+        args.frames,
+        args.loads,
+        args.latency / 1000.0,
+        args.repeat,
+        args.only,
+    )
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency_ms": args.latency,
+            "repeat": args.repeat,
+            "loads": args.loads,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Compares the throughput of the batched console log sink against the per
+record path it replaces, which built a formatter and queued one main thread
+call per record.
+
+The main thread queue is simulated by a list of callables drained once per
+simulated event loop tick, every --tick records. Console output goes to an
+in memory buffer. Usage:
+
+    python benchmarks/bench_log_sink.py [--records 20000] [--tick 200]
+"""
+
+import io
+import time
+import logging
+import argparse
+import contextlib
+
+# installs the simulated modules, tk_fusion imports without sgtk and Fusion
+import fusion_sim  # noqa: F401
+from tk_fusion import log_sink
+
+
+def display_info(msg):
+    # same as engine.display_info
+    t = time.asctime(time.localtime())
+    print("%s - Shotgrid Info | Fusion engine | %s " % (t, msg))
+
+
+def emit_per_record(record, queue):
+    # the previous FusionEngine._emit_log_message
+    formatter = logging.Formatter("Shotgrid %(basename)s: %(message)s")
+    msg = formatter.format(record)
+    queue.append(lambda: display_info(msg))
+
+
+def make_records(count, duplicates):
+    """
+    Builds log records like the breakdown update logs for every loader, every
+    ``duplicates`` records share the same message.
+    """
+    records = []
+    for i in range(count):
+        record = logging.LogRecord(
+            "sgtk.env.shot.tk-fusion.tk-multi-breakdown",
+            logging.INFO,
+            __file__,
+            0,
+            "Updating loader %s to %s",
+            ("plate%04d_v001" % (i // duplicates), "/publish/plate_v002.exr"),
+            None,
+        )
+        record.basename = "tk-multi-breakdown"
+        records.append(record)
+    return records
+
+
+def run(records, tick, emit_factory):
+    queue = []
+    emit = emit_factory(queue)
+    output = io.StringIO()
+    scheduled = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        for i, record in enumerate(records, 1):
+            emit(record)
+            if i % tick == 0 or i == len(records):
+                scheduled += len(queue)
+                calls, queue[:] = list(queue), []
+                for call in calls:
+                    call()
+    elapsed = time.perf_counter() - start
+    return {
+        "seconds": round(elapsed, 4),
+        "records_per_second": int(len(records) / elapsed),
+        "main_thread_calls": scheduled,
+        "console_lines": output.getvalue().count("\n"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--records", type=int, default=20000, help="Amount of records logged."
+    )
+    parser.add_argument(
+        "--tick", type=int, default=200,
+        help="Records logged between two event loop ticks.",
+    )
+    parser.add_argument(
+        "--duplicates", type=int, default=1,
+        help="Consecutive records sharing the same message.",
+    )
+    args = parser.parse_args()
+
+    records = make_records(args.records, args.duplicates)
+
+    def per_record(queue):
+        return lambda record: emit_per_record(record, queue)
+
+    def batched(queue):
+        sink = log_sink.ConsoleLogSink(queue.append)
+        return sink.emit
+
+    for label, factory in (("per record", per_record), ("batched", batched)):
+        result = run(records, args.tick, factory)
+        print(
+            "%-10s | %8.3fs | %9d records/s | %6d main thread calls | %6d lines"
+            % (
+                label,
+                result["seconds"],
+                result["records_per_second"],
+                result["main_thread_calls"],
+                result["console_lines"],
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
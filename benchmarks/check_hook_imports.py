@@ -0,0 +1,193 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Reports the cold import time of every hook and checks it against a budget.
+
+Toolkit reloads the hooks on every context change, so what they import at
+module level is paid again on every switch. Every hook is loaded --repeat
+times with the tk-core hook loader, each time in a new Python process where
+only the --preload modules (Toolkit, already loaded in Fusion) are imported.
+The median load time and the slowest imports of the hook are printed, like
+``python -X importtime`` but per hook.
+
+The script exits with 1 when a hook takes longer than its budget: --budget
+milliseconds, or the value given for it in the --budgets json file::
+
+    {"default_ms": 50, "hooks": {"tk-multi-loader2/tk-fusion_actions.py": 80}}
+
+Usage. tk-core isn't looked for, its python folder must be on PYTHONPATH,
+which the hook processes inherit, with the third party modules the hooks
+import. The script exits at once when tk-core can't be imported:
+
+    PYTHONPATH=/path/to/tk-core/python python benchmarks/check_hook_imports.py
+    PYTHONPATH=... python benchmarks/check_hook_imports.py --budget 30 \\
+        --output imports.json
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+# importing fusion_sim registers the bare tk_fusion package
+from fusion_sim import ROOT
+
+HOOKS = os.path.join(ROOT, "hooks")
+
+
+def hook_paths():
+    """
+    Returns the paths of the hook files, relative to the hooks folder.
+    """
+    paths = []
+    for root, dirs, files in os.walk(HOOKS):
+        dirs[:] = [name for name in dirs if name != "__pycache__"]
+        for name in files:
+            if name.endswith(".py"):
+                path = os.path.join(root, name)
+                paths.append(os.path.relpath(path, HOOKS).replace(os.sep, "/"))
+    return sorted(paths)
+
+
+def time_hook(path, preload, limit):
+    """
+    Loads a hook in this process and returns its import times, run in the
+    child processes.
+    """
+    from tk_fusion.lazy_imports import ImportTimer
+
+    for name in preload:
+        __import__(name)
+    from tank.hook import create_hook_instance
+
+    error = None
+    with ImportTimer() as timer:
+        try:
+            create_hook_instance([os.path.join(HOOKS, path)], None)
+        except Exception as e:
+            error = "%s: %s" % (type(e).__name__, e)
+    return {
+        "seconds": timer.total,
+        "error": error,
+        "imports": [
+            {"name": name, "seconds": cumulative, "self_seconds": own}
+            for name, cumulative, own, _ in timer.slowest(limit)
+        ],
+    }
+
+
+def run_child(path, preload, limit):
+    output = subprocess.check_output(
+        [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--child",
+            path,
+            "--limit",
+            str(limit),
+            "--preload",
+        ]
+        + preload,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    return json.loads(output.decode("utf-8").strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--hooks", nargs="+",
+        help="Hook files checked, relative to the hooks folder, all by default.",
+    )
+    parser.add_argument(
+        "--budget", type=float, default=50.0,
+        help="Milliseconds a hook import may take.",
+    )
+    parser.add_argument("--budgets", help="Json file of per hook budgets.")
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Cold imports of every hook."
+    )
+    parser.add_argument(
+        "--preload", nargs="*", default=["sgtk"],
+        help="Modules imported before timing, loaded in Fusion already.",
+    )
+    parser.add_argument(
+        "--limit", type=int, default=5, help="Slowest imports reported per hook."
+    )
+    parser.add_argument("--output", help="Json file the results are written to.")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = time_hook(args.child, args.preload, args.limit)
+        print(json.dumps(result))
+        return
+
+    try:
+        # only checks tk-core is on PYTHONPATH, the hook processes import it
+        import tank  # noqa: F401
+    except ImportError:
+        sys.exit("tk-core must be importable, add its python folder to PYTHONPATH.")
+
+    budgets = {"default_ms": args.budget, "hooks": {}}
+    if args.budgets:
+        with open(args.budgets) as f:
+            budgets.update(json.load(f))
+
+    results = []
+    over_budget = []
+    for path in args.hooks or hook_paths():
+        runs = [run_child(path, args.preload, args.limit) for _ in range(args.repeat)]
+        median = statistics.median(run["seconds"] for run in runs) * 1000.0
+        budget = budgets["hooks"].get(path, budgets["default_ms"])
+        # the slowest imports of the median run
+        runs.sort(key=lambda run: run["seconds"])
+        run = runs[len(runs) // 2]
+        failed = median > budget
+        if failed:
+            over_budget.append(path)
+        print(
+            "%-55s %8.1fms / %6.1fms%s"
+            % (path, median, budget, "  OVER BUDGET" if failed else "")
+        )
+        if run["error"]:
+            print("    failed to load: %s" % run["error"])
+        for record in run["imports"]:
+            print(
+                "    %8.1fms %8.1fms self  %s"
+                % (
+                    record["seconds"] * 1000.0,
+                    record["self_seconds"] * 1000.0,
+                    record["name"],
+                )
+            )
+        results.append(
+            {
+                "hook": path,
+                "milliseconds": round(median, 2),
+                "budget_ms": budget,
+                "error": run["error"],
+                "imports": run["imports"],
+            }
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"preload": args.preload, "results": results}, f, indent=2)
+
+    if over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,714 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+In process simulation of the Fusion scripting objects.
+
+Mimics the scriptapp, Composition, Tool, Input and FlowView objects closely
+enough to run the engine helpers and the hooks hot paths headless, without a
+Fusion license. Every call made on the simulated objects is counted per
+method and can sleep for a configurable latency, emulating the IPC round trip
+to Fusion. The Lua snippets sent by tk_fusion (bulk queries and tool writes)
+are answered by :meth:`Composition.Execute` from the json spec on their first
+line, any other script is only counted.
+
+Usage::
+
+    import fusion_sim
+
+    fusion = fusion_sim.Fusion(latency=0.00005)
+    comp = fusion_sim.build_comp(fusion, loaders=2000, savers=200)
+    fusion_sim.install(fusion)  # import BlackmagicFusion now returns it
+
+    tools = comp.GetToolList(False, "Loader")
+    print(fusion.total_calls, fusion.calls["GetToolList"])
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import types
+import collections
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def register_tk_fusion():
+    """
+    Registers tk_fusion as a bare package, so its submodules can be imported
+    without Toolkit and Qt, which the package __init__ needs.
+    """
+    if "tk_fusion" not in sys.modules:
+        package = types.ModuleType("tk_fusion")
+        package.__path__ = [os.path.join(ROOT, "python", "tk_fusion")]
+        sys.modules["tk_fusion"] = package
+
+
+register_tk_fusion()
+
+from tk_fusion import bulk_query, tool_writer  # noqa: E402
+
+
+def lua_table(value):
+    """
+    Converts python lists into the float keyed dictionaries Fusion returns
+    for Lua arrays.
+    """
+    if isinstance(value, (list, tuple)):
+        return dict((float(i), lua_table(v)) for i, v in enumerate(value, 1))
+    if isinstance(value, dict):
+        return dict((k, lua_table(v)) for k, v in value.items())
+    return value
+
+
+class SimObject(object):
+    """
+    Base of the simulated objects, routes every call through the owning
+    :class:`Fusion` for accounting and latency.
+    """
+
+    def __init__(self, fusion):
+        object.__setattr__(self, "_fusion", fusion)
+
+    def _call(self, method):
+        self._fusion.call(method)
+
+
+class Fusion(SimObject):
+    """
+    Simulated scriptapp("Fusion").
+    """
+
+    def __init__(self, latency=0.0, latencies=None, version=18.5):
+        """
+        :param float latency: Seconds every call sleeps.
+        :param dict latencies: Per method latency overrides, ie.
+            ``{"Execute": 0.002}``.
+        :param float version: Value of ``fusion.Version``.
+        """
+        super(Fusion, self).__init__(self)
+        self.latency = latency
+        self.latencies = dict(latencies or {})
+        self.calls = collections.Counter()
+        self.version = version
+
+        self.comps = []
+        self.current_comp = None
+        # path -> saved comp state, the simulated file system
+        self.saved_comps = {}
+        self.prefs = {}
+
+    # accounting ---------------------------------------------------------------
+
+    def call(self, method):
+        self.calls[method] += 1
+        latency = self.latencies.get(method, self.latency)
+        if latency:
+            time.sleep(latency)
+
+    @property
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    def reset_calls(self):
+        self.calls.clear()
+
+    # scripting API --------------------------------------------------------------
+
+    @property
+    def Version(self):
+        self._call("Version")
+        return self.version
+
+    def GetAttrs(self, key=None):
+        self._call("GetAttrs")
+        attrs = {
+            "FUSIONS_FileName": "/opt/BlackmagicDesign/Fusion/Fusion",
+            "FUSIONS_Version": str(self.version),
+            "FUSIONB_IsManager": False,
+        }
+        if key:
+            return attrs.get(key)
+        return attrs
+
+    def GetCurrentComp(self):
+        self._call("GetCurrentComp")
+        return self.current_comp
+
+    def GetCompList(self):
+        self._call("GetCompList")
+        return lua_table(self.comps)
+
+    def NewComp(self):
+        self._call("NewComp")
+        return self.new_comp()
+
+    def LoadComp(self, path, *args):
+        self._call("LoadComp")
+        state = self.saved_comps.get(path)
+        if state is None:
+            return None
+        comp = self.new_comp()
+        comp.restore(state)
+        comp.attrs["COMPS_FileName"] = path
+        comp.attrs["COMPS_Name"] = os.path.basename(path)
+        return comp
+
+    def GetPrefs(self, key=None):
+        self._call("GetPrefs")
+        if key:
+            return self.prefs.get(key)
+        return dict(self.prefs)
+
+    def SetPrefs(self, key, value=None):
+        self._call("SetPrefs")
+        if isinstance(key, dict):
+            self.prefs.update(key)
+        else:
+            self.prefs[key] = value
+
+    def RunScript(self, path):
+        self._call("RunScript")
+
+    def Execute(self, script):
+        self._call("Execute")
+
+    # helpers, not part of the Fusion API ----------------------------------------
+
+    def new_comp(self):
+        """
+        Creates a comp and makes it the current one, without counting a call.
+        """
+        comp = Composition(self)
+        self.comps.append(comp)
+        self.current_comp = comp
+        return comp
+
+
+class Composition(SimObject):
+    """
+    Simulated Composition.
+    """
+
+    def __init__(self, fusion):
+        super(Composition, self).__init__(fusion)
+        self.attrs = {
+            "COMPS_FileName": "",
+            "COMPS_Name": "Composition1",
+            "COMPN_GlobalStart": 1001.0,
+            "COMPN_GlobalEnd": 1100.0,
+            "COMPN_RenderStart": 1001.0,
+            "COMPN_RenderEnd": 1100.0,
+            "COMPB_Locked": False,
+            "COMPB_Modified": False,
+        }
+        self.data = {}
+        self.prefs = {}
+        self.tools = collections.OrderedDict()
+        self.lock_count = 0
+        self.undo_depth = 0
+        self.undo_blocks = []
+        self.scripts = []
+        self.current_time = 1001.0
+        self.closed = False
+        self.CurrentFrame = FusionView(fusion, FlowView(fusion, self))
+
+    # scripting API --------------------------------------------------------------
+
+    @property
+    def CurrentTime(self):
+        self._call("CurrentTime")
+        return self.current_time
+
+    def GetAttrs(self, key=None):
+        self._call("GetAttrs")
+        if key:
+            return self.attrs.get(key)
+        return dict(self.attrs)
+
+    def SetAttrs(self, attrs):
+        self._call("SetAttrs")
+        self.attrs.update(attrs)
+
+    def GetPrefs(self, key=None):
+        self._call("GetPrefs")
+        if key:
+            return self.prefs.get(key)
+        return dict(self.prefs)
+
+    def SetPrefs(self, key, value=None):
+        self._call("SetPrefs")
+        if isinstance(key, dict):
+            self.prefs.update(key)
+        else:
+            self.prefs[key] = value
+
+    def GetData(self, key=None):
+        self._call("GetData")
+        if key is None:
+            return copy.deepcopy(self.data)
+        return copy.deepcopy(self.data.get(key))
+
+    def SetData(self, key, value=None):
+        self._call("SetData")
+        if value is None:
+            self.data.pop(key, None)
+        else:
+            self.data[key] = copy.deepcopy(value)
+
+    def Lock(self):
+        self._call("Lock")
+        self.lock_count += 1
+        self.attrs["COMPB_Locked"] = True
+
+    def Unlock(self):
+        self._call("Unlock")
+        self.lock_count = max(0, self.lock_count - 1)
+        self.attrs["COMPB_Locked"] = self.lock_count > 0
+
+    def StartUndo(self, name):
+        self._call("StartUndo")
+        self.undo_depth += 1
+        self.undo_blocks.append(name)
+
+    def EndUndo(self, keep=True):
+        self._call("EndUndo")
+        self.undo_depth = max(0, self.undo_depth - 1)
+
+    def GetToolList(self, selected=False, tool_type=None):
+        self._call("GetToolList")
+        return lua_table(self.list_tools(selected, tool_type))
+
+    def FindTool(self, name):
+        self._call("FindTool")
+        return self.tools.get(name)
+
+    def AddTool(self, tool_type, x=None, y=None):
+        self._call("AddTool")
+        return self.add_tool(tool_type, pos=(x, y) if x is not None else None)
+
+    def Save(self, path=None):
+        self._call("Save")
+        path = path or self.attrs["COMPS_FileName"]
+        if not path:
+            return False
+        self._fusion.saved_comps[path] = self.snapshot()
+        self.attrs["COMPS_FileName"] = path
+        self.attrs["COMPS_Name"] = os.path.basename(path)
+        self.attrs["COMPB_Modified"] = False
+        return True
+
+    def Close(self):
+        self._call("Close")
+        self.closed = True
+        fusion = self._fusion
+        if self in fusion.comps:
+            fusion.comps.remove(self)
+        if fusion.current_comp is self:
+            fusion.current_comp = fusion.comps[-1] if fusion.comps else None
+
+    def Execute(self, script):
+        self._call("Execute")
+        self.scripts.append(script)
+        header = script.partition("\n")[0]
+        if header.startswith(bulk_query.LUA_HEADER):
+            spec = json.loads(header[len(bulk_query.LUA_HEADER):])
+            self.data[self._result_key(script)] = self._answer_query(spec)
+        elif header.startswith(tool_writer.LUA_HEADER):
+            entries = json.loads(header[len(tool_writer.LUA_HEADER):])
+            self.data[self._result_key(script)] = self._apply_writes(entries)
+
+    # helpers, not part of the Fusion API ----------------------------------------
+
+    def list_tools(self, selected=False, tool_type=None):
+        return [
+            tool
+            for tool in self.tools.values()
+            if (tool_type is None or tool.type == tool_type)
+            and (not selected or tool.selected)
+        ]
+
+    def add_tool(self, tool_type, name=None, pos=None):
+        """
+        Adds a tool without counting a call.
+        """
+        if name is None or name in self.tools:
+            base = name or tool_type
+            index = 1
+            while "%s%s" % (base, index) in self.tools:
+                index += 1
+            name = "%s%s" % (base, index)
+        tool = Tool(self._fusion, self, name, tool_type)
+        self.tools[name] = tool
+        if pos is None:
+            pos = (float(len(self.tools) % 50), float(len(self.tools) // 50))
+        self.CurrentFrame.FlowView.positions[name] = pos
+        self.attrs["COMPB_Modified"] = True
+        return tool
+
+    def rename_tool(self, tool, new_name):
+        if new_name == tool.name:
+            return
+        if new_name in self.tools:
+            raise ValueError("A tool named %s already exists" % new_name)
+        flow = self.CurrentFrame.FlowView
+        self.tools = collections.OrderedDict(
+            (new_name if name == tool.name else name, t)
+            for name, t in self.tools.items()
+        )
+        flow.positions[new_name] = flow.positions.pop(tool.name, None)
+        tool.attrs["TOOLS_Name"] = new_name
+
+    def snapshot(self):
+        return {
+            "attrs": copy.deepcopy(self.attrs),
+            "data": copy.deepcopy(self.data),
+            "tools": [
+                (
+                    tool.type,
+                    copy.deepcopy(tool.attrs),
+                    copy.deepcopy(tool.data),
+                    copy.deepcopy(tool.inputs),
+                    self.CurrentFrame.FlowView.positions.get(tool.name),
+                )
+                for tool in self.tools.values()
+            ],
+        }
+
+    def restore(self, state):
+        self.attrs = copy.deepcopy(state["attrs"])
+        self.attrs["COMPB_Locked"] = False
+        self.data = copy.deepcopy(state["data"])
+        self.tools = collections.OrderedDict()
+        for tool_type, attrs, data, inputs, pos in state["tools"]:
+            tool = self.add_tool(tool_type, attrs["TOOLS_Name"], pos)
+            tool.attrs.update(copy.deepcopy(attrs))
+            tool.data = copy.deepcopy(data)
+            tool.inputs = copy.deepcopy(inputs)
+
+    @staticmethod
+    def _result_key(script):
+        return script.rsplit('comp:SetData("', 1)[1].split('"', 1)[0]
+
+    def _answer_query(self, spec):
+        flow = self.CurrentFrame.FlowView
+        tools = []
+        if spec["types"]:
+            for tool_type in spec["types"]:
+                tools.extend(self.list_tools(spec["selected"], tool_type))
+        else:
+            tools = self.list_tools(spec["selected"])
+
+        result = {}
+        detail_types = spec.get("detail") or []
+        for index, tool in enumerate(tools, 1):
+            detail = not detail_types or tool.type in detail_types
+            entry = {
+                "type": tool.type,
+                "index": index,
+                "attrs": dict(
+                    (key, copy.deepcopy(tool.attrs[key]))
+                    for key in spec["attrs"]
+                    if detail and tool.attrs.get(key) is not None
+                ),
+                "data": dict(
+                    (key, copy.deepcopy(tool.data[key]))
+                    for key in spec["data"]
+                    if detail and tool.data.get(key) is not None
+                ),
+            }
+            pos = flow.positions.get(tool.name)
+            if spec["positions"] and pos:
+                entry["pos"] = {"x": pos[0], "y": pos[1]}
+            result[tool.name] = entry
+        return result
+
+    def _apply_writes(self, entries):
+        result = {"failures": {}, "names": {}}
+        self.undo_blocks.append("tool_writer")
+        for entry in entries:
+            key = entry["tool"]
+            if entry.get("add"):
+                tool_type, x, y = entry["add"]
+                tool = self.add_tool(tool_type, pos=(x, y) if x is not None else None)
+            else:
+                tool = self.tools.get(key)
+            if tool is None:
+                result["failures"][key] = ["tool not found"]
+                continue
+
+            errors = []
+            for kind, name, value, at_time in entry["writes"]:
+                if at_time == tool_writer.CURRENT_TIME:
+                    at_time = self.current_time
+                try:
+                    if kind in ("property", "input"):
+                        tool.set_input(name, value, at_time)
+                    elif kind == "attrs":
+                        tool.set_attrs(value)
+                    elif kind == "data":
+                        tool.set_data(name, value)
+                except Exception as e:
+                    errors.append("%s %s: %s" % (kind, name, e))
+            if errors:
+                result["failures"][key] = errors
+            result["names"][key] = tool.name
+        return lua_table(result)
+
+
+class FusionView(object):
+    """
+    Simulated ``comp.CurrentFrame``.
+    """
+
+    def __init__(self, fusion, flow):
+        self.FlowView = flow
+
+
+class FlowView(SimObject):
+    """
+    Simulated flow view, holding the tool positions.
+    """
+
+    def __init__(self, fusion, comp):
+        super(FlowView, self).__init__(fusion)
+        self.comp = comp
+        self.positions = {}
+
+    def GetPosTable(self, tool):
+        self._call("GetPosTable")
+        pos = self.positions.get(tool.name)
+        if pos is None:
+            return None
+        return {1.0: pos[0], 2.0: pos[1]}
+
+    def SetPos(self, tool, x, y):
+        self._call("SetPos")
+        self.positions[tool.name] = (x, y)
+
+
+class Input(SimObject):
+    """
+    Simulated tool input, ie. ``loader.Clip``. Supports ``input[time]`` reads
+    and writes.
+    """
+
+    def __init__(self, fusion, tool, name):
+        super(Input, self).__init__(fusion)
+        self.tool = tool
+        self.name = name
+
+    def __getitem__(self, at_time):
+        self._call("Input[]")
+        return self.tool.inputs.get(self.name)
+
+    def __setitem__(self, at_time, value):
+        self._call("Input[]=")
+        self.tool.set_input(self.name, value, at_time)
+
+
+class Tool(SimObject):
+    """
+    Simulated tool. Inputs are read and written as attributes, ie.
+    ``loader.Clip = path`` or ``loader.GlobalIn[time] = 1001``.
+    """
+
+    # attributes that are plain python ones, anything else is an input
+    _OWN = ("_fusion", "comp", "type", "attrs", "data", "inputs", "selected")
+
+    def __init__(self, fusion, comp, name, tool_type):
+        super(Tool, self).__init__(fusion)
+        self.comp = comp
+        self.type = tool_type
+        self.attrs = {
+            "TOOLS_Name": name,
+            "TOOLS_RegID": tool_type,
+            "TOOLB_PassThrough": False,
+            "TOOLB_NameSet": False,
+        }
+        self.data = {}
+        self.inputs = {}
+        self.selected = False
+
+    @property
+    def name(self):
+        return self.attrs["TOOLS_Name"]
+
+    @property
+    def Name(self):
+        self._call("Name")
+        return self.name
+
+    @property
+    def ID(self):
+        self._call("ID")
+        return self.type
+
+    def __getattr__(self, name):
+        if name.startswith("_") or not name[:1].isupper():
+            raise AttributeError(name)
+        self._call("." + name)
+        return Input(self._fusion, self, name)
+
+    def __setattr__(self, name, value):
+        if name in self._OWN:
+            object.__setattr__(self, name, value)
+            return
+        self._call("." + name + "=")
+        self.set_input(name, value)
+
+    def GetAttrs(self, key=None):
+        self._call("GetAttrs")
+        if key:
+            return copy.deepcopy(self.attrs.get(key))
+        return copy.deepcopy(self.attrs)
+
+    def SetAttrs(self, attrs):
+        self._call("SetAttrs")
+        self.set_attrs(attrs)
+
+    def GetData(self, key=None):
+        self._call("GetData")
+        if key is None:
+            return copy.deepcopy(self.data)
+        return copy.deepcopy(self.data.get(key))
+
+    def SetData(self, key, value=None):
+        self._call("SetData")
+        self.set_data(key, value)
+
+    def GetInput(self, name, at_time=None):
+        self._call("GetInput")
+        return self.inputs.get(name)
+
+    def SetInput(self, name, value, at_time=None):
+        self._call("SetInput")
+        self.set_input(name, value, at_time)
+
+    # helpers, not part of the Fusion API ----------------------------------------
+
+    def set_attrs(self, attrs):
+        attrs = dict(attrs)
+        new_name = attrs.pop("TOOLS_Name", None)
+        if new_name is not None:
+            self.comp.rename_tool(self, new_name)
+        self.attrs.update(attrs)
+
+    def set_data(self, key, value=None):
+        if value is None:
+            self.data.pop(key, None)
+        else:
+            self.data[key] = copy.deepcopy(value)
+
+    def set_input(self, name, value, at_time=None):
+        self.inputs[name] = value
+        if name == "Clip" and self.type in ("Loader", "Saver"):
+            self.attrs["TOOLST_Clip_Name"] = {1.0: value}
+        elif name == "ClipTimeStart":
+            self.attrs["TOOLIT_Clip_TrimIn"] = {1.0: value}
+        elif name == "ClipTimeEnd":
+            self.attrs["TOOLIT_Clip_TrimOut"] = {1.0: value}
+        elif name == "HoldFirstFrame":
+            self.attrs["TOOLIT_Clip_ExtendFirst"] = {1.0: value}
+        elif name == "HoldLastFrame":
+            self.attrs["TOOLIT_Clip_ExtendLast"] = {1.0: value}
+        self.comp.attrs["COMPB_Modified"] = True
+
+
+def build_comp(
+    fusion,
+    loaders=1000,
+    savers=100,
+    others=0,
+    root="/projects/demo/sequences/sq010/sh0010",
+    first_frame=1001,
+    last_frame=1100,
+    path=None,
+):
+    """
+    Builds a synthetic comp and makes it the current one. No calls are
+    counted while building it.
+
+    Loaders point to published image sequences and carry the sg_metadata
+    the loader hook stores, savers carry the Shotgrid saver metadata.
+
+    :param fusion: :class:`Fusion` instance.
+    :param int loaders: Amount of Loaders.
+    :param int savers: Amount of Savers.
+    :param int others: Amount of other tools (Merges).
+    :param str root: Root folder of the generated paths.
+    :param str path: Comp file path, the comp is also saved there.
+    :returns: The :class:`Composition`.
+    """
+    comp = fusion.new_comp()
+    comp.attrs["COMPN_GlobalStart"] = float(first_frame)
+    comp.attrs["COMPN_GlobalEnd"] = float(last_frame)
+    comp.attrs["COMPN_RenderStart"] = float(first_frame)
+    comp.attrs["COMPN_RenderEnd"] = float(last_frame)
+    comp.current_time = float(first_frame)
+    length = last_frame - first_frame + 1
+
+    for i in range(loaders):
+        element = "plate%04d" % i
+        clip = "%s/publish/elements/%s/v001/%s_v001.%d.exr" % (
+            root, element, element, first_frame
+        )
+        tool = comp.add_tool("Loader", "%s_v001" % element)
+        tool.set_input("Clip", clip)
+        tool.attrs.update(
+            {
+                "TOOLIT_Clip_StartFrame": {1.0: first_frame},
+                "TOOLIT_Clip_Length": {1.0: length},
+                "TOOLIT_Clip_TrimIn": {1.0: 0},
+                "TOOLIT_Clip_TrimOut": {1.0: length - 1},
+                "TOOLIT_Clip_ExtendFirst": {1.0: 0},
+                "TOOLIT_Clip_ExtendLast": {1.0: 0},
+            }
+        )
+        tool.data["sg_metadata"] = {
+            "id": 10000 + i,
+            "code": "%s_v001.####.exr" % element,
+            "name": "%s.exr" % element,
+            "version_number": 1,
+            "entity": {"type": "Shot", "id": 1, "name": "sh0010"},
+        }
+
+    for i in range(savers):
+        element = "render%04d" % i
+        clip = "%s/work/renders/%s/v001/%s_v001.%%04d.exr" % (root, element, element)
+        tool = comp.add_tool("Saver", element)
+        tool.set_input("Clip", clip)
+        tool.data["Shotgrid_Saver_Node"] = True
+        tool.data["Current_template"] = "fusion_shot_render"
+
+    for i in range(others):
+        comp.add_tool("Merge")
+
+    if path:
+        comp.attrs["COMPS_FileName"] = path
+        comp.attrs["COMPS_Name"] = os.path.basename(path)
+        fusion.saved_comps[path] = comp.snapshot()
+    comp.attrs["COMPB_Modified"] = False
+    return comp
+
+
+def install(fusion):
+    """
+    Registers a BlackmagicFusion module whose scriptapp() returns the given
+    simulated Fusion, so code doing ``import BlackmagicFusion`` talks to it.
+
+    :returns: The registered module.
+    """
+    module = types.ModuleType("BlackmagicFusion")
+    module.scriptapp = lambda app_name="Fusion", *args: fusion
+    sys.modules["BlackmagicFusion"] = module
+    return module
@@ -0,0 +1,253 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Replays a recording of the calls made to Fusion against the simulator.
+
+Recordings are written by the engine when the TK_FUSION_RPC_RECORD
+environment variable is set, see tk_fusion.rpc_recorder. Every recorded call
+is made again on a simulated comp and followed by a sleep of its recorded
+latency, so a session captured on an artist's machine can be profiled and
+optimized offline. Usage:
+
+    python benchmarks/replay_session.py fusion_calls_1234.jsonl.gz
+    python benchmarks/replay_session.py --demo /tmp/demo.jsonl.gz
+
+The simulated comp is built with --loaders and --savers tools, named like
+fusion_sim.build_comp() does. Tools the recording finds by name but which
+aren't in the simulated comp are created on the fly. Calls the simulator
+can't answer are counted as errors and skipped.
+"""
+
+import time
+import argparse
+
+import fusion_sim
+from tk_fusion import bulk_query, rpc_recorder, rpc_stats
+
+
+class Replayer(object):
+    """
+    Replays recorded calls, mapping the recorded object ids to simulated
+    objects.
+    """
+
+    def __init__(self, fusion, comp, speed=1.0, stats=None):
+        """
+        :param fusion: :class:`fusion_sim.Fusion` replayed against.
+        :param comp: Its current :class:`fusion_sim.Composition`.
+        :param float speed: Factor applied to the recorded latencies, 0
+            replays without sleeping.
+        :param stats: :class:`RpcStats` the replayed calls are recorded in.
+        """
+        self.fusion = fusion
+        self.comp = comp
+        self.speed = speed
+        self.stats = stats or rpc_stats.RpcStats()
+        self.errors = {}
+        self._objects = {}
+        self._root_bound = False
+
+    def replay(self, entries):
+        """
+        Replays the recorded entries.
+
+        :returns: List of (operation, recorded seconds, replayed seconds,
+            calls) tuples, one per recorded operation.
+        """
+        operations = []
+        opened = {}
+        for entry in entries:
+            if "op" in entry:
+                if entry["ev"] == "start":
+                    opened[entry["op"]] = (entry["t"], time.perf_counter(), 0)
+                elif entry["op"] in opened:
+                    recorded, start, calls = opened.pop(entry["op"])
+                    operations.append(
+                        (
+                            entry["op"],
+                            entry["t"] - recorded,
+                            time.perf_counter() - start,
+                            calls,
+                        )
+                    )
+                continue
+            self.call(entry)
+            for name, (recorded, start, calls) in opened.items():
+                opened[name] = (recorded, start, calls + 1)
+        return operations
+
+    def call(self, entry):
+        """
+        Replays one recorded call.
+        """
+        method = entry["m"]
+        start = time.perf_counter()
+        try:
+            target = self._resolve(entry["o"], entry)
+            args = [self._decode(arg) for arg in entry["a"]]
+            result = self._dispatch(target, method, args)
+        except Exception as e:
+            key = "%s: %s" % (method, type(e).__name__)
+            self.errors[key] = self.errors.get(key, 0) + 1
+            result = None
+        else:
+            self._bind(entry["r"], result, method, entry["a"])
+        if self.speed:
+            time.sleep(entry["d"] * self.speed)
+        self.stats.record(method, time.perf_counter() - start)
+
+    def _dispatch(self, target, method, args):
+        if method.endswith("[]="):
+            target[args[0]] = args[1]
+            return None
+        if method.endswith("[]"):
+            return target[args[0]]
+        if method.endswith("()"):
+            return target(*args)
+        if method.startswith("."):
+            if method.endswith("="):
+                setattr(target, method[1:-1], args[0])
+                return None
+            return getattr(target, method[1:])
+        return getattr(target, method)(*args)
+
+    def _resolve(self, object_id, entry):
+        obj = self._objects.get(object_id)
+        if obj is not None:
+            return obj
+        if not self._root_bound:
+            # every other object is obtained from the scriptapp, so the first
+            # unknown one is Fusion itself
+            obj = self.fusion
+            self._root_bound = True
+        else:
+            obj = self.comp.add_tool("Loader")
+        self._objects[object_id] = obj
+        return obj
+
+    def _decode(self, value):
+        if isinstance(value, list):
+            return [self._decode(v) for v in value]
+        if isinstance(value, dict):
+            if "$obj" in value:
+                return self._objects.get(value["$obj"])
+            if "$dict" in value:
+                return dict(
+                    (self._decode(k), self._decode(v)) for k, v in value["$dict"]
+                )
+        return value
+
+    def _bind(self, shape, result, method, args):
+        """
+        Maps the Fusion objects of a recorded result to the simulated ones.
+        """
+        if isinstance(shape, dict) and "$obj" in shape:
+            if result is None and method == "FindTool" and args:
+                # the tool isn't in the simulated comp, create it
+                result = self.comp.add_tool("Loader", args[0])
+            if result is not None:
+                self._objects.setdefault(shape["$obj"], result)
+        elif isinstance(shape, dict) and isinstance(shape.get("$dict"), list):
+            values = list(result.values()) if isinstance(result, dict) else []
+            for i, (_, item) in enumerate(shape["$dict"]):
+                self._bind(item, values[i] if i < len(values) else None, "", ())
+        elif isinstance(shape, list):
+            values = list(result) if isinstance(result, (list, tuple)) else []
+            for i, item in enumerate(shape):
+                self._bind(item, values[i] if i < len(values) else None, "", ())
+
+
+def record_demo(path, loaders=200):
+    """
+    Records a session on the simulator, a bulk query and a per tool loop, to
+    try the replayer without Fusion.
+    """
+    fusion = fusion_sim.Fusion(latency=0.0001)
+    fusion_sim.build_comp(fusion, loaders=loaders, savers=10)
+    recorder = rpc_recorder.CallRecorder(path, meta={"demo": True})
+    proxy = rpc_stats.RpcProxy(fusion, recorder)
+    kwargs = {
+        "tool_types": ["Loader"],
+        "attrs": ["TOOLST_Clip_Name"],
+        "data_keys": ["sg_metadata"],
+        "positions": True,
+    }
+    for name, func in (
+        ("demo.per_tool", bulk_query.query_tools_per_tool),
+        ("demo.bulk", bulk_query.query_tools),
+    ):
+        recorder.mark(name, "start")
+        func(proxy.GetCurrentComp(), **kwargs)
+        recorder.mark(name, "end")
+    recorder.close()
+    print("Recorded %s calls to %s" % (recorder.call_count, path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("recording", help="Recording to replay.")
+    parser.add_argument(
+        "--demo", action="store_true",
+        help="Record a session on the simulator to the given path first.",
+    )
+    parser.add_argument(
+        "--speed", type=float, default=1.0,
+        help="Factor applied to the recorded latencies.",
+    )
+    parser.add_argument(
+        "--no-sleep", action="store_true",
+        help="Don't sleep the recorded latencies.",
+    )
+    parser.add_argument(
+        "--loaders", type=int, default=1000,
+        help="Number of Loaders in the simulated comp.",
+    )
+    parser.add_argument(
+        "--savers", type=int, default=100,
+        help="Number of Savers in the simulated comp.",
+    )
+    parser.add_argument(
+        "--limit", type=int, default=20,
+        help="Maximum amount of methods listed.",
+    )
+    args = parser.parse_args()
+
+    if args.demo:
+        record_demo(args.recording)
+
+    header, entries = rpc_recorder.read_recording(args.recording)
+    fusion = fusion_sim.Fusion()
+    comp = fusion_sim.build_comp(fusion, loaders=args.loaders, savers=args.savers)
+    replayer = Replayer(fusion, comp, speed=0.0 if args.no_sleep else args.speed)
+
+    start = time.perf_counter()
+    operations = replayer.replay(entries)
+    elapsed = time.perf_counter() - start
+
+    calls = [entry for entry in entries if "m" in entry]
+    print(
+        "Replayed %s calls in %.3fs, recorded latency %.3fs"
+        % (len(calls), elapsed, sum(entry["d"] for entry in calls))
+    )
+    for name, recorded, replayed, count in operations:
+        print(
+            "  %-40s %7d calls | recorded %8.3fs | replayed %8.3fs"
+            % (name, count, recorded, replayed)
+        )
+    print(replayer.stats.report("Replayed calls", limit=args.limit))
+    if replayer.errors:
+        print("Calls the simulator couldn't replay:")
+        for key, count in sorted(replayer.errors.items()):
+            print("  %-40s %7d" % (key, count))
+
+
+if __name__ == "__main__":
+    main()
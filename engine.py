@@ -18,7 +18,12 @@ import time
 import pprint
 import inspect
 import logging
+import weakref
+import functools
+import importlib
 import traceback
+import contextlib
+import collections
 
 from functools import wraps
 
@@ -27,9 +32,6 @@ from tank.log import LogManager
 from tank.platform import Engine
 from tank.platform.constants import SHOTGUN_ENGINE_NAME
 
-import BlackmagicFusion as bmd
-fusion = bmd.scriptapp("Fusion")
-
 __author__ = "Diego Garcia Huerta"
 __email__ = "diegogh2000@gmail.com"
 
@@ -124,7 +126,7 @@ class FusionEngine(Engine):
         # note: we make an exception for the shotgun engine which is a
         # special case.
         """
-        if self.name != SHOTGUN_ENGINE_NAME:
+        if self.name != SHOTGUN_ENGINE_NAME and "Open Log Folder" not in self.commands:
             icon_path = self.__get_platform_resource_path("folder_256.png")
 
             self.register_command(
@@ -144,6 +146,8 @@ class FusionEngine(Engine):
         Registers a "Reload and Restart" command with the engine if any
         running apps are registered via a dev descriptor.
         """
+        if "Reload and Restart" in self.commands:
+            return
         from sgtk.platform import restart
         self.register_command(
             "Reload and Restart",
@@ -153,6 +157,465 @@ class FusionEngine(Engine):
              "type": "context_menu"}
         )
 
+    @property
+    def fusion_connection(self):
+        """
+        The engine owned :class:`FusionConnection`, created on first access.
+        Hooks and the menu should get Fusion through it instead of calling
+        ``bmd.scriptapp("Fusion")`` themselves.
+        """
+        if getattr(self, "_fusion_connection", None) is None:
+            tk_fusion = self.import_module("tk_fusion")
+            # the recorder forwards the calls to the rpc stats, if any
+            sink = self.rpc_recorder or self.rpc_stats
+            self._fusion_connection = tk_fusion.FusionConnection(
+                self.logger, rpc_stats=sink
+            )
+        return self._fusion_connection
+
+    @property
+    def rpc_stats(self):
+        """
+        The :class:`RpcStats` counting the calls made to Fusion, or None when
+        the ``rpc_accounting`` setting is off.
+        """
+        if getattr(self, "_rpc_stats", None) is None:
+            if not self.get_setting("rpc_accounting", False):
+                return None
+            tk_fusion = self.import_module("tk_fusion")
+            self._rpc_stats = tk_fusion.RpcStats()
+            self._rpc_reports = collections.deque(maxlen=20)
+        return self._rpc_stats
+
+    @property
+    def rpc_recorder(self):
+        """
+        The :class:`CallRecorder` writing every call made to Fusion to a file,
+        or None. Recording is turned on with the ``TK_FUSION_RPC_RECORD``
+        environment variable, set to the folder the recordings are written
+        to, or to "1" to write them next to the toolkit log. Recordings are
+        replayed on the simulator by benchmarks/replay_session.py.
+        """
+        if getattr(self, "_rpc_recorder", None) is None:
+            folder = os.environ.get("TK_FUSION_RPC_RECORD")
+            if not folder:
+                return None
+            if folder == "1":
+                folder = LogManager().log_folder
+            path = os.path.join(
+                folder,
+                "fusion_calls_%s_%s.jsonl.gz"
+                % (os.getpid(), time.strftime("%Y%m%d_%H%M%S")),
+            )
+            tk_fusion = self.import_module("tk_fusion")
+            self._rpc_recorder = tk_fusion.CallRecorder(
+                path,
+                stats=self.rpc_stats,
+                logger=self.logger,
+                meta={"engine_version": self.version},
+            )
+        return self._rpc_recorder
+
+    def get_rpc_report(self):
+        """
+        Returns the Fusion calls report of the last operations and the
+        session totals, as shown by the menu panel.
+        """
+        stats = self.rpc_stats
+        if stats is None:
+            return (
+                "Fusion call accounting is off, enable the 'rpc_accounting' "
+                "engine setting to turn it on."
+            )
+        reports = list(reversed(self._rpc_reports))
+        reports.append(stats.report("Session totals", totals=True))
+        return "\n\n".join(reports)
+
+    @property
+    def widget_registry(self):
+        """
+        The :class:`WidgetRegistry` owning the Qt objects of the engine, torn
+        down on context change or when the engine is destroyed.
+        """
+        if getattr(self, "_widget_registry", None) is None:
+            tk_fusion = self.import_module("tk_fusion")
+            self._widget_registry = tk_fusion.WidgetRegistry(self.logger)
+        return self._widget_registry
+
+    def get_widget_report(self):
+        """
+        Returns the live widget counts and the resident memory, as shown by
+        the menu panel, to check that they stay flat over a long session.
+        """
+        report = self.widget_registry.report(self.created_qt_dialogs)
+        pool = self.dialog_pool
+        if pool is not None:
+            report += (
+                "\n\nDialog pool: %s of %s dialogs kept, %s"
+                % (len(pool), pool.size, dict(pool.stats))
+            )
+        return report
+
+    @property
+    def prewarm_cache(self):
+        """
+        The :class:`PrewarmCache` filled once Fusion is idle, or None when the
+        'prewarm' setting is off.
+        """
+        if getattr(self, "_prewarm_cache", None) is None:
+            if not self.get_setting("prewarm", False):
+                return None
+            tk_fusion = self.import_module("tk_fusion")
+            self._prewarm_cache = tk_fusion.PrewarmCache()
+        return self._prewarm_cache
+
+    def template_from_path(self, path):
+        """
+        Returns the template matching a path, resolved once per path when the
+        'prewarm' setting is on, the work area files of the context being
+        resolved ahead of time.
+        """
+        cache = self.prewarm_cache
+        if cache is None:
+            return self.sgtk.template_from_path(path)
+        return cache.template_from_path(self.sgtk, path)
+
+    @property
+    def dialog_pool(self):
+        """
+        The :class:`DialogPool` keeping the dialogs of the apps listed by the
+        'dialog_pool_apps' setting alive once closed, or None when the
+        'dialog_pool_size' setting is 0.
+        """
+        if getattr(self, "_dialog_pool", None) is None:
+            size = self.get_setting("dialog_pool_size", 3)
+            if not size:
+                return None
+            tk_fusion = self.import_module("tk_fusion")
+            max_rss = self.get_setting("dialog_pool_max_rss_mb", 0)
+            self._dialog_pool = tk_fusion.DialogPool(
+                size,
+                max_rss=max_rss * 1024 * 1024 if max_rss else None,
+                logger=self.logger,
+            )
+        return self._dialog_pool
+
+    @property
+    def comp_lock(self):
+        """
+        The engine wide, reentrant :class:`CompLock`. Use it as a context
+        manager around any operation that modifies the comp::
+
+            with engine.comp_lock(comp):
+                ...
+        """
+        if getattr(self, "_comp_lock", None) is None:
+            tk_fusion = self.import_module("tk_fusion")
+            self._comp_lock = tk_fusion.CompLock(self.get_current_comp, self.logger)
+        return self._comp_lock
+
+    @property
+    def fusion(self):
+        """
+        The shared Fusion scriptapp proxy.
+        """
+        return self.fusion_connection.fusion
+
+    def get_current_comp(self):
+        """
+        Returns the current Fusion composition through the shared proxy.
+        During an operation this is the comp object of the operation, so the
+        attributes of the comps the hooks get are served from its cache.
+        """
+        cache = self.attr_cache
+        if cache is not None:
+            return cache.comp
+        return self.fusion_connection.get_current_comp()
+
+    def comp_replaced(self, comp=None):
+        """
+        Lets the running operation know another comp replaced the current
+        one, ie. a comp was opened or created, so its cached attributes and
+        tool index aren't the ones of the closed comp.
+
+        :param comp: The new current comp, queried when not given.
+        """
+        cache = self.attr_cache
+        if cache is None:
+            return
+        if comp is None:
+            comp = self.fusion_connection.get_current_comp()
+        cache.rebind(comp)
+        if getattr(self, "_tool_index", None) is not None:
+            self._tool_index.invalidate()
+
+    @property
+    def startup_tracer(self):
+        """
+        The :class:`StartupTracer` timing the startup phases, or None when the
+        ``startup_trace`` setting is off.
+        """
+        if getattr(self, "_startup_tracer", None) is None:
+            if not self.get_setting("startup_trace", True):
+                return None
+            tk_fusion = self.import_module("tk_fusion")
+            self._startup_tracer = tk_fusion.StartupTracer(
+                self.logger, metadata={"engine_version": self.version}
+            )
+            # spans of the launcher and of the Shotgrid.py startup script
+            self._startup_tracer.load_environment()
+        return self._startup_tracer
+
+    @contextlib.contextmanager
+    def _startup_span(self, name, category="engine", **args):
+        """
+        Traces a startup phase, does nothing once the startup is over.
+        """
+        tracer = self.startup_tracer
+        if tracer is None or getattr(self, "_startup_done", False):
+            yield
+            return
+        with tracer.span(name, category, **args):
+            yield
+
+    def write_startup_trace(self):
+        """
+        Writes the startup trace next to the toolkit log. Called at the end of
+        :meth:`post_app_init` and again by the Shotgrid.py startup script once
+        ``start_engine`` returns, to add its own span.
+
+        :returns: Path of the trace file or None.
+        """
+        tracer = self.startup_tracer
+        if tracer is None:
+            return None
+        self._startup_done = True
+        self.__untrace_app_loading()
+        try:
+            path = tracer.write(LogManager().log_folder)
+        except Exception as e:
+            self.logger.warning("Couldn't write the startup trace: %s", e)
+            return None
+        self.logger.debug(tracer.summary())
+        self.logger.debug("Startup trace written to %s", path)
+        return path
+
+    def __trace_app_loading(self):
+        """
+        Wraps the toolkit app factory so the loading and the init_app of
+        every app are traced. Toolkit doesn't offer a hook for it.
+        """
+        tracer = self.startup_tracer
+        if tracer is None:
+            return
+        from tank.platform import application
+
+        get_application = getattr(application, "get_application", None)
+        if get_application is None:
+            return
+
+        def traced_get_application(*args, **kwargs):
+            start = time.time()
+            app = get_application(*args, **kwargs)
+            name = getattr(app, "instance_name", None) or "app"
+            tracer.add_span("load %s" % name, start, time.time(), "apps")
+
+            init_app = app.init_app
+
+            def traced_init_app():
+                with tracer.span("init %s" % name, "apps"):
+                    return init_app()
+
+            app.init_app = traced_init_app
+            return app
+
+        application.get_application = traced_get_application
+        self._untraced_get_application = get_application
+
+    def __untrace_app_loading(self):
+        get_application = getattr(self, "_untraced_get_application", None)
+        if get_application is not None:
+            from tank.platform import application
+
+            application.get_application = get_application
+            self._untraced_get_application = None
+
+    def hook_logger(self, name):
+        """
+        Returns the :class:`HookLogger` of a hook, logging as a child of the
+        engine logger at the level set for it in the ``hook_log_levels``
+        setting.
+
+        :param str name: Name of the hook, usually the app it belongs to, ie.
+            "tk-multi-breakdown".
+        """
+        loggers = getattr(self, "_hook_loggers", None)
+        if loggers is None:
+            loggers = self._hook_loggers = {}
+        log = loggers.get(name)
+        if log is None:
+            tk_fusion = self.import_module("tk_fusion")
+            log = loggers[name] = tk_fusion.HookLogger(
+                self.logger.getChild(name),
+                level=(self.get_setting("hook_log_levels") or {}).get(name),
+                samples=self.get_setting("hook_log_samples", 10),
+            )
+        return log
+
+    @contextlib.contextmanager
+    def operation(self, name, comp=None):
+        """
+        Scopes an engine operation, ie. a hook entry point such as a
+        breakdown scan or a publish.
+
+        Comp and tool attributes read through :meth:`get_comp_attr` or the
+        yielded :class:`CompAttrCache` are cached until the outermost
+        operation ends. Nested operations share the outer one's cache.
+
+        :param str name: Name of the operation, used for logging.
+        :param comp: Composition the operation works on, defaults to the
+            current one.
+        """
+        outer = getattr(self, "_attr_cache", None)
+        if outer is not None:
+            yield outer
+            return
+
+        tk_fusion = self.import_module("tk_fusion")
+        if comp is None:
+            comp = self.get_current_comp()
+        cache = tk_fusion.CompAttrCache(comp, self.logger)
+        self._attr_cache = cache
+        # reported by the stall watchdog
+        self._operation_name = name
+
+        stats = self.rpc_stats
+        if stats is not None:
+            stats.reset()
+        recorder = getattr(self, "_rpc_recorder", None)
+        if recorder is not None:
+            recorder.mark(name, "start")
+
+        # the artist may have changed the comp since the last operation
+        if getattr(self, "_tool_index", None) is not None:
+            self._tool_index.invalidate()
+        try:
+            yield cache
+        finally:
+            self._attr_cache = None
+            self._operation_name = None
+            self.logger.debug("Operation '%s' %s", name, cache.summary())
+            if stats is not None:
+                report = stats.report("Operation '%s'" % name, limit=15)
+                self._rpc_reports.append(report)
+                self.logger.info(report)
+            if recorder is not None:
+                recorder.mark(name, "end")
+
+    @property
+    def attr_cache(self):
+        """
+        The :class:`CompAttrCache` of the running operation or None.
+        """
+        return getattr(self, "_attr_cache", None)
+
+    @property
+    def tool_index(self):
+        """
+        The :class:`ToolIndex` of the current comp, (re)built with a single
+        bulk query when stale. It is marked stale at the start of every
+        operation, so within an operation lookups never reach Fusion.
+        """
+        index = getattr(self, "_tool_index", None)
+        if index is None:
+            tk_fusion = self.import_module("tk_fusion")
+            index = self._tool_index = tk_fusion.ToolIndex(self.logger)
+
+        # outside of an operation nothing tells us about the comp changes,
+        # the engine and hook code using it runs in operations
+        if index.stale or self.attr_cache is None:
+            cache = self.attr_cache
+            comp = cache.comp if cache is not None else self.get_current_comp()
+            index.build(comp)
+        return index
+
+    def get_comp_attr(self, key, comp=None):
+        """
+        Returns a comp attribute, served from the operation cache when an
+        operation on that comp is running.
+
+        :param str key: Attribute name, ie. "COMPS_FileName".
+        :param comp: Composition to query, defaults to the current one.
+        """
+        cache = self.attr_cache
+        if cache is not None and (
+            comp is None or comp is cache.comp or comp == cache.comp
+        ):
+            return cache.comp_attr(key)
+
+        if comp is None:
+            comp = self.get_current_comp()
+        return comp.GetAttrs(key)
+
+    def save_comp(self, path=None, comp=None):
+        """
+        Saves the comp and lets the running operation know about it.
+
+        :param str path: Path to save to, defaults to the current comp path.
+        :param comp: Composition to save, defaults to the current one.
+        """
+        cache = self.attr_cache
+        if comp is None:
+            comp = cache.comp if cache is not None else self.get_current_comp()
+
+        if path:
+            result = comp.Save(path)
+        else:
+            result = comp.Save()
+
+        if cache is not None:
+            cache.notify("Comp_Save")
+        return result
+
+    def tool_writer(self, undo_name="ShotGrid", comp=None):
+        """
+        Returns a :class:`ToolWriter` queueing tool writes to apply them in a
+        single round trip to Fusion, inside one undo block.
+
+        :param str undo_name: Name of the undo block shown in Fusion.
+        :param comp: Composition to write to, defaults to the current one.
+        """
+        if comp is None:
+            cache = self.attr_cache
+            comp = cache.comp if cache is not None else self.get_current_comp()
+        tk_fusion = self.import_module("tk_fusion")
+        return tk_fusion.ToolWriter(comp, self.logger, undo_name)
+
+    def query_tools(
+        self, tool_types=None, attrs=(), data_keys=(), positions=False, comp=None
+    ):
+        """
+        Fetches attributes, data and flow positions of many tools in a single
+        round trip to Fusion. See :func:`tk_fusion.bulk_query.query_tools`.
+
+        :param tool_types: List of tool types or None for all the tools.
+        :param attrs: Names of the tool attributes to return.
+        :param data_keys: Names of the tool data keys to return.
+        :param bool positions: Whether to return the flow view positions.
+        :param comp: Composition to query, defaults to the current one.
+        :returns: Dictionary of tool information keyed by tool name.
+        """
+        if comp is None:
+            comp = self.get_current_comp()
+        tk_fusion = self.import_module("tk_fusion")
+        return tk_fusion.query_tools(
+            comp,
+            tool_types=tool_types,
+            attrs=attrs,
+            data_keys=data_keys,
+            positions=positions,
+        )
+
     @property
     def context_change_allowed(self):
         """
@@ -183,7 +646,7 @@ class FusionEngine(Engine):
 
         host_info = {"name": "Fusion", "version": "unknown"}
         try:
-            fusion_ver = fusion.Version
+            fusion_ver = self.fusion.Version
             host_info["version"] = fusion_ver
         except:
             # Fallback to 'Fusion' initialized above
@@ -226,6 +689,25 @@ class FusionEngine(Engine):
         Runs after the engine is set up but before any apps have been
         initialized.
         """
+        tk_fusion = self.import_module("tk_fusion")
+        self._log_sink = tk_fusion.ConsoleLogSink(self.async_execute_in_main_thread)
+        if self.get_setting("log_file", True):
+            try:
+                self._log_writer = tk_fusion.AsyncFileLogWriter(
+                    os.path.join(LogManager().log_folder, "tk-fusion_engine.log"),
+                    max_bytes=self.get_setting("log_file_max_mb", 10) * 1024 * 1024,
+                    backup_count=self.get_setting("log_file_backups", 5),
+                )
+            except Exception as e:
+                self.logger.warning("Couldn't start the engine log file: %s", e)
+
+        with self._startup_span("pre_app_init"):
+            self.__pre_app_init()
+        # the apps are loaded by toolkit between pre and post_app_init
+        self._apps_load_start = time.time()
+        self.__trace_app_loading()
+
+    def __pre_app_init(self):
         # unicode characters returned by the shotgun api need to be converted
         # to display correctly in all of the app windows
         from tank.platform.qt import QtCore
@@ -248,7 +730,9 @@ class FusionEngine(Engine):
                                  " Supported platforms "
                                  "are Mac, Linux 64 and Windows 64.")
 
-        fusion_build_version = str(fusion.Version)
+        fusion_build_version = str(self.fusion.Version)
+        if self.startup_tracer is not None:
+            self.startup_tracer.metadata["fusion_version"] = fusion_build_version
         fusion_ver = float(".".join(fusion_build_version.split(".")[:2]))
 
         if fusion_ver < 9.0:
@@ -307,7 +791,8 @@ class FusionEngine(Engine):
                 os.environ["SHOTGUN_SKIP_QTWEBENGINEWIDGETS_IMPORT"] = "1"
 
         # add qt paths and dlls
-        self._init_pyside()
+        with self._startup_span("init_pyside"):
+            self._init_pyside(fusion_build_version)
 
         # default menu name is Shotgun but this can be overriden
         # in the configuration to be Sgtk in case of conflicts
@@ -352,10 +837,24 @@ class FusionEngine(Engine):
         # only create the shotgun menu if not in batch mode and menu doesn't
         # already exist
         if self.has_ui:
+            # the panel lives as long as the engine, after a context change
+            # it only updates the buttons of the commands that changed
+            menu_generator = getattr(self, "menu_generator", None)
+            if menu_generator is not None:
+                try:
+                    menu_generator.refresh()
+                    menu_generator.show()
+                    return True
+                except RuntimeError:
+                    # the widget was deleted, ie. when Fusion closed it
+                    self.logger.debug("Menu panel deleted, creating a new one")
+                    self.menu_generator = None
+
             # create our menu handler
             tk_fusion = self.import_module("tk_fusion")
 
             self.menu_generator = tk_fusion.ShotgunMenu(self, self.icon_256)
+            self.widget_registry.register(self.menu_generator, "engine", "ShotgunMenu")
             self.menu_generator.show()
 
             return True
@@ -385,18 +884,120 @@ class FusionEngine(Engine):
         """
         Called when all apps have initialized
         """
-        self._initialise_qapplication()
+        tracer = self.startup_tracer
+        apps_load_start = getattr(self, "_apps_load_start", None)
+        if tracer is not None and apps_load_start is not None:
+            tracer.add_span("load_apps", apps_load_start, time.time())
+        self.__untrace_app_loading()
+
+        with self._startup_span("initialise_qapplication"):
+            self._initialise_qapplication()
+        self.__start_stall_watchdog()
 
         # for some readon this engine command get's lost so we add it back
         self.__register_reload_command()
-        # Run a series of app instance commands at startup.
-        self._run_app_instance_commands()
+        # Run a series of app instance commands at startup, the deferred ones
+        # run once the menu is shown.
+        with self._startup_span("run_app_instance_commands"):
+            scheduler = self._run_app_instance_commands()
 
         # create the floating menu
-        self.create_shotgrid_menu()
+        with self._startup_span("create_shotgrid_menu"):
+            self.create_shotgrid_menu()
+
+        self.write_startup_trace()
+        scheduler.run_deferred()
+        self.__start_prewarm()
 
         # self._qt_app.exec_()
 
+    def __start_prewarm(self):
+        """
+        Starts the :class:`Prewarmer` of the current context once the events
+        pending, ie. the deferred startup commands, are processed.
+        """
+        if self.prewarm_cache is None:
+            return
+        from sgtk.platform.qt import QtCore
+
+        QtCore.QTimer.singleShot(0, self.__prewarm)
+
+    def __prewarm(self):
+        self.__stop_prewarm()
+        # the work templates of the apps, ie. workfiles and snapshot
+        work_templates = []
+        for setting in ("template_work", "template_work_area"):
+            for app in self.apps.values():
+                template = self.sgtk.templates.get(app.get_setting(setting) or "")
+                if template is not None and template not in work_templates:
+                    work_templates.append(template)
+
+        tk_fusion = self.import_module("tk_fusion")
+        self._prewarmer = tk_fusion.Prewarmer(
+            self.sgtk,
+            self.context,
+            self.prewarm_cache,
+            work_templates=work_templates,
+            logger=self.logger,
+        )
+        self._prewarmer.start()
+
+    def __stop_prewarm(self):
+        if getattr(self, "_prewarmer", None) is not None:
+            self._prewarmer.stop()
+            self._prewarmer = None
+
+    def __start_stall_watchdog(self):
+        """
+        Starts the :class:`StallWatchdog`, fed by a timer of the main thread
+        event loop, unless the ``stall_watchdog_ms`` setting is 0.
+        """
+        threshold = self.get_setting("stall_watchdog_ms", 2000)
+        if not threshold:
+            return
+        from sgtk.platform.qt import QtCore
+
+        tk_fusion = self.import_module("tk_fusion")
+        self._stall_watchdog = tk_fusion.StallWatchdog(
+            LogManager().log_folder,
+            threshold=threshold / 1000.0,
+            context=self.__stall_context,
+            logger=self.logger,
+        )
+        self._stall_timer = self.widget_registry.register(QtCore.QTimer(), "engine")
+        self._stall_timer.timeout.connect(self._stall_watchdog.beat)
+        self._stall_timer.start(max(50, threshold // 4))
+        self._stall_watchdog.start()
+
+    def __stall_context(self):
+        """
+        What the engine is doing, for the stall reports. Runs in the watchdog
+        thread while the main thread is stalled, so it only reads attributes.
+        """
+        context = {
+            "operation": getattr(self, "_operation_name", None) or "none",
+            "context": str(self.context),
+        }
+        comp_lock = getattr(self, "_comp_lock", None)
+        if comp_lock is not None and comp_lock.depth:
+            context["comp_lock"] = "held for %.1fs, depth %s" % (
+                comp_lock.held_for,
+                comp_lock.depth,
+            )
+        return context
+
+    def pre_context_change(self, old_context, new_context):
+        """
+        Runs before a context change. The apps are destroyed and created
+        again for the new context, so the pooled dialogs are closed.
+
+        :param old_context: The context being changed away from.
+        :param new_context: The new context being changed to.
+        """
+        if getattr(self, "_dialog_pool", None) is not None:
+            self._dialog_pool.clear()
+        self.__stop_prewarm()
+
     def post_context_change(self, old_context, new_context):
         """
         Runs after a context change. The Fusion event watching will be stopped
@@ -406,6 +1007,18 @@ class FusionEngine(Engine):
         :param new_context: The new context being changed to.
         """
 
+        # the dialogs closed in the previous context are deleted, the open
+        # ones are kept
+        self.widget_registry.prune_dialogs(self.created_qt_dialogs)
+        self.widget_registry.teardown("context")
+        self.__start_prewarm()
+
+        # a context change usually means another comp was opened or saved
+        if self.attr_cache is not None:
+            self.attr_cache.notify("Comp_Activate")
+        if getattr(self, "_tool_index", None) is not None:
+            self._tool_index.notify("Comp_Activate")
+
         # restore the open log folder, it get's removed whenever the first time
         # a context is changed
         self.__register_open_log_folder_command()
@@ -413,6 +1026,7 @@ class FusionEngine(Engine):
 
         if self.get_setting("automatic_context_switch", True):
             # TODO check how to add instance in fusion
+            fusion = self.fusion
             if 'shotgun' in dir(fusion):
                 fusion.shotgun._engine_instance = self.instance_name
                 fusion.shotgun._menu_name = self._menu_name
@@ -431,7 +1045,23 @@ class FusionEngine(Engine):
         """
         Runs the series of app instance commands listed in the
         'run_at_startup' setting of the environment configuration yaml file.
+
+        Commands run in order of ``priority``, after the commands listed in
+        their ``depends_on``. The ones with ``defer_until_idle`` are left to
+        :meth:`StartupScheduler.run_deferred`, called once the menu is shown.
+
+        :returns: The :class:`StartupScheduler`.
         """
+        from sgtk.platform.qt import QtCore
+
+        tk_fusion = self.import_module("tk_fusion")
+        scheduler = tk_fusion.StartupScheduler(
+            self.logger,
+            post=QtCore.QTimer.singleShot,
+            span=lambda label: self._startup_span(label, "commands"),
+            on_finished=self.__trace_deferred_commands,
+        )
+        self._startup_scheduler = scheduler
 
         # Build a dictionary mapping app instance names to dictionaries of
         # commands they registered with the engine.
@@ -445,7 +1075,7 @@ class FusionEngine(Engine):
                     app_instance.instance_name, {})
                 cmd_dict[cmd_name] = value["callback"]
 
-        # Run the series of app instance commands listed in the
+        # Schedule the series of app instance commands listed in the
         # 'run_at_startup' setting.
         for app_setting_dict in self.get_setting("run_at_startup", []):
             app_instance_name = app_setting_dict["app_instance"]
@@ -462,34 +1092,60 @@ class FusionEngine(Engine):
                     "%s configuration setting 'run_at_startup' requests app"
                     " '%s' that is not installed.",
                     self.name, app_instance_name)
+                continue
+
+            if not setting_cmd_name:
+                # Run all commands of the given app instance.
+                cmd_names = list(cmd_dict)
+            elif setting_cmd_name in cmd_dict:
+                # Run the command whose name is listed in the
+                # 'run_at_startup' setting.
+                cmd_names = [setting_cmd_name]
             else:
-                if not setting_cmd_name:
-                    # Run all commands of the given app instance.
-                    for cmd_name, command_function in cmd_dict.items():
-                        msg = ("%s startup running app '%s' command '%s'.",
-                               self.name, app_instance_name, cmd_name)
-                        self.logger.debug(msg)
-
-                        command_function()
-                else:
-                    # Run the command whose name is listed in the
-                    # 'run_at_startup' setting.
-                    command_function = cmd_dict.get(setting_cmd_name)
-                    if command_function:
-                        msg = ("%s startup running app '%s' command '%s'.",
-                               self.name, app_instance_name, setting_cmd_name)
-                        self.logger.debug(msg)
-
-                        command_function()
-                    else:
-                        known_commands = ', '.join(
-                            "'%s'" % name for name in cmd_dict)
-                        self.logger.warning(
-                            "%s configuration setting 'run_at_startup' "
-                            "requests app '%s' unknown command '%s'. "
-                            "Known commands: %s",
-                            self.name, app_instance_name,
-                            setting_cmd_name, known_commands)
+                known_commands = ", ".join(
+                    "'%s'" % name for name in cmd_dict)
+                self.logger.warning(
+                    "%s configuration setting 'run_at_startup' "
+                    "requests app '%s' unknown command '%s'. "
+                    "Known commands: %s",
+                    self.name, app_instance_name,
+                    setting_cmd_name, known_commands)
+                continue
+
+            for cmd_name in cmd_names:
+                scheduler.add(
+                    app_instance_name,
+                    cmd_name,
+                    cmd_dict[cmd_name],
+                    priority=app_setting_dict.get("priority", 0),
+                    defer_until_idle=app_setting_dict.get("defer_until_idle", False),
+                    depends_on=app_setting_dict.get("depends_on"),
+                )
+
+        scheduler.run_now()
+        return scheduler
+
+    def __trace_deferred_commands(self):
+        """
+        Adds the deferred startup commands to the startup trace, they run
+        after it was written.
+        """
+        tracer = self.startup_tracer
+        deferred = [
+            command
+            for command in self._startup_scheduler.commands
+            if command.defer_until_idle and command.duration is not None
+        ]
+        if tracer is None or not deferred:
+            return
+        for command in deferred:
+            tracer.add_span(
+                command.label,
+                command.started,
+                command.started + command.duration,
+                "deferred commands",
+            )
+        self.write_startup_trace()
 
     def destroy_engine(self):
         """
@@ -497,10 +1153,36 @@ class FusionEngine(Engine):
         TODO: restore and preserve the existing ones.
         """
         self.logger.debug("%s: Destroying...", self)
+        self.logger.debug(
+            "Fusion connections set up during this session: %s",
+            self.fusion_connection.connection_count,
+        )
+        if getattr(self, "_rpc_recorder", None) is not None:
+            self._rpc_recorder.close()
+        if getattr(self, "_log_sink", None) is not None:
+            # write what is left, there won't be another event loop tick
+            self._log_sink.flush()
+        if getattr(self, "_stall_watchdog", None) is not None:
+            self._stall_timer.stop()
+            self._stall_watchdog.stop()
+            self._stall_watchdog = None
+        self.__stop_prewarm()
+        if getattr(self, "_log_writer", None) is not None:
+            self.logger.debug("Engine log file: %s", dict(self._log_writer.stats))
+            self._log_writer.close()
+            self._log_writer = None
 
         try:
-            # self.close_windows()
-            self.menu_generator.deleteLater()
+            if getattr(self, "_dialog_pool", None) is not None:
+                self._dialog_pool.clear()
+                self._dialog_pool = None
+            self.close_windows()
+            # the menu panel and the engine timers
+            registry = self.widget_registry
+            registry.prune_dialogs(self.created_qt_dialogs)
+            for scope in registry.SCOPES:
+                registry.teardown(scope)
+            self.menu_generator = None
         except Exception as e:
             self.logger.error(
                 f"Error closing menu: {e}, full traceback:\n{traceback.format_exc()}",
@@ -514,14 +1196,51 @@ class FusionEngine(Engine):
         # in the first place
         # self._restore_cacert_file()
 
-    def _init_pyside(self):
+    def _init_pyside(self, fusion_version=None):
         """
         Handles the pyside init
+
+        The binding that imported, and the folder added to ``sys.path`` for
+        it, are cached per Fusion version and interpreter, see
+        :class:`QtBindingCache`, so later launches import it directly.
+
+        :param str fusion_version: Version of the running Fusion.
         """
 
+        def import_binding(name):
+            # the binding only works if its QtGui imports
+            importlib.import_module(name + ".QtGui")
+            return sys.modules[name]
+
+        desktop_site_packages = self.__desktop_site_packages()
+        tk_fusion = self.import_module("tk_fusion")
+        cache = tk_fusion.QtBindingCache(
+            fusion_version,
+            [desktop_site_packages] if desktop_site_packages else [],
+            logger=self.logger,
+        )
+
+        entry = cache.load()
+        if entry:
+            if entry["sys_path"] and entry["sys_path"] not in sys.path:
+                sys.path.append(entry["sys_path"])
+            try:
+                import_binding(entry["binding"])
+            except Exception as e:
+                self.logger.debug(
+                    "Cached Qt binding %s didn't import, probing again: %s",
+                    entry["binding"], e
+                )
+                cache.clear()
+            else:
+                self.logger.debug(
+                    "%s imported from the Qt binding cache.", entry["binding"]
+                )
+                return
+
         # first see if pyside2 is present
         try:
-            from PySide6 import QtGui
+            PySide6 = import_binding("PySide6")
         except:
             # fine, we don't expect PySide6 to be present just yet
             self.logger.debug("PySide6 not detected - trying for PySide now...")
@@ -530,11 +1249,12 @@ class FusionEngine(Engine):
             self.logger.debug(
                 "PySide6 detected - the existing version will be used."
             )
+            cache.save("PySide6", PySide6)
             return
 
         # then see if pyside2 is present
         try:
-            from PySide2 import QtGui
+            PySide2 = import_binding("PySide2")
         except:
             # must be that a PySide2 version is not installed,
             self.logger.debug(
@@ -545,35 +1265,18 @@ class FusionEngine(Engine):
             self.logger.debug(
                 "PySide2 detected - the existing version will be used."
             )
+            cache.save("PySide2", PySide2)
             return
 
-        current_os = sys.platform.lower()
-        if current_os == "darwin":
-            desktop_path = os.environ.get("SHOTGUN_DESKTOP_INSTALL_PATH",
-                                          "/Applications/Shotgun.app")
-            sys.path.append(os.path.join(desktop_path, "Contents", "Resources",
-                                         "Python", "lib", "python2.7",
-                                         "site-packages"))
-
-        elif current_os == "win32":
-            desktop_path = os.environ.get("SHOTGUN_DESKTOP_INSTALL_PATH",
-                                          "C:/Program Files/Shotgun")
-            sys.path.append(os.path.join(desktop_path,
-                                         "Python", "Lib", "site-packages"))
-
-        elif current_os == "linux2":
-            desktop_path = os.environ.get("SHOTGUN_DESKTOP_INSTALL_PATH",
-                                          "/opt/Shotgun/Shotgun")
-            sys.path.append(os.path.join(desktop_path,
-                                         "Python", "Lib", "site-packages"))
-
-
+        if desktop_site_packages:
+            sys.path.append(desktop_site_packages)
         else:
             self.logger.error("Unknown platform - cannot initialize PySide!")
 
         # now try to import it
+        cached = False
         try:
-            from PySide6 import QtGui
+            PySide6 = import_binding("PySide6")
         except Exception as e:
             self.logger.error(
                 "PySide6 could not be imported! Apps using pyside will not "
@@ -581,8 +1284,11 @@ class FusionEngine(Engine):
                     e, traceback.format_exc()
                 )
             )
+        else:
+            cache.save("PySide6", PySide6, desktop_site_packages)
+            cached = True
         try:
-            from PySide2 import QtGui
+            PySide2 = import_binding("PySide2")
         except Exception as e:
             self.logger.error(
                 "PySide2 could not be imported! Apps using pyside will not "
@@ -590,6 +1296,122 @@ class FusionEngine(Engine):
                     e, traceback.format_exc()
                 )
             )
+        else:
+            if not cached:
+                cache.save("PySide2", PySide2, desktop_site_packages)
+
+    def __desktop_site_packages(self):
+        """
+        Returns the site-packages folder of the Shotgun desktop install
+        searched for PySide, or None on an unknown platform.
+        """
+        current_os = sys.platform.lower()
+        if current_os == "darwin":
+            desktop_path = os.environ.get("SHOTGUN_DESKTOP_INSTALL_PATH",
+                                          "/Applications/Shotgun.app")
+            return os.path.join(desktop_path, "Contents", "Resources",
+                                "Python", "lib", "python2.7",
+                                "site-packages")
+
+        elif current_os == "win32":
+            desktop_path = os.environ.get("SHOTGUN_DESKTOP_INSTALL_PATH",
+                                          "C:/Program Files/Shotgun")
+            return os.path.join(desktop_path,
+                                "Python", "Lib", "site-packages")
+
+        elif current_os == "linux2":
+            desktop_path = os.environ.get("SHOTGUN_DESKTOP_INSTALL_PATH",
+                                          "/opt/Shotgun/Shotgun")
+            return os.path.join(desktop_path,
+                                "Python", "Lib", "site-packages")
+
+        return None
+
+    def show_dialog(self, title, bundle, widget_class, *args, **kwargs):
+        """
+        Shows a non-modal dialog. The dialogs of the apps listed by the
+        'dialog_pool_apps' setting are kept by the :class:`DialogPool` once
+        closed. The pooled dialog, found by app instance, widget class and
+        title, is reset by the 'dialog_pool_hook' and shown again instead of
+        being built from scratch, or built again when the hook can't reset it.
+
+        :returns: The widget of the dialog.
+        """
+        pool = self.dialog_pool
+        if pool is None or bundle.name not in self.get_setting("dialog_pool_apps", []):
+            return super(FusionEngine, self).show_dialog(
+                title, bundle, widget_class, *args, **kwargs
+            )
+
+        start = time.time()
+        key = (
+            bundle.instance_name,
+            "%s.%s" % (widget_class.__module__, widget_class.__name__),
+            title,
+        )
+        item = pool.get(key)
+        if item is not None:
+            dialog, widget = item
+            try:
+                reset = self.execute_hook_method(
+                    "dialog_pool_hook",
+                    "reset",
+                    app=bundle,
+                    widget=widget,
+                    args=args,
+                    kwargs=kwargs,
+                )
+            except Exception as e:
+                self.logger.warning("Could not reset the '%s' dialog: %s", title, e)
+                reset = False
+            if reset:
+                dialog.show()
+                dialog.raise_()
+                dialog.activateWindow()
+                self.logger.debug(
+                    "Showed the pooled '%s' dialog in %.3fs", title, time.time() - start
+                )
+                return widget
+            # stale, it is built again
+            pool.evict(key)
+
+        widget = super(FusionEngine, self).show_dialog(
+            title, bundle, widget_class, *args, **kwargs
+        )
+        pool.add(key, widget.window(), widget)
+        self.logger.debug(
+            "Built the '%s' dialog in %.3fs, kept in the dialog pool",
+            title,
+            time.time() - start,
+        )
+        return widget
+
+    def _create_dialog(self, title, bundle, widget, parent):
+        """
+        Creates a toolkit dialog and registers it with the
+        :class:`WidgetRegistry`. It is deleted once finished, unless the
+        :class:`DialogPool` keeps it, or with the engine.
+        """
+        dialog = super(FusionEngine, self)._create_dialog(
+            title, bundle, widget, parent
+        )
+        self.widget_registry.register(dialog, "engine", title)
+        dialog.finished.connect(
+            functools.partial(self.__release_dialog, weakref.ref(dialog))
+        )
+        return dialog
+
+    def __release_dialog(self, dialog_ref, *args):
+        """
+        Deletes a finished dialog, so the registry doesn't keep it alive.
+        """
+        dialog = dialog_ref()
+        if dialog is None:
+            return
+        pool = getattr(self, "_dialog_pool", None)
+        if pool is not None and pool.holds(dialog):
+            return
+        self.widget_registry.release(dialog, "engine")
 
     def _get_dialog_parent(self):
         """
@@ -623,6 +1445,19 @@ class FusionEngine(Engine):
         :param record: Standard python logging record.
         :type record: :class:`~python.logging.LogRecord`
         """
+        writer = getattr(self, "_log_writer", None)
+        if writer is not None:
+            # only queues the record, the file is written by another thread
+            writer.handle(record)
+
+        # The sink formats the records and writes them to the Fusion script
+        # editor in batches, from the main thread. It exists once the engine
+        # can import its modules.
+        sink = getattr(self, "_log_sink", None)
+        if sink is not None:
+            sink.emit(record)
+            return
+
         # Give a standard format to the message:
         #     Shotgrid <basename>: <message>
         # where "basename" is the leaf part of the logging record name,
@@ -695,13 +1530,19 @@ class FusionEngine(Engine):
             Update all the saver nodes in the comp.
             Only if the path correspond to a template.
         """
+        # the comp attributes and the tool index are read once
+        with self.operation("update_nodes_version"):
+            return self.__update_savers_version(work_path)
+
+    def __update_savers_version(self, work_path):
         result = {
             "errors": [],
         }
-        self.logger.info("Updating saver nodes version...".ljust(80, "-"))
-        comp = fusion.GetCurrentComp()
+        log = self.hook_logger("savers")
+        log.info("Updating saver nodes version...".ljust(80, "-"))
+        comp = self.get_current_comp()
         if not work_path:
-            work_path = comp.GetAttrs()['COMPS_FileName']
+            work_path = self.get_comp_attr("COMPS_FileName", comp)
 
         if not work_path:
             error = "Couldn't get work path from comp or from args"
@@ -709,7 +1550,7 @@ class FusionEngine(Engine):
             self.logger.error(error)
             return result
 
-        work_template = self.sgtk.template_from_path(work_path)
+        work_template = self.template_from_path(work_path)
         if not work_template:
             error = f"Couldn't get a fusion work template from work path: {work_path}"
             result["errors"].append(error)
@@ -718,128 +1559,146 @@ class FusionEngine(Engine):
 
         work_fields   = work_template.get_fields(work_path)
 
-        while not comp.GetAttrs()["COMPB_Locked"]:
-            comp.Lock()
-
-        # by using False as first argument, we are collecting all of the saver nodes,
-        # not just the selected ones
-        dict_of_tools = comp.GetToolList(False, "Saver")
-        self.logger.info(f"dict_of_tools:\n{(pf(dict_of_tools))}")
-
-        # Ensure the collected saver nodes have the newer metadata key
-        # "Shotgrid_Saver_Node" and not just the old one "Shotgun_Saver_Node"
-        self.__update_saver_metadata(dict_of_tools)
-
-        invalid_paths = {
-            "empty": [],
-            "no_matching_template": [],
-            "no_version_token": [],
-            "missing_keys": [],
-        }
-
-        for index, tool in dict_of_tools.items():
-            self.logger.info(f"Working on saver: {tool.Name}".ljust(40, "-"))
-            paths = list(tool.GetAttrs()['TOOLST_Clip_Name'].values())
-
-            if paths:
-                clip_path = paths[0]
-            else:
-                clip_path = None
-
-            # If saver path is empty
-            if clip_path in [None, "", " "]:
-                self.logger.warning(
-                    f"Saver '{tool.Name}' has an invalid path, skipping: {clip_path}"
-                )
-
-                try:
-                    tool.SetAttrs({"TOOLB_PassThrough": True})
-                    self.logger.info(f"Saver '{tool.Name}' has bneen disabled.")
-                except Exception as e:
-                    self.logger.exception(f"Failed to disable saver '{tool.Name}': {e}")
-
-                invalid_paths["empty"].append({tool.Name: clip_path})
-                continue
-
-            is_sg_saver = tool.GetData("Shotgrid_Saver_Node")
-            fields = None
-            current_template = None
-            new_render_path = None
-
-            # Validating metadata
-            if is_sg_saver:
-                template_name = tool.GetData("Current_template")
-                current_template = self.sgtk.templates[template_name]
-            # If the user created the saver manually, we might be able to still get the
-            # template from the node path, if it matches with one of the valid templates
-            else:
-                current_template = self.sgtk.template_from_path(clip_path)
-
-            # Avoid savers out of the pipeline
-            if not current_template:
-                self.logger.warning(
-                    (
-                        f"Saver '{tool.Name}' has an invalid path that doesn't match "
-                        f"any template, skipping: {clip_path}"
-                    )
-                )
-                invalid_paths["no_matching_template"].append({tool.Name: clip_path})
-                continue
-
-            fields = current_template.get_fields(clip_path)
+        with self.comp_lock(comp):
+            # all of the saver nodes, not just the selected ones, with their clip
+            # path and pipeline metadata, from the tool index
+            tool_index = self.tool_index
+            # the saver writes are applied in a single round trip before saving
+            writer = self.tool_writer("Update savers", comp)
+            new_paths = {}
+            savers = tool_index.by_type("Saver")
+            log.debug("savers:\n%s", log.pformat(savers))
+
+            # Ensure the collected saver nodes have the newer metadata key
+            # "Shotgrid_Saver_Node" and not just the old one "Shotgun_Saver_Node"
+            self.__update_saver_metadata(savers)
+
+            invalid_paths = {
+                "empty": [],
+                "no_matching_template": [],
+                "no_version_token": [],
+                "missing_keys": [],
+            }
 
-            # Checking if the template use a version token
-            if not 'version' in fields.keys():
-                self.logger.warning(
-                    (
-                        f"Saver '{tool.Name}' doesn't use a version token, skipping: "
-                        f"{clip_path}\n"
-                        f"Available fields for this path:\n{pf(fields)}"
+            # the messages of the first savers only, there may be hundreds
+            with log.sampled("Updating savers") as sampled:
+                for saver in savers:
+                    tool_name = saver.name
+                    sampled.debug("Working on saver: %s", tool_name)
+                    clip_path = saver.clip_path
+
+                    # If saver path is empty
+                    if clip_path in [None, "", " "]:
+                        log.warning(
+                            "Saver '%s' has an invalid path, skipping: %s", tool_name, clip_path
+                        )
+
+                        writer.set_attrs(tool_name, {"TOOLB_PassThrough": True})
+
+                        invalid_paths["empty"].append({tool_name: clip_path})
+                        continue
+
+                    is_sg_saver = saver.data.get("Shotgrid_Saver_Node")
+                    fields = None
+                    current_template = None
+                    new_render_path = None
+
+                    # Validating metadata
+                    if is_sg_saver:
+                        template_name = saver.data.get("Current_template")
+                        current_template = self.sgtk.templates[template_name]
+                    # If the user created the saver manually, we might be able to still get the
+                    # template from the node path, if it matches with one of the valid templates
+                    else:
+                        current_template = self.template_from_path(clip_path)
+
+                    # Avoid savers out of the pipeline
+                    if not current_template:
+                        log.warning(
+                            "Saver '%s' has an invalid path that doesn't match any "
+                            "template, skipping: %s",
+                            tool_name,
+                            clip_path,
+                        )
+                        invalid_paths["no_matching_template"].append({tool_name: clip_path})
+                        continue
+
+                    fields = current_template.get_fields(clip_path)
+
+                    # Checking if the template use a version token
+                    if not 'version' in fields.keys():
+                        log.warning(
+                            "Saver '%s' doesn't use a version token, skipping: %s\n"
+                            "Available fields for this path:\n%s",
+                            tool_name,
+                            clip_path,
+                            log.pformat(fields),
+                        )
+                        invalid_paths["no_version_token"].append({tool_name: clip_path})
+                        continue
+
+                    for tool_field in fields.keys():
+                        # Update the fields
+                        if tool_field in work_fields.keys():
+                            fields[tool_field] = work_fields[tool_field]
+
+                    # Checking for missing keys
+                    missing_keys = current_template.missing_keys(fields)
+                    if missing_keys:
+                        log.warning(
+                            "Saver '%s' has missing keys, skipping: %s\nMissing keys:\n%s",
+                            tool_name,
+                            clip_path,
+                            log.pformat(missing_keys),
+                        )
+                        invalid_paths["missing_keys"].append({tool_name: clip_path})
+                        continue
+
+                    # Updating path from current saver
+                    new_render_path = current_template.apply_fields(fields)
+                    sampled.debug(
+                        "Updating saver '%s' path from %s to %s",
+                        tool_name,
+                        clip_path,
+                        new_render_path,
                     )
+                    os.makedirs(os.path.dirname(new_render_path), exist_ok=True)
+                    writer.set_property(tool_name, "Clip", new_render_path)
+                    new_paths[tool_name] = new_render_path
+
+            failures = writer.flush()
+            for tool_name, new_render_path in new_paths.items():
+                if tool_name not in failures:
+                    tool_index.update(tool_name, clip_path=new_render_path)
+            disabled = []
+            for empty_saver in invalid_paths["empty"]:
+                tool_name = list(empty_saver.keys())[0]
+                if tool_name in failures:
+                    log.error("Failed to disable saver '%s'.", tool_name)
+                else:
+                    disabled.append(tool_name)
+            if disabled:
+                log.info(
+                    "%s savers without a path have been disabled: %s",
+                    len(disabled),
+                    ", ".join(disabled),
                 )
-                invalid_paths["no_version_token"].append({tool.Name: clip_path})
-                continue
-
-            for tool_field in fields.keys():
-                # Update the fields
-                if tool_field in work_fields.keys():
-                    fields[tool_field] = work_fields[tool_field]
-
-            # Checking for missing keys
-            missing_keys = current_template.missing_keys(fields)
-            if missing_keys:
-                self.logger.warning(
-                    (
-                        f"Saver '{tool.Name}' has missing keys, skipping: "
-                        f"{clip_path}\n"
-                        f"Missing keys:\n{pf(missing_keys)}"
-                    )
+            if failures:
+                result["errors"].append(
+                    f"The following savers couldn't be updated:\n{pf(failures)}"
                 )
-                invalid_paths["missing_keys"].append({tool.Name: clip_path})
-                continue
 
-            # Updating path from current saver
-            new_render_path = current_template.apply_fields(fields)
-            self.logger.info(
-                f"Updating saver '{tool.Name}' path from {clip_path} to {new_render_path}"
-            )
-            os.makedirs(os.path.dirname(new_render_path), exist_ok=True)
-            tool.Clip = new_render_path
-
-        comp.Save(work_path)
-
-        while comp.GetAttrs()["COMPB_Locked"]:
-            comp.Unlock()
+            self.save_comp(work_path, comp)
 
         if any(invalid_paths.values()):
             warning = f"The following savers couldn't be updated:\n{pf(invalid_paths)}"
-            self.logger.warning(warning)
+            log.warning(warning)
             result["errors"].append(warning)
-        self.logger.info('Nodes update complete')
+        log.info("Nodes update complete")
 
         return result
 
-    def __update_saver_metadata(self, all_savers={}):
+    def __update_saver_metadata(self, all_savers=None):
         """
         Updates the saver nodes metadata to the new "Shotgrid_Saver_Node" key.
 
@@ -849,30 +1708,34 @@ class FusionEngine(Engine):
 
         It iterates over all saver nodes in the composition, checks if the saver node
         has the old key, and if it does, updates it to the new key.
+
+        :param all_savers: List of saver :class:`ToolRecord`, taken from the tool
+            index when not provided.
         """
-        comp = fusion.GetCurrentComp()
+        comp = self.get_current_comp()
 
         if not all_savers:
-            all_savers = comp.GetToolList(False, "Saver")
-
-        while not comp.GetAttrs()["COMPB_Locked"]:
-            comp.Lock()
-
-        for i, saver in all_savers.items():
-            self.logger.info(f"Working on saver {i}: {saver.Name}".ljust(60, "."))
-            is_sg_saver_old = saver.GetData("Shotgun_Saver_Node")
-            is_sg_saver_new = saver.GetData("Shotgrid_Saver_Node")
-
-            if is_sg_saver_old:
-                if is_sg_saver_new is not None:
-                    saver.SetData("Shotgrid_Saver_Node", is_sg_saver_old)
-                    self.logger.info("Updated Shotgrid saver node.")
+            all_savers = self.tool_index.by_type("Saver")
+
+        log = self.hook_logger("savers")
+        with self.comp_lock(comp), log.sampled("Updating saver metadata") as sampled:
+            writer = self.tool_writer("Update saver metadata", comp)
+            for i, saver in enumerate(all_savers, 1):
+                sampled.debug("Working on saver %s: %s", i, saver.name)
+                is_sg_saver_old = saver.data.get("Shotgun_Saver_Node")
+                is_sg_saver_new = saver.data.get("Shotgrid_Saver_Node")
+
+                if is_sg_saver_old:
+                    if is_sg_saver_new is not None:
+                        writer.set_data(
+                            saver.name, "Shotgrid_Saver_Node", is_sg_saver_old
+                        )
+                        saver.data["Shotgrid_Saver_Node"] = is_sg_saver_old
+                        sampled.debug("Queued Shotgrid saver node update.")
+                    else:
+                        sampled.debug("Shotgrid saver node already updated.")
                 else:
-                    self.logger.info("Shotgrid saver node already updated.")
-            else:
-                self.logger.warning("Saver is not a fusion saver, skipping...")
-
-        comp.Save()
+                    sampled.debug("Saver %s is not a Shotgrid saver, skipping", saver.name)
 
-        while comp.GetAttrs()["COMPB_Locked"]:
-            comp.Unlock()
+            writer.flush()
+            self.save_comp(comp=comp)
@@ -0,0 +1,42 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+from tank import Hook
+
+
+class DialogPoolHook(Hook):
+    """
+    Resets the pooled dialogs of the apps listed by the engine
+    'dialog_pool_apps' setting before they are shown again.
+
+    Override it in the configuration for the app versions used, ie. to start
+    a new collection in the publisher or to compute the next version in the
+    workfiles save dialog.
+    """
+
+    def reset(self, app, widget, args, kwargs):
+        """
+        Brings a pooled dialog back to the state of a new one.
+
+        :param app: The app showing the dialog.
+        :param widget: The widget of the pooled dialog, built by an earlier
+            ``show_dialog`` call.
+        :param tuple args: Arguments of this ``show_dialog`` call for the
+            widget class.
+        :param dict kwargs: Keyword arguments of this ``show_dialog`` call.
+        :returns: True when the widget was reset and can be shown, False to
+            close it and build a new one.
+        """
+        refresh = getattr(widget, "refresh", None)
+        if args or kwargs or not callable(refresh):
+            # nothing is known about how to reset it
+            return False
+        refresh()
+        return True
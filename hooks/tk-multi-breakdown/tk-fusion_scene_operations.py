@@ -10,20 +10,15 @@
 
 import os
 import re
-import time
 import pprint
-import fileseq
 import traceback
 
 import sgtk
 from sgtk import Hook
-import BlackmagicFusion as bmd
 
 pp = pprint.pprint
 pf = pprint.pformat
 
-fusion = bmd.scriptapp("Fusion")
-
 
 class BreakdownSceneOperations(Hook):
     """
@@ -54,53 +49,63 @@ class BreakdownSceneOperations(Hook):
         available. Any such versions are then displayed in the UI as out of
         date.
         """
-        engine = self.parent.engine
-        logger = engine.logger
+        with self.parent.engine.operation("tk-multi-breakdown.scan_scene"):
+            return self._scan_scene()
 
-        logger.info("Starting breakdown scan...".ljust(80, "-"))
+    def _scan_scene(self):
+        """
+        Scans the comp loaders, see :meth:`scan_scene`.
+        """
+        engine = self.parent.engine
+        log = engine.hook_logger("tk-multi-breakdown")
+
+        log.info("Starting breakdown scan...".ljust(80, "-"))
+
+        comp = engine.get_current_comp()
+        log.debug("comp: %s", comp)
+
+        log.debug("Scene operation: getting all comp loaders")
+        with engine.comp_lock(comp):
+            loaders = engine.tool_index.by_type("Loader")
+
+        # Introspect the fusion scene for loader nodes so we can gather the
+        # filenames available.
+        pattern = re.compile(
+            r"(?P<head>.+)"
+            r"(?P<version>[vV]\d{3})"
+            r"[\._-]"
+            r"(?P<seq>\d{4,6})"
+            r"[\._-]"
+            r"(?P<ext>.+)"
+        )
+        with log.sampled("Scanning loaders") as items:
+            refs = self._scan_loaders(loaders, pattern, items)
 
-        # Introspect the fusion scene for loader and saver nodes
-        # so we can gather the filenames available.
-        refs = []
+        log.debug("Found references:\n%s", log.pformat(refs))
+        log.info("Finished breakdown scan, %s references".ljust(80, "-"), len(refs))
 
-        logger.info("Scene operation: getting current comp")
-        comp = fusion.GetCurrentComp()
-        logger.info(f"comp: {comp}")
+        return refs
 
-        logger.info("Scene operation: lock current comp")
-        while not comp.GetAttrs()['COMPB_Locked']:
-            comp.Lock()
+    def _scan_loaders(self, loaders, pattern, items):
+        """
+        Returns the breakdown references of the given loader records.
 
-        logger.info("Scene operation: getting all comp loaders")
-        for tool in comp.GetToolList(False, "Loader").values():
-            logger.info(
-                "Working with tool: {}".format(tool.Name).ljust(80, "-")
-            )
-            ref_path = list(tool.GetAttrs("TOOLST_Clip_Name").values())
-            logger.info(
-                "ref_path as is: {}, type: {}".format(ref_path, type(ref_path))
-            )
+        :param items: :class:`SampledLog` the per loader messages are
+            logged to.
+        """
+        refs = []
+        for loader in loaders:
+            tool_name = loader.name
+            ref_path = loader.clip_path
             if not ref_path:
-                logger.info("Couldn't get clip path, skipping tool...")
+                items.info("Couldn't get clip path of %s, skipping tool...", tool_name)
                 continue
 
-            if isinstance(ref_path, list):
-                ref_path = ref_path[0]
-            logger.info(
-                "Scanning node {}: {}".format(tool.Name, ref_path)
-            )
+            items.info("Scanning node %s: %s", tool_name, ref_path)
 
-            pattern = re.compile(
-                r"(?P<head>.+)"
-                r"(?P<version>[vV]\d{3})"
-                r"[\._-]"
-                r"(?P<seq>\d{4,6})"
-                r"[\._-]"
-                r"(?P<ext>.+)"
-            )
             match = pattern.match(ref_path)
             if not match:
-                logger.warning("Could not match path: {}".format(ref_path))
+                items.warning("Could not match path: %s", ref_path)
                 continue
 
             seq_token = match.group("seq")
@@ -111,17 +116,11 @@ class BreakdownSceneOperations(Hook):
             new_path_basename = path_basename.replace(seq_token, "%04d")
             new_path = os.path.join(path_dirname, new_path_basename)
             new_path = self.fix_path(new_path)
-            logger.info("new path: {}".format(new_path))
+            items.debug("new path: %s", new_path)
 
             # refs.append({"node": tool.GetAttrs("TOOLS_Name"), "type": "file", "path": ref_path[0]})
             # {"node": node_name, "type": "reference", "path": maya_path}
-            refs.append({"node": tool.GetAttrs("TOOLS_Name"), "type": "Rendered Image", "path": new_path})
-
-        logger.info("Scene operation: unlock current comp")
-        comp.Unlock()
-
-        logger.info("Found references:\n{}".format(pf(refs)))
-        logger.info("Finished breakdown scan...".ljust(80, "-"))
+            refs.append({"node": tool_name, "type": "Rendered Image", "path": new_path})
 
         return refs
 
@@ -137,19 +136,27 @@ class BreakdownSceneOperations(Hook):
         the that each attribute should be updated *to* rather than the current
         path.
         """
+        with self.parent.engine.operation("tk-multi-breakdown.update"):
+            self._update(items)
 
-        comp = fusion.GetCurrentComp()
+    def _update(self, items):
+        """
+        Updates the loaders of the given items, see :meth:`update`.
+        """
         engine = self.parent.engine
-        logger = engine.logger
+        log = engine.hook_logger("tk-multi-breakdown")
+        comp = engine.get_current_comp()
 
-        logger.info("Updating breakdown references...".ljust(80, "-"))
+        log.info("Updating breakdown references...".ljust(80, "-"))
 
-        loaders = {}
-        for loader in comp.GetToolList(False, "Loader").values():
-            loaders[loader.Name] = loader
-        logger.info(f"Found loaders:\n{pf(loaders)}")
+        # the loaders and their clip attributes come from the tool index, the
+        # tool objects are only requested for the loaders being updated
+        loaders = dict(
+            (record.name, record) for record in engine.tool_index.by_type("Loader")
+        )
+        log.debug("Found loaders:\n%s", log.pformat(list(loaders)))
 
-        logger.info("Getting all item paths...")
+        log.debug("Getting all item paths...")
         sg_publishes = self.get_item_paths_list(items)
 
         if not sg_publishes:
@@ -160,197 +167,177 @@ class BreakdownSceneOperations(Hook):
         # including the extension
         sg_publishes_by_name = self.sort_publishes_by_name(sg_publishes)
 
-        logger.info("Iterating through items...".ljust(80, "-"))
-        for item in items:
-            logger.debug(f"item:\n{pf(item)}")
-            node = item.get("node")
-            node_type = item.get("type")
-            new_path = item.get("path")
-
-            # get th publish name to find the publish dict in our sg_publishes_by_name
-            # dictionary. This is needed to update the sg_metadata in the loader node
-            pub_name = self.resolve_publish_name(new_path)
-            if pub_name:
-                sg_metadata = self.get_sg_metadata_dict(
-                    sg_publishes_by_name.get(pub_name)
-                )
-            else:
-                sg_metadata = None
-
-            if node_type == "Rendered Image":
-                logger.info(f"Updating item: {item}".ljust(60, "-"))
-                loader = loaders.get(node)
-                if not loader:
-                    logger.warning(
-                        "loader '{}' not found in loaders: {}".format(
-                            node, list(loaders.keys())
-                        )
+        log.info("Iterating through items...".ljust(80, "-"))
+        # the comp stays locked for the whole update instead of once per item
+        with engine.comp_lock(comp):
+            self._update_items(comp, items, loaders, sg_publishes_by_name)
+
+    def _update_items(self, comp, items, loaders, sg_publishes_by_name):
+        """
+        Updates the loaders of the given breakdown items. Called by
+        :meth:`update` with the comp locked.
+        """
+        # only needed here, the hook is reloaded on every context change
+        import fileseq
+
+        engine = self.parent.engine
+        log = engine.hook_logger("tk-multi-breakdown")
+
+        # all the loader writes are queued and applied in a single round trip
+        writer = engine.tool_writer("Update loaders", comp)
+        current_time = writer.CURRENT_TIME
+        updated = {}
+
+        # the messages of the first loaders only, there may be thousands
+        with log.sampled("Updating loaders") as sampled:
+            for item in items:
+                sampled.debug("item:\n%s", log.pformat(item))
+                node = item.get("node")
+                node_type = item.get("type")
+                new_path = item.get("path")
+
+                # get th publish name to find the publish dict in our sg_publishes_by_name
+                # dictionary. This is needed to update the sg_metadata in the loader node
+                pub_name = self.resolve_publish_name(new_path)
+                if pub_name:
+                    sg_metadata = self.get_sg_metadata_dict(
+                        sg_publishes_by_name.get(pub_name)
                     )
-                    continue
-
-                logger.info(f"File {node}: Updating to version {new_path}")
-
-                logger.info("Scene operation: lock current comp")
-                max_tries = 5
-                tries = 0
-                while not comp.GetAttrs()['COMPB_Locked'] and tries < max_tries:
-                    comp.Lock()
-                    tries += 1
-                    time.sleep(2)
-
-                logger.info(f"Scene operation: locked current comp after {tries} tries")
-
-                # try to get a fileseq obj from the provided path to be able to get
-                # the sequence first and last frames.
-                logger.info("Scene operation: find sequence on disk")
-                fileseq_obj = None
-                try:
-                    fileseq_obj = fileseq.findSequenceOnDisk(new_path)
-                    logger.info(f"Found sequence on disk: {fileseq_obj}")
-                except Exception as e:
-                    logger.error(
-                        "Failed to find sequence on disk: {}, full traceback:\n{}".format(
-                            e, traceback.format_exc()
+                else:
+                    sg_metadata = None
+
+                if node_type == "Rendered Image":
+                    loader_record = loaders.get(node)
+                    if not loader_record:
+                        log.warning(
+                            "loader '%s' not found in loaders: %s",
+                            node,
+                            log.pformat(list(loaders)),
                         )
-                    )
+                        continue
+                    loader_attrs = loader_record.attrs
 
-                # this should be the default method for getting the sequence info
-                if fileseq_obj:
-                    try:
-                        clip_start_frame = int(fileseq_obj.start())
-                        clip_end_frame = int(fileseq_obj.end())
-                        clip_length = clip_end_frame - clip_start_frame + 1
-                        clip_trim_in = 0
-                        clip_trim_out = int(clip_end_frame) - int(clip_start_frame)
-                        logger.info("Got values from fileseq obj")
-                    except Exception as e:
-                        logger.error(
-                            (
-                                "Failed to get sequence data from fileseq obj: {}, "
-                                "full traceback:\n{}"
-                            ).format(e, traceback.format_exc())
-                        )
-                else:
-                # this should be just a fallback but not the pimary method as the
-                # sequence length might have changed from version to version
+                    sampled.info("File %s: Updating to version %s", node, new_path)
+
+                    # try to get a fileseq obj from the provided path to be able to get
+                    # the sequence first and last frames.
+                    fileseq_obj = None
                     try:
-                        clip_start_frame = loader.GetAttrs("TOOLIT_Clip_StartFrame").get(1)
-                        clip_length = loader.GetAttrs("TOOLIT_Clip_Length").get(1)
-                        clip_end_frame = clip_start_frame + clip_length - 1
-                        clip_trim_in = loader.GetAttrs("TOOLIT_Clip_TrimIn").get(1)
-                        clip_trim_out = loader.GetAttrs("TOOLIT_Clip_TrimOut").get(1)
-                        logger.info(f"Got values from loader '{loader.Name}'")
+                        fileseq_obj = fileseq.findSequenceOnDisk(new_path)
+                        sampled.debug("Found sequence on disk: %s", fileseq_obj)
                     except Exception as e:
-                        logger.error(
-                            (
-                                "Failed to get globalIn, globalOut, trimIn, trimOut "
-                                "from loader {}: {}, full traceback:\n{}"
-                            ).format(loader.Name, e, traceback.format_exc())
+                        log.error(
+                            "Failed to find sequence on disk: {}, full traceback:\n{}".format(
+                                e, traceback.format_exc()
+                            )
                         )
 
-                # these values are specific to the loader, so there's no other way
-                # to get them
-                clip_extend_first = loader.GetAttrs("TOOLIT_Clip_ExtendFirst").get(1)
-                clip_extend_last = loader.GetAttrs("TOOLIT_Clip_ExtendLast").get(1)
+                    # this should be the default method for getting the sequence info
+                    if fileseq_obj:
+                        try:
+                            clip_start_frame = int(fileseq_obj.start())
+                            clip_end_frame = int(fileseq_obj.end())
+                            clip_length = clip_end_frame - clip_start_frame + 1
+                            clip_trim_in = 0
+                            clip_trim_out = int(clip_end_frame) - int(clip_start_frame)
+                        except Exception as e:
+                            log.error(
+                                (
+                                    "Failed to get sequence data from fileseq obj: {}, "
+                                    "full traceback:\n{}"
+                                ).format(e, traceback.format_exc())
+                            )
+                    else:
+                    # this should be just a fallback but not the pimary method as the
+                    # sequence length might have changed from version to version
+                        try:
+                            clip_start_frame = loader_attrs["TOOLIT_Clip_StartFrame"].get(1)
+                            clip_length = loader_attrs["TOOLIT_Clip_Length"].get(1)
+                            clip_end_frame = clip_start_frame + clip_length - 1
+                            clip_trim_in = loader_attrs["TOOLIT_Clip_TrimIn"].get(1)
+                            clip_trim_out = loader_attrs["TOOLIT_Clip_TrimOut"].get(1)
+                            sampled.debug("Got frame range from loader '%s'", node)
+                        except Exception as e:
+                            log.error(
+                                (
+                                    "Failed to get globalIn, globalOut, trimIn, trimOut "
+                                    "from loader {}: {}, full traceback:\n{}"
+                                ).format(node, e, traceback.format_exc())
+                            )
+
+                    # these values are specific to the loader, so there's no other way
+                    # to get them
+                    clip_extend_first = loader_attrs["TOOLIT_Clip_ExtendFirst"].get(1)
+                    clip_extend_last = loader_attrs["TOOLIT_Clip_ExtendLast"].get(1)
+
+                    # search for a printf token %04d, %05d, etc and replace it with the
+                    # first sequence frame value
+                    if fileseq_obj:
+                        new_path = list(fileseq_obj)[0]
+                    else:
+                        new_path = re.sub(r"%(\d{2})d", str(clip_start_frame), new_path)
+
+                    new_node_name = self.resolve_node_name(new_path)
+
+                    load_data = {
+                        "TOOLS_Name": new_node_name,
+                        "TOOLB_NameSet": True,
+                        }
+
+                    sampled.debug(
+                        "Queueing %s: name %s, frames %s-%s (length %s), trim %s-%s, "
+                        "hold first/last %s/%s",
+                        new_path,
+                        new_node_name,
+                        clip_start_frame,
+                        clip_end_frame,
+                        clip_length,
+                        clip_trim_in,
+                        clip_trim_out,
+                        clip_extend_first,
+                        clip_extend_last,
+                    )
 
-                # search for a printf token %04d, %05d, etc and replace it with the
-                # first sequence frame value
-                if fileseq_obj:
-                    new_path = list(fileseq_obj)[0]
-                else:
-                    new_path = re.sub(r"%(\d{2})d", str(clip_start_frame), new_path)
+                    # the writes of all the loaders are applied in one go below
+                    writer.set_property(node, "Clip", new_path, current_time)
+                    writer.set_property(node, "ClipTimeStart", clip_trim_in, current_time)
+                    writer.set_property(node, "ClipTimeEnd", clip_trim_out, current_time)
+                    writer.set_property(node, "GlobalIn", clip_start_frame, current_time)
+                    writer.set_property(node, "GlobalOut", clip_end_frame, current_time)
+                    writer.set_input(node, "HoldFirstFrame", clip_extend_first)
+                    writer.set_input(node, "HoldLastFrame", clip_extend_last)
+                    writer.set_attrs(node, load_data)
 
-                new_node_name = self.resolve_node_name(new_path)
+                    # check if we have a proper sg_metadata dict with the publuish info
+                    # so we can update the loader node sg_metadata
+                    if sg_metadata:
+                        writer.set_data(node, "sg_metadata", sg_metadata)
 
-                load_data = {
-                    "TOOLS_Name": new_node_name,
-                    "TOOLB_NameSet": True,
+                    updated[node] = {
+                        "name": new_node_name,
+                        "clip_path": new_path,
+                        "sg_metadata": sg_metadata or loader_record.sg_metadata,
                     }
 
-                logger.info(f"new_node_name: {new_node_name}")
-                logger.info(f"new_path: {new_path}")
-                logger.info(f"clip_start_frame: {clip_start_frame}")
-                logger.info(f"clip_end_frame: {clip_end_frame}")
-                logger.info(f"clip_length: {clip_length}")
-                logger.info(f"clip_trim_in: {clip_trim_in}")
-                logger.info(f"clip_trim_out: {clip_trim_out}")
-                logger.info(f"clip_extend_first: {clip_extend_first}")
-                logger.info(f"clip_extend_last: {clip_extend_last}")
-                logger.info(f"load_data:\n{pf(load_data)}")
-
-                try:
-                    logger.info(f"Setting new clip path: {new_path}")
-                    loader.Clip[comp.CurrentTime] = new_path
-
-                    # ------------------------------------------------------------------
-                    logger.info(
-                        (
-                            f"Setting new clip trim in and out: "
-                            f"{clip_trim_in}, {clip_trim_out}"
-                        )
-                    )
-                    loader.ClipTimeStart[comp.CurrentTime] = clip_trim_in
-                    loader.ClipTimeEnd[comp.CurrentTime] = clip_trim_out
-                    logger.info(
-                        "Clip start from loader after set: {}".format(
-                            loader.GetAttrs("TOOLIT_Clip_TrimIn").get(1)
-                        )
-                    )
-                    logger.info(
-                        "Clip end from loader after set: {}".format(
-                            loader.GetAttrs("TOOLIT_Clip_TrimOut").get(1)
-                        )
-                    )
-
-                    # ------------------------------------------------------------------
-                    logger.info(
-                        (
-                            f"Setting new clip global in and out: "
-                            f"{clip_start_frame}, {clip_end_frame}"
-                        )
-                    )
-                    loader.GlobalIn[comp.CurrentTime] = clip_start_frame
-                    loader.GlobalOut[comp.CurrentTime] = clip_end_frame
-                    logger.info(
-                        "clip global in from loader after set: {}".format(
-                            loader.GetAttrs("TOOLNT_Clip_Start").get(1)
-                        )
-                    )
-                    logger.info(
-                        "clip global out from loader after set: {}".format(
-                            loader.GetAttrs("TOOLNT_Clip_End").get(1)
-                        )
-                    )
-
-                    # ------------------------------------------------------------------
-                    logger.info(
-                        (
-                            f"Setting new clip extend (hold) first and last frames: "
-                            f"{clip_extend_first}, {clip_extend_last}"
-                        )
-                    )
-                    loader.SetInput("HoldFirstFrame", clip_extend_first)
-                    loader.SetInput("HoldLastFrame", clip_extend_last)
+        log.info("Updating %s loaders...", len(updated))
+        failures = writer.flush()
+        tool_index = engine.tool_index
+        for node, fields in updated.items():
+            if node in failures:
+                log.error(
+                    "Couldn't update node %s to latest version: %s",
+                    node,
+                    "; ".join(failures[node]),
+                )
+                continue
 
-                    # ------------------------------------------------------------------
-                    logger.info(f"Setting new clip extra attributes: {load_data}")
-                    loader.SetAttrs(load_data)
+            fields["name"] = writer.names.get(node, fields["name"])
+            tool_index.update(node, **fields)
+        log.info("Updated %s loaders", len(updated) - len(failures))
 
-                    # check if we have a proper sg_metadata dict with the publuish info
-                    # so we can update the loader node sg_metadata
-                    if sg_metadata:
-                        loader.SetData("sg_metadata", sg_metadata)
-                except Exception as e:
-                    msg = (
-                        "Couldn't update node {} to latest version: {}, "
-                        "full traceback:\n{}"
-                    ).format(node, e, traceback.format_exc())
-                    logger.error(msg)
-                else:
-                    logger.info("Successfully updated item {}".format(node))
-                finally:
-                    while comp.GetAttrs()["COMPB_Locked"]:
-                        comp.Unlock()
+        if failures:
+            # some loaders are partially updated, read them again next time
+            tool_index.invalidate()
 
     def fix_path(self, path):
         """Replace all backward slashes with forward slashes."""
@@ -362,10 +349,10 @@ class BreakdownSceneOperations(Hook):
 
     def get_item_paths_list(self, items):
         engine = self.parent.engine
-        logger = engine.logger
+        log = engine.hook_logger("tk-multi-breakdown")
 
         item_paths = [item.get("path") for item in items]
-        logger.info(f"Found item paths:\n{pf(item_paths)}")
+        log.debug("Found item paths:\n%s", log.pformat(item_paths))
 
         # get all publishes to be able to update the loader sg_metadata after updating
         # the file paths in the selected loaders
@@ -374,10 +361,10 @@ class BreakdownSceneOperations(Hook):
             sg_publishes = sgtk.util.find_publish(
                 engine.sgtk, item_paths, fields=fields
             )
-            logger.info(f"Found sg_publishes:\n{pf(sg_publishes)}")
+            log.debug("Found sg_publishes:\n%s", log.pformat(sg_publishes))
             return sg_publishes
         except Exception as e:
-            logger.error(
+            log.error(
                 "Failed to get sg_publishes: {}, full traceback:\n{}".format(
                     e, traceback.format_exc()
                 )
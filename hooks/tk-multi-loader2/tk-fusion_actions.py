@@ -14,8 +14,6 @@ Hook that loads defines all the available actions, broken down by publish type.
 
 import os
 import re
-import glob
-import fileseq
 import sgtk
 from sgtk.errors import TankError
 import traceback
@@ -77,13 +75,13 @@ class FusionActions(HookBaseClass):
         """
         app = self.parent
         engine = app.engine
-        logger = engine.logger
+        log = engine.hook_logger("tk-multi-loader2")
 
-        logger.info(
-            (
-                "Generate actions called for UI element {}. "
-                "Actions: {}. Publish Data: {}"
-            ).format(ui_area, actions, sg_publish_data)
+        log.debug(
+            "Generate actions called for UI element %s. Actions: %s. Publish Data: %s",
+            ui_area,
+            actions,
+            log.pformat(sg_publish_data),
         )
 
         action_instances = []
@@ -151,18 +149,35 @@ class FusionActions(HookBaseClass):
         """
         app = self.parent
         engine = app.engine
-        logger = engine.logger
 
+        # hold the comp lock once for all the actions, the nested locks taken by
+        # each action are then free
+        with engine.operation("tk-multi-loader2.execute_multiple_actions"):
+            with engine.comp_lock():
+                self._execute_actions(actions)
+
+    def _execute_actions(self, actions):
+        """
+        Executes the given actions one by one. Called by
+        :meth:`execute_multiple_actions` with the comp locked.
+
+        :param list actions: Action dictionaries.
+        """
+        app = self.parent
+        engine = app.engine
+        log = engine.hook_logger("tk-multi-loader2")
+
+        sampled = log.sampled("Executing actions")
         for single_action in actions:
-            logger.info("Single Action: %s" % single_action)
             name = single_action["name"]
             sg_publish_data = single_action["sg_publish_data"]
             params = single_action["params"]
+            sampled.info("Executing action %s on %s", name, sg_publish_data.get("code"))
 
             try:
                 self.execute_action(name, params, sg_publish_data)
                 # play sound from config hook 'play_sounds'
-                logger.info("Playing sound, reached end of execute_action")
+                sampled.debug("Playing sound, reached end of execute_action")
                 engine.execute_hook_expression(
                     "{config}/notifications.py",
                     "success_sound",
@@ -171,13 +186,14 @@ class FusionActions(HookBaseClass):
                 msg = "Error executing action {}: {}, full traceback:\n{}".format(
                     name, e, traceback.format_exc()
                 )
-                engine.logger.error(msg)
+                log.error(msg)
                 # play sound from config hook 'play_sounds'
-                logger.info("Playing sound, error raised in execute_action")
+                log.debug("Playing sound, error raised in execute_action")
                 engine.execute_hook_expression(
                     "{config}/notifications.py",
                     "error_sound",
                 )
+        sampled.done()
 
     def execute_action(self, name, params, sg_publish_data):
         """
@@ -191,15 +207,22 @@ class FusionActions(HookBaseClass):
                                 publish fields.
         :returns: No return value expected.
         """
+        with self.parent.engine.operation("tk-multi-loader2.execute_action"):
+            self._execute_action(name, params, sg_publish_data)
+
+    def _execute_action(self, name, params, sg_publish_data):
+        """
+        Executes the given action, see :meth:`execute_action`.
+        """
         app = self.parent
         engine = app.engine
-        logger = engine.logger
+        log = engine.hook_logger("tk-multi-loader2")
 
-        logger.info(
-            (
-                "Execute action called for action {}. Parameters: {}. "
-                "Publish Data: {}"
-            ).format(name, params, sg_publish_data)
+        log.debug(
+            "Execute action called for action %s. Parameters: %s. Publish Data: %s",
+            name,
+            params,
+            log.pformat(sg_publish_data),
         )
 
         # resolve path
@@ -229,12 +252,9 @@ class FusionActions(HookBaseClass):
         """
         app = self.parent
         engine = app.engine
-        logger = engine.logger
+        log = engine.hook_logger("tk-multi-loader2")
 
-        import BlackmagicFusion as bmd
-
-        fusion = bmd.scriptapp("Fusion")
-        comp = fusion.GetCurrentComp()
+        comp = engine.get_current_comp()
 
         (_, ext) = os.path.splitext(path)
 
@@ -258,7 +278,7 @@ class FusionActions(HookBaseClass):
 
         if ext.lower() not in valid_extensions:
             msg = "Unsupported file extension for '{}'!".format(path)
-            logger.error(msg)
+            log.error(msg)
             raise Exception(msg)
 
         # find the sequence range if it has one and if it's a sequence:
@@ -267,58 +287,78 @@ class FusionActions(HookBaseClass):
         else:
             seq_range = None
 
-        while not comp.GetAttrs()["COMPB_Locked"]:
-            comp.Lock()
-
-        # only get the first frame in the sequences range if it's actually a sequence
-        if seq_range:
-            path = path % seq_range[0]
-
-        path = self.fix_path(path)
-        node_name = os.path.basename(path).split(".")[0]
-        load_data = {
-            "TOOLS_Name": node_name,
-            "TOOLB_NameSet": True,
-        }
-
-        x_pos, y_pos = self.get_good_position(comp)
-        logger.info("good position, x: {}, y: {}".format(x_pos, y_pos))
-        loader = comp.AddTool("Loader", x_pos, y_pos)
-        loader.Clip = path
-        loader.SetAttrs(load_data)
-
-        if seq_range:
-            # override the detected frame range.
-            trim_out = int(seq_range[1]) - int(seq_range[0])
-            globalStart = comp.GetAttrs("COMPN_GlobalStart")
-            loader.GlobalIn = globalStart
-            loader.GlobalOut = globalStart + trim_out
-            loader.ClipTimeStart = 0
-            loader.ClipTimeEnd = trim_out
-            loader.TrimOut = trim_out
-
-        fields = {}
-        publish_template = self.parent.engine.sgtk.template_from_path(path)
-        if publish_template:
-            fields = publish_template.get_fields(path)
-
-        buffer = fields.get("buffer", "")
-        if buffer:
-            loader.SetData("sg_buffer", buffer)
-            metadata_ = {"buffer": buffer}
-        else:
-            metadata_ = {}
-
-        meta_keys = ["version_number", "code", "name", "id", "entity"]
-        if sg_publish_data is not None:
-            for k, val in sg_publish_data.items():
-                if k in meta_keys:
-                    metadata_[k] = val
-
-        loader.SetData("sg_metadata", metadata_)
+        with engine.comp_lock(comp):
+            # only get the first frame in the sequences range if it's actually a sequence
+            if seq_range:
+                path = path % seq_range[0]
+
+            path = self.fix_path(path)
+            node_name = os.path.basename(path).split(".")[0]
+            load_data = {
+                "TOOLS_Name": node_name,
+                "TOOLB_NameSet": True,
+            }
+
+            x_pos, y_pos = self.get_good_position(comp)
+            log.debug("good position, x: %s, y: %s", x_pos, y_pos)
+
+            # the loader is created and set up in a single round trip
+            writer = engine.tool_writer("Create loader", comp)
+            loader = writer.add_tool("Loader", x_pos, y_pos)
+            writer.set_property(loader, "Clip", path)
+            writer.set_attrs(loader, load_data)
+
+            if seq_range:
+                # override the detected frame range.
+                trim_out = int(seq_range[1]) - int(seq_range[0])
+                globalStart = engine.get_comp_attr("COMPN_GlobalStart", comp)
+                writer.set_property(loader, "GlobalIn", globalStart)
+                writer.set_property(loader, "GlobalOut", globalStart + trim_out)
+                writer.set_property(loader, "ClipTimeStart", 0)
+                writer.set_property(loader, "ClipTimeEnd", trim_out)
+                writer.set_property(loader, "TrimOut", trim_out)
+
+            fields = {}
+            publish_template = self.parent.engine.template_from_path(path)
+            if publish_template:
+                fields = publish_template.get_fields(path)
+
+            buffer = fields.get("buffer", "")
+            if buffer:
+                writer.set_data(loader, "sg_buffer", buffer)
+                metadata_ = {"buffer": buffer}
+            else:
+                metadata_ = {}
+
+            meta_keys = ["version_number", "code", "name", "id", "entity"]
+            if sg_publish_data is not None:
+                for k, val in sg_publish_data.items():
+                    if k in meta_keys:
+                        metadata_[k] = val
+
+            writer.set_data(loader, "sg_metadata", metadata_)
+
+            failures = writer.flush()
+            loader_name = writer.names.get(loader)
+            if not loader_name:
+                raise Exception(
+                    "Couldn't create loader for {}: {}".format(
+                        path, "; ".join(failures.get(loader, []))
+                    )
+                )
 
-        while comp.GetAttrs()["COMPB_Locked"]:
-            comp.Unlock()
+            # keep the tool index current for the next loaders
+            tool_index = engine.tool_index
+            tool_index.add(
+                tool_index.record_class(
+                    loader_name,
+                    "Loader",
+                    clip_path=path,
+                    sg_metadata=metadata_,
+                    pos=(x_pos, y_pos),
+                    data={"sg_buffer": buffer} if buffer else {},
+                )
+            )
 
     def _find_sequence_range(self, path):
         """
@@ -328,14 +368,16 @@ class FusionActions(HookBaseClass):
         :return: A tuple of two integers representing the start and end of the
                  sequence. If no sequence is detected, returns None.
         """
+        import fileseq
+
         app = self.parent
         engine = app.engine
-        logger = engine.logger
+        log = engine.hook_logger("tk-multi-loader2")
 
         try:
             fileseq_obj = fileseq.findSequenceOnDisk(path)
         except Exception as e:
-            logger.error(
+            log.error(
                 "Failed to find sequence on disk: {}, full traceback:\n{}".format(
                     e, traceback.format_exc()
                 )
@@ -377,20 +419,19 @@ class FusionActions(HookBaseClass):
         # top left corner, but when a new node is created, the coordinates are applied
         # to the center of the node, thus we need to offset at least the x axis
         x_tool_width_offset = 0.5
-        flow = comp.CurrentFrame.FlowView
         max_x = None
         max_y = None
 
-        all_tools = comp.GetToolList(False).values()
-        if not list(all_tools):
+        # positions of all the tools, from the tool index
+        all_tools = self.parent.engine.tool_index.records()
+        if not all_tools:
             return 0, 0
 
         for tool in all_tools:
-            pos = flow.GetPosTable(tool)
+            pos = tool.pos
             if not pos:
                 continue
-            x = pos.get(1)
-            y = pos.get(2)
+            x, y = pos
 
             # store higest values
             if max_x is None:
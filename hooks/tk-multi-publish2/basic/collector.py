@@ -8,13 +8,9 @@
 # agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
 # not expressly granted therein are reserved by Shotgun Software Inc.
 
-import glob
 import os
 import sgtk
 
-import BlackmagicFusion as bmd
-fusion = bmd.scriptapp("Fusion")
-
 
 HookBaseClass = sgtk.get_hook_baseclass()
 
@@ -77,7 +73,9 @@ class FusionSessionCollector(HookBaseClass):
         """
 
         # create an item representing the current fusion session
-        item = self.collect_current_fusion_session(settings, parent_item)
+        engine = self.parent.engine
+        with engine.operation("tk-multi-publish2.collector"):
+            item = self.collect_current_fusion_session(settings, parent_item)
 
         #self.collect_sg_savernodes(item)
 
@@ -140,21 +138,23 @@ class FusionSessionCollector(HookBaseClass):
         return session_item
 
     def collect_sg_savernodes(self, parent_item):
-
-        comp = fusion.GetCurrentComp()
+        import glob
 
         publisher = self.parent
         engine = publisher.engine
 
-        path = comp.GetAttrs()['COMPS_FileName']
-        work_template = engine.sgtk.template_from_path(path)
+        comp = engine.get_current_comp()
+
+        path = engine.get_comp_attr("COMPS_FileName", comp)
+        work_template = engine.template_from_path(path)
         work_version = work_template.get_fields(path).get('version')
 
-        savers = comp.GetToolList(False, "Saver").values()
-        for saver in savers:
-            path = saver.GetAttrs()['TOOLST_Clip_Name'].values()[0]
+        for saver in engine.tool_index.by_type("Saver"):
+            path = saver.clip_path
+            if not path:
+                continue
 
-            template = engine.sgtk.template_from_path(path)
+            template = engine.template_from_path(path)
             if template:
                 fields = template.get_fields(path)
                 template_version = fields.get('version')
@@ -181,9 +181,8 @@ def _session_path():
     Return the path to the current session
     :return:
     """
-    comp = fusion.GetCurrentComp()
-
-    path = comp.GetAttrs()['COMPS_FileName']
+    engine = sgtk.platform.current_engine()
+    path = engine.get_comp_attr("COMPS_FileName")
 
     # if isinstance(path, unicode):
     #     path = path.encode("utf-8")
@@ -12,9 +12,6 @@ import os
 import sgtk
 from sgtk.util.filesystem import ensure_folder_exists
 
-import BlackmagicFusion as bmd
-fusion = bmd.scriptapp("Fusion")
-
 HookBaseClass = sgtk.get_hook_baseclass()
 
 
@@ -181,8 +178,7 @@ class FusionSessionPublishPlugin(HookBaseClass):
             )
 
         self.logger.info(
-            "Fusion '%s' plugin accepted the current Fusion session." %
-            (self.name,)
+            "Fusion '%s' plugin accepted the current Fusion session.", self.name
         )
         return {
             "accepted": True,
@@ -304,6 +300,13 @@ class FusionSessionPublishPlugin(HookBaseClass):
             instances.
         :param item: Item to process
         """
+        with self.parent.engine.operation("tk-multi-publish2.publish_session"):
+            self._publish(settings, item)
+
+    def _publish(self, settings, item):
+        """
+        Publishes the current session, see :meth:`publish`.
+        """
 
         # get the path in a normalized state. no trailing separator, separators
         # are appropriate for current os, no double separators, etc.
@@ -327,8 +330,8 @@ class FusionSessionPublishPlugin(HookBaseClass):
             cacerts_file = os.path.join(httplib2_dir, "cacerts.txt")
             os.environ["SSL_CERT_FILE"] = cacerts_file
         except ImportError as e:
-            self.parent.engine.logger.exception(
-                f"Failed to set SSL_CERT_FILE env var: {e}"
+            self.parent.engine.hook_logger("tk-multi-publish2").exception(
+                "Failed to set SSL_CERT_FILE env var: %s", e
             )
 
         # let the base class register the publish
@@ -362,8 +365,8 @@ def _session_path():
     Return the path to the current session
     :return:
     """
-    comp = fusion.GetCurrentComp()
-    path = comp.GetAttrs()['COMPS_FileName']
+    engine = sgtk.platform.current_engine()
+    path = engine.get_comp_attr("COMPS_FileName")
 
     # if isinstance(path, unicode):
     #     path = path.encode("utf-8")
@@ -380,8 +383,8 @@ def _save_session(path):
     folder = os.path.dirname(path)
     ensure_folder_exists(folder)
 
-    comp = fusion.GetCurrentComp()
-    comp.Save(path)
+    engine = sgtk.platform.current_engine()
+    engine.save_comp(path)
 
 
 # TODO: method duplicated in all the fusion hooks
@@ -410,11 +413,11 @@ def _get_save_as_action():
 
 
 def _save_as():
-    comp = fusion.GetCurrentComp()
-    path = comp.GetAttrs()['COMPS_FileName']
+    engine = sgtk.platform.current_engine()
+    path = engine.get_comp_attr("COMPS_FileName")
 
     # if isinstance(path, unicode):
     #     path = path.encode("utf-8")
 
     if path:
-        comp.Save(path)
+        engine.save_comp(path)
@@ -11,9 +11,6 @@
 import os
 import sgtk
 
-import BlackmagicFusion as bmd
-fusion = bmd.scriptapp("Fusion")
-
 HookBaseClass = sgtk.get_hook_baseclass()
 
 
@@ -130,12 +127,11 @@ class FusionStartVersionControlPlugin(HookBaseClass):
             version_number = self._get_version_number(path, item)
             if version_number is not None:
                 self.logger.info(
-                    "Fusion '%s' plugin rejected the current session..." %
-                    (self.name,)
+                    "Fusion '%s' plugin rejected the current session...", self.name
                 )
                 self.logger.info(
                     "  There is already a version number in the file...")
-                self.logger.info("  Fusion file path: %s" % (path,))
+                self.logger.info("  Fusion file path: %s", path)
                 return {"accepted": False}
         else:
             # the session has not been saved before (no path determined).
@@ -147,8 +143,8 @@ class FusionStartVersionControlPlugin(HookBaseClass):
             )
 
         self.logger.info(
-            "Fusion '%s' plugin accepted the current session." %
-            (self.name,),
+            "Fusion '%s' plugin accepted the current session.",
+            self.name,
             extra=_get_version_docs_action()
         )
 
@@ -214,6 +210,13 @@ class FusionStartVersionControlPlugin(HookBaseClass):
             instances.
         :param item: Item to process
         """
+        with self.parent.engine.operation("tk-multi-publish2.start_version_control"):
+            self._publish(settings, item)
+
+    def _publish(self, settings, item):
+        """
+        Saves the session with a version number, see :meth:`publish`.
+        """
 
         publisher = self.parent
 
@@ -230,7 +233,7 @@ class FusionStartVersionControlPlugin(HookBaseClass):
         # save to the new version path
         _save_session(version_path)
         self.logger.info("A version number has been added to the Fusion file...")
-        self.logger.info("  Fusion file path: %s" % (version_path,))
+        self.logger.info("  Fusion file path: %s", version_path)
 
     def finalize(self, settings, item):
         """
@@ -291,8 +294,8 @@ def _session_path():
     Return the path to the current session
     :return:
     """
-    comp = fusion.GetCurrentComp()
-    path = comp.GetAttrs()['COMPS_FileName']
+    engine = sgtk.platform.current_engine()
+    path = engine.get_comp_attr("COMPS_FileName")
 
     # if isinstance(path, unicode):
     #     path = path.encode("utf-8")
@@ -310,8 +313,8 @@ def _save_session(path):
     folder = os.path.dirname(path)
     # ensure_folder_exists(folder)
 
-    comp = fusion.GetCurrentComp()
-    comp.Save(path)
+    engine = sgtk.platform.current_engine()
+    engine.save_comp(path)
 
 
 # TODO: method duplicated in all the fusion hooks
@@ -353,12 +356,12 @@ def _get_version_docs_action():
 
 
 def _save_as():
-    comp = fusion.GetCurrentComp()
-    path = comp.GetAttrs()['COMPS_FileName']
+    engine = sgtk.platform.current_engine()
+    path = engine.get_comp_attr("COMPS_FileName")
 
     # if isinstance(path, unicode):
     #     path = path.encode("utf-8")
 
     if path:
-        comp.Save(path)
+        engine.save_comp(path)
 
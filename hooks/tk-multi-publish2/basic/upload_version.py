@@ -10,9 +10,9 @@
 
 import os
 import pprint
+import logging
 import sys
 import sgtk
-import BlackmagicFusion as bmd
 
 HookBaseClass = sgtk.get_hook_baseclass()
 
@@ -157,12 +157,13 @@ class UploadVersionPlugin(HookBaseClass):
             ext = ext.strip().lstrip(".")
             valid_extensions.append(ext)
 
-        self.logger.debug("Valid extensions: %s" % valid_extensions)
+        self.logger.debug("Valid extensions: %s", valid_extensions)
 
         if extension in valid_extensions:
             # log the accepted file and display a button to reveal it in the fs
             self.logger.info(
-                "Version upload plugin accepted: %s" % (file_path,),
+                "Version upload plugin accepted: %s",
+                file_path,
                 extra={
                     "action_show_folder": {
                         "path": file_path
@@ -174,8 +175,8 @@ class UploadVersionPlugin(HookBaseClass):
             return {"accepted": True, "checked": False}
         else:
             self.logger.debug(
-                "%s is not in the valid extensions list for Version creation" %
-                (extension,)
+                "%s is not in the valid extensions list for Version creation",
+                extension,
             )
             return {"accepted": False}
 
@@ -206,13 +207,18 @@ class UploadVersionPlugin(HookBaseClass):
             instances.
         :param item: Item to process
         """
+        with self.parent.engine.operation("tk-multi-publish2.upload_version"):
+            self._publish(settings, item)
+
+    def _publish(self, settings, item):
+        """
+        Uploads the rendered frames as a version, see :meth:`publish`.
+        """
 
         publisher = self.parent
         path_to_frames = item.properties["path"]
 
-        fusion = bmd.scriptapp("Fusion")
-        comp = fusion.GetCurrentComp()
-        first_frame = int(comp.GetAttrs()["COMPN_GlobalStart"])
+        first_frame = int(publisher.engine.get_comp_attr("COMPN_GlobalStart"))
 
         try:
             seq_data = self.__render_movie_from_sequence(path_to_frames.encode('utf-8'))
@@ -234,7 +240,7 @@ class UploadVersionPlugin(HookBaseClass):
             path_components = publisher.util.get_file_path_components(path)
             publish_name = path_components["filename"]
 
-        self.logger.debug("Publish name: %s" % (publish_name,))
+        self.logger.debug("Publish name: %s", publish_name)
 
         self.logger.info("Creating Version...")
         version_data = {
@@ -255,17 +261,19 @@ class UploadVersionPlugin(HookBaseClass):
         if settings["Link Local File"].value:
             version_data["sg_path_to_movie"] = path
 
-        # log the version data for debugging
-        self.logger.debug(
-            "Populated Version data...",
-            extra={
-                "action_show_more_info": {
-                    "label": "Version Data",
-                    "tooltip": "Show the complete Version data dictionary",
-                    "text": "<pre>%s</pre>" % (pprint.pformat(version_data),)
+        # log the version data for debugging, the pformat is only worth it
+        # when debug messages are shown
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                "Populated Version data...",
+                extra={
+                    "action_show_more_info": {
+                        "label": "Version Data",
+                        "tooltip": "Show the complete Version data dictionary",
+                        "text": "<pre>%s</pre>" % (pprint.pformat(version_data),)
+                    }
                 }
-            }
-        )
+            )
 
         # Create the version
         version = publisher.shotgun.create("Version", version_data)
@@ -331,6 +339,8 @@ class UploadVersionPlugin(HookBaseClass):
             encoder = Draft.VideoEncoder( output_path,  width=inputWidth, height=inputHeight, quality=quality, codec=codec )
 
 
+            log = self.parent.engine.hook_logger("tk-multi-publish2")
+            logged_progress = -1
             progressCounter = 0
             for currFrame in range(fs.start(), fs.end()):
 
@@ -351,7 +361,10 @@ class UploadVersionPlugin(HookBaseClass):
 
                 progressCounter = progressCounter + 1
                 progress = progressCounter * 100 / (fs.end() - fs.start())
-                print( "Progress: %i%%" % progress )
+                # every 10% instead of every frame
+                if int(progress) // 10 > logged_progress:
+                    logged_progress = int(progress) // 10
+                    log.info("Progress: %i%%", progress)
 
             encoder.FinalizeEncoding()
 
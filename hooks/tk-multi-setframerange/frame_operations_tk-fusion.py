@@ -9,7 +9,6 @@
 # not expressly granted therein are reserved by Shotgun Software Inc.
 import sgtk
 from sgtk import TankError
-import BlackmagicFusion as bmd
 
 
 __author__ = "Diego Garcia Huerta"
@@ -45,7 +44,9 @@ class FrameOperation(HookBaseClass):
                     'get_frame_range' - Returns the frame range in the form
                                         (in_frame, out_frame)
         """
-        fusion = bmd.scriptapp("Fusion")
+        engine = self.parent.engine
+        log = engine.hook_logger("tk-multi-setframerange")
+        fusion = engine.fusion
         comp = fusion.GetCurrentComp()
         #comp = fusion.GetAttrs()["FUSIONH_CurrentComp"]
 
@@ -63,13 +64,11 @@ class FrameOperation(HookBaseClass):
                     comp = c.Composition()
                     cur_comp = str(c.GetAttrs()["COMPS_Name"])
                     comp_path = str(c.GetAttrs()["COMPS_FileName"])
-                    print("current comp: {}, path: {}".format(cur_comp, comp_path))
+                    log.debug("current comp: %s, path: %s", cur_comp, comp_path)
                 comp = c
                 self.fusion_setupScene(comp, in_frame, head_in_frame,
                     out_frame, tail_out_frame)
 
-        print(15*'*/')
-        print(15*'*/')
         comp.SetAttrs({'COMPN_GlobalEnd' : 10})
         comp.SetAttrs({'COMPN_RenderEnd': 10})
 
@@ -89,8 +88,8 @@ class FrameOperation(HookBaseClass):
 
     def fusion_setupScene(self, comp, in_frame, head_in_frame, out_frame, tail_out_frame):
         """ All operations to start working in fusion """
-        print(30 * "*")
-        print("Initializing ")
+        log = self.parent.engine.hook_logger("tk-multi-setframerange")
+        log.debug("Initializing %s", comp)
 
         FIRST_FRAME = 1001
         LAST_FRAME = 1100
@@ -134,5 +133,3 @@ class FrameOperation(HookBaseClass):
         msg.show()
         """
         #proj:SetSetting('timelineResolutionWidth', "2000")
-        print(30 * "*")
-        print(15 * "-*")
@@ -17,10 +17,7 @@ import sgtk
 from sgtk import Hook
 from sgtk import TankError
 
-import BlackmagicFusion as bmd
-
 pf = pprint.pformat
-fusion = bmd.scriptapp("Fusion")
 
 
 __author__ = "Diego Garcia Huerta"
@@ -49,56 +46,57 @@ class SceneOperation(Hook):
                                      file path as a String
                     all others     - None
         """
-        logger = self.parent.engine.logger
+        engine = self.parent.engine
+        logger = engine.hook_logger("tk-multi-snapshot")
 
         logger.info("Starting snapshots operations... ".ljust(80, "-"))
-        logger.info(f"operation: {operation}")
-        logger.info(f"file_path: {file_path}")
-
-        comp = fusion.GetCurrentComp()
-
-        if operation == "current_path":
-            return comp.GetAttrs()['COMPS_FileName']
-
-        elif operation == "open":
-            if not file_path:
-                logger.error("No file path provided")
-                return
-            if comp:
-                while not comp.GetAttrs()['COMPB_Locked']:
-                    comp.Lock()
-
-                comp.Close()
-
-            comp = None
-            max_tries = 5
-            counter = 0
-            while not comp and counter < max_tries:
-                comp = fusion.LoadComp(file_path)
-                logger.info(f"try {counter + 1}, comp: {comp}")
-                try:
-                    if comp and comp.GetToolList():
-                        break
-                except Exception as e:
-                    logger.error(
-                        f"Error loading comp: {e}, full traceback:\n{traceback.format_exc()}"
-                    )
-                    comp = None
-                    counter += 1
-                    time.sleep(2)
-
-            logger.info(f"comp after loop: {comp}")
-            if comp:
-                while comp.GetAttrs()['COMPB_Locked']:
-                    comp.Unlock()
-
-        elif operation == "save":
-            if not file_path:
-                logger.error("No file path provided")
-                return
-
-            while not comp.GetAttrs()['COMPB_Locked']:
-                comp.Lock()
-            comp.Save(file_path)
-            while comp.GetAttrs()['COMPB_Locked']:
-                comp.Unlock()
+        logger.info("operation: %s", operation)
+        logger.info("file_path: %s", file_path)
+
+        with engine.operation(f"tk-multi-snapshot.{operation}"):
+            fusion = engine.fusion
+            comp = engine.get_current_comp()
+
+            if operation == "current_path":
+                return engine.get_comp_attr("COMPS_FileName", comp)
+
+            elif operation == "open":
+                if not file_path:
+                    logger.error("No file path provided")
+                    return
+                if comp:
+                    engine.comp_lock.lock(comp)
+
+                    comp.Close()
+
+                comp = None
+                max_tries = 5
+                counter = 0
+                while not comp and counter < max_tries:
+                    comp = fusion.LoadComp(file_path)
+                    logger.info("try %s, comp: %s", counter + 1, comp)
+                    try:
+                        if comp and comp.GetToolList():
+                            break
+                    except Exception as e:
+                        logger.error(
+                            "Error loading comp: %s, full traceback:\n%s",
+                            e,
+                            traceback.format_exc(),
+                        )
+                        comp = None
+                        counter += 1
+                        time.sleep(2)
+
+                logger.info("comp after loop: %s", comp)
+                if comp:
+                    engine.comp_lock.unlock(comp)
+                engine.comp_replaced(comp)
+
+            elif operation == "save":
+                if not file_path:
+                    logger.error("No file path provided")
+                    return
+
+                with engine.comp_lock(comp):
+                    engine.save_comp(file_path, comp)
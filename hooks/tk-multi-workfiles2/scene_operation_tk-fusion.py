@@ -10,25 +10,16 @@
 import os
 import re
 import sys
-import imp
-import pyseq
 import shutil
 import pprint
 import logging
 import traceback
 
 import sgtk
-from sgtk.platform.qt import QtGui
-
-import BlackmagicFusion as bmd
-fusion = bmd.scriptapp("Fusion")
 
 pp = pprint.pprint
 pf = pprint.pformat
 
-
-fusion = bmd.scriptapp("Fusion")
-
 __author__ = "Diego Garcia Huerta"
 __email__ = "diegogh2000@gmail.com"
 
@@ -87,81 +78,79 @@ class SceneOperation(HookClass):
         """
         app = self.parent
         engine = app.engine
-        logger = engine.logger
+        logger = engine.hook_logger("tk-multi-workfiles2")
 
         logger.debug("-" * 50)
-        logger.debug("operation: {}".format(operation))
-        logger.debug("file_path: {}".format(file_path))
-        logger.debug("context: {}".format(context))
-        logger.debug("parent_action: {}".format(parent_action))
-        logger.debug("file_version: {}".format(file_version))
-        logger.debug("read_only: {}".format(read_only))
-
-        # fusion = bmd.scriptapp("Fusion")
-        comp = fusion.GetCurrentComp()
-
-        if operation == "current_path":
-            return comp.GetAttrs()["COMPS_FileName"]
-
-        elif operation == "open":
-            if comp:
-                while not comp.GetAttrs()["COMPB_Locked"]:
-                    comp.Lock()
+        logger.debug("operation: %s", operation)
+        logger.debug("file_path: %s", file_path)
+        logger.debug("context: %s", context)
+        logger.debug("parent_action: %s", parent_action)
+        logger.debug("file_version: %s", file_version)
+        logger.debug("read_only: %s", read_only)
+
+        with engine.operation(f"tk-multi-workfiles2.{operation}"):
+            fusion = engine.fusion
+            comp = engine.get_current_comp()
+
+            if operation == "current_path":
+                return engine.get_comp_attr("COMPS_FileName", comp)
+
+            elif operation == "open":
+                if comp:
+                    engine.comp_lock.lock(comp)
                     comp.Close()
-            comp = fusion.LoadComp(file_path)
-            comp = fusion.GetCurrentComp()
-            while comp.GetAttrs()["COMPB_Locked"]:
-                comp.Unlock()
-
-            engine.change_context(context)
+                comp = fusion.LoadComp(file_path)
+                comp = fusion.GetCurrentComp()
+                engine.comp_lock.unlock(comp)
+                engine.comp_replaced(comp)
 
-        elif operation == "save":
-            if file_path is not None:
-                # self.update_fusion_saver_nodes(comp, work_fields)
-                self.update_fusion_saver_nodes(file_path)
-                comp.Save(file_path)
                 engine.change_context(context)
 
-        elif operation == "save_as":
-            if file_path is not None:
-                self.save_as(file_path, context)
+            elif operation == "save":
+                if file_path is not None:
+                    # self.update_fusion_saver_nodes(comp, work_fields)
+                    self.update_fusion_saver_nodes(file_path)
+                    engine.save_comp(file_path, comp)
+                    engine.change_context(context)
+
+            elif operation == "save_as":
+                if file_path is not None:
+                    self.save_as(file_path, context)
 
-        elif operation == "reset":
-            successfully_reset = self.reset(context)
+            elif operation == "reset":
+                successfully_reset = self.reset(context)
 
-            # if successfully_reset:
-            #     engine.change_context(context)
+                # if successfully_reset:
+                #     engine.change_context(context)
 
-            return successfully_reset
+                return successfully_reset
 
     def save_as(self, file_path, context):
         engine = self.parent.engine
         if not context:
             context = engine.context
-        logger = engine.logger
+        logger = engine.hook_logger("tk-multi-workfiles2")
 
         logger.info("About to run save_as from hook...")
-        fusion = bmd.scriptapp("Fusion")
-        comp = fusion.GetCurrentComp()
+        comp = engine.get_current_comp()
 
         engine.change_context(context)
-        comp.Save(file_path)
+        engine.save_comp(file_path, comp)
 
         self.update_fusion_saver_nodes(file_path)
 
 
     def reset(self, context):
         engine = self.parent.engine
-        logger = engine.logger
+        logger = engine.hook_logger("tk-multi-workfiles2")
 
         logger.info("About to run reset from hook...")
-        fusion = bmd.scriptapp("Fusion")
+        fusion = engine.fusion
         comp = fusion.GetCurrentComp()
 
         try:
             if comp:
-                while not comp.GetAttrs()["COMPB_Locked"]:
-                    comp.Lock()
+                engine.comp_lock.lock(comp)
 
                 comp.Close()
                 fusion.NewComp()
@@ -169,13 +158,13 @@ class SceneOperation(HookClass):
                 fusion.NewComp()
 
             comp = fusion.GetCurrentComp()
-            while comp.GetAttrs()["COMPB_Locked"]:
-                comp.Unlock()
+            engine.comp_lock.unlock(comp)
+            engine.comp_replaced(comp)
 
             engine.change_context(context)
 
         except Exception as e:
-            logger.error("Error creating a new scene: {}".format(e))
+            logger.error("Error creating a new scene: %s", e)
             return False
 
         return True
@@ -306,7 +295,9 @@ class SceneOperation(HookClass):
     #         self.parent.logger.error(traceback.format_exc())
 
     def update_fusion_saver_nodes(self, file_path):
-        self.parent.logger.info("Updating saver nodes...".ljust(100, "-"))
+        self.parent.engine.hook_logger("tk-multi-workfiles2").info(
+            "Updating saver nodes...".ljust(100, "-")
+        )
 
         errors = self.parent.engine._FusionEngine__update_nodes_version(file_path)
 
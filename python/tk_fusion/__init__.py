@@ -8,4 +8,57 @@
 # agreement to the Shotgun Pipeline Toolkit Source Code License. All rights 
 # not expressly granted therein are reserved by Shotgun Software Inc.
 
-from .menu_generation import ShotgunMenu
\ No newline at end of file
+"""
+The names below are imported from their module the first time they are
+used, ie. ``tk_fusion.ToolIndex``, so loading the engine doesn't import the
+modules it doesn't need yet, such as the Qt ones before Qt is set up.
+"""
+
+import importlib
+
+# name: module it is defined in
+_EXPORTS = {
+    "FusionConnection": "connection",
+    "RpcStats": "rpc_stats",
+    "CallRecorder": "rpc_recorder",
+    "read_recording": "rpc_recorder",
+    "query_tools": "bulk_query",
+    "CompLock": "comp_lock",
+    "CompAttrCache": "attr_cache",
+    "ToolIndex": "tool_index",
+    "ToolRecord": "tool_index",
+    "ToolWriter": "tool_writer",
+    "StartupTracer": "startup_trace",
+    "StartupScheduler": "startup_scheduler",
+    "QtBindingCache": "qt_binding_cache",
+    "ConsoleLogSink": "log_sink",
+    "AsyncFileLogWriter": "log_writer",
+    "HookLogger": "hook_logging",
+    "lazy": "hook_logging",
+    "lazy_import": "lazy_imports",
+    "ImportTimer": "lazy_imports",
+    "StallWatchdog": "stall_watchdog",
+    "IconCache": "icon_cache",
+    "get_icon_cache": "icon_cache",
+    "WidgetRegistry": "widget_registry",
+    "DialogPool": "dialog_pool",
+    "PrewarmCache": "prewarm",
+    "Prewarmer": "prewarm",
+    "ShotgunMenu": "menu_generation",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    value = getattr(importlib.import_module("." + module_name, __name__), name)
+    # the next lookups don't go through here
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
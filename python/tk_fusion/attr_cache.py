@@ -0,0 +1,175 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+
+class CompAttrCache(object):
+    """
+    Cache of comp and tool attributes for the duration of one engine
+    operation.
+
+    The first read of the comp attributes fetches all of them at once, later
+    reads (COMPS_FileName, COMPN_GlobalStart...) are served from memory. Tool
+    attributes are cached per tool name the same way. Writes done through the
+    cache are forwarded to Fusion and update or invalidate the cached values.
+    Changes made behind its back can be reported with :meth:`notify`, using
+    the Fusion notification names.
+    """
+
+    # which part of the cache each Fusion notification invalidates
+    NOTIFICATION_INVALIDATIONS = {
+        "Comp_Save": ("comp",),
+        "Comp_SaveAs": ("comp",),
+        "Comp_SaveVersion": ("comp",),
+        "Comp_Opened": ("comp", "tools"),
+        "Comp_Activate": ("comp", "tools"),
+        "Comp_Close": ("comp", "tools"),
+        "Comp_StartRender": ("comp",),
+        "Comp_EndRender": ("comp",),
+        "Comp_Undo": ("comp", "tools"),
+        "Comp_Redo": ("comp", "tools"),
+        "Tool_Added": ("tool",),
+        "Tool_Deleted": ("tool",),
+        "Tool_Renamed": ("tools",),
+        "Tool_Changed": ("tool",),
+    }
+
+    def __init__(self, comp, logger=None):
+        """
+        :param comp: Composition whose attributes are cached.
+        :param logger: Optional logger.
+        """
+        self.comp = comp
+        self.logger = logger
+        self.hits = 0
+        self.misses = 0
+
+        self._comp_attrs = None
+        self._tool_attrs = {}
+
+    def rebind(self, comp):
+        """
+        Caches the attributes of another comp, ie. the one opened in place
+        of the current one during the operation.
+        """
+        self.comp = comp
+        self.invalidate()
+
+    def comp_attr(self, key):
+        """
+        Returns the value of a comp attribute.
+        """
+        return self.comp_attrs().get(key)
+
+    def comp_attrs(self):
+        """
+        Returns all the comp attributes.
+        """
+        if self._comp_attrs is None:
+            self.misses += 1
+            self._comp_attrs = dict(self.comp.GetAttrs() or {})
+        else:
+            self.hits += 1
+        return self._comp_attrs
+
+    def tool_attr(self, tool_name, key, tool=None):
+        """
+        Returns the value of a tool attribute.
+
+        :param str tool_name: Name of the tool.
+        :param str key: Attribute name.
+        :param tool: Optional tool object, saves a FindTool call on a miss.
+        """
+        attrs = self._tool_attrs.get(tool_name)
+        if attrs is None:
+            self.misses += 1
+            if tool is None:
+                tool = self.comp.FindTool(tool_name)
+            attrs = dict((tool.GetAttrs() if tool else None) or {})
+            self._tool_attrs[tool_name] = attrs
+        else:
+            self.hits += 1
+        return attrs.get(key)
+
+    def set_comp_attrs(self, attrs):
+        """
+        Sets comp attributes in Fusion and in the cache.
+        """
+        self.comp.SetAttrs(attrs)
+        if self._comp_attrs is not None:
+            self._comp_attrs.update(attrs)
+
+    def set_tool_attrs(self, tool_name, attrs, tool=None):
+        """
+        Sets tool attributes in Fusion and in the cache. Renaming a tool moves
+        its cached attributes under the new name.
+        """
+        if tool is None:
+            tool = self.comp.FindTool(tool_name)
+        tool.SetAttrs(attrs)
+
+        cached = self._tool_attrs.pop(tool_name, None)
+        if cached is not None:
+            cached.update(attrs)
+            self._tool_attrs[attrs.get("TOOLS_Name", tool_name)] = cached
+
+    def save(self, path=None):
+        """
+        Saves the comp, invalidating the comp attributes.
+        """
+        if path:
+            result = self.comp.Save(path)
+        else:
+            result = self.comp.Save()
+        self.invalidate("comp")
+        return result
+
+    def invalidate(self, scope=None, tool_name=None):
+        """
+        Drops cached values.
+
+        :param scope: "comp", "tools", "tool" (needs tool_name) or None for
+            everything.
+        :param tool_name: Name of the tool to drop when scope is "tool".
+        """
+        if scope in (None, "comp"):
+            self._comp_attrs = None
+        if scope in (None, "tools"):
+            self._tool_attrs = {}
+        if scope == "tool":
+            if tool_name is None:
+                self._tool_attrs = {}
+            else:
+                self._tool_attrs.pop(tool_name, None)
+
+    def notify(self, event, tool_name=None):
+        """
+        Invalidates what the given Fusion notification may have changed.
+
+        :param str event: Fusion notification name, ie. "Comp_Save".
+        :param str tool_name: Tool the notification relates to, if any.
+        """
+        scopes = self.NOTIFICATION_INVALIDATIONS.get(event)
+        if scopes is None:
+            # unknown notification, better safe than sorry
+            scopes = (None,)
+        for scope in scopes:
+            self.invalidate(scope, tool_name)
+
+    def summary(self):
+        """
+        Returns a one line summary of the cache usage.
+        """
+        total = self.hits + self.misses
+        ratio = (100.0 * self.hits / total) if total else 0.0
+        return "attribute cache hits: %s, misses: %s (%.0f%% hits)" % (
+            self.hits,
+            self.misses,
+            ratio,
+        )
@@ -0,0 +1,271 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Bulk retrieval of tool attributes, data and flow positions.
+
+Calling GetAttrs, GetData or GetPosTable on every tool costs one IPC round
+trip per call. query_tools() instead runs a single Lua snippet inside Fusion
+through comp:Execute(), which collects everything in one go and stores it in
+the comp data, from where it is read back with one GetData call.
+"""
+
+import json
+import uuid
+
+# first line of every generated snippet, followed by the json spec of the
+# query. It makes the scripts easy to spot in the Fusion console and lets
+# tools that can't run Lua (ie. a simulator) answer the query.
+LUA_HEADER = "-- tk_fusion.bulk_query "
+
+# comp data key used to hand the results back to python
+RESULT_KEY_PREFIX = "tk_fusion_bulk_"
+
+_LUA_TEMPLATE = """
+local spec_types = {types}
+local spec_attrs = {attrs}
+local spec_data = {data_keys}
+local spec_detail = {{}}
+for _, tool_type in ipairs({detail_types}) do
+    spec_detail[tool_type] = true
+end
+local want_pos = {positions}
+local result = {{}}
+local count = 0
+local flow = nil
+if want_pos and comp.CurrentFrame then
+    flow = comp.CurrentFrame.FlowView
+end
+local function collect(tool)
+    local all_attrs = tool:GetAttrs()
+    count = count + 1
+    local entry = {{type = all_attrs.TOOLS_RegID, index = count, attrs = {{}}, data = {{}}}}
+    if next(spec_detail) == nil or spec_detail[entry.type] then
+        for _, key in ipairs(spec_attrs) do
+            entry.attrs[key] = all_attrs[key]
+        end
+        for _, key in ipairs(spec_data) do
+            entry.data[key] = tool:GetData(key)
+        end
+    end
+    if flow then
+        local x, y = flow:GetPos(tool)
+        if x then
+            entry.pos = {{x = x, y = y}}
+        end
+    end
+    result[all_attrs.TOOLS_Name] = entry
+end
+-- in comp order, the tool lists are keyed by index
+local function collect_list(tools)
+    local keys = {{}}
+    for key in pairs(tools) do
+        table.insert(keys, key)
+    end
+    table.sort(keys)
+    for _, key in ipairs(keys) do
+        collect(tools[key])
+    end
+end
+if #spec_types == 0 then
+    collect_list(comp:GetToolList({selected}))
+else
+    for _, tool_type in ipairs(spec_types) do
+        collect_list(comp:GetToolList({selected}, tool_type))
+    end
+end
+comp:SetData("{result_key}", result)
+"""
+
+
+def lua_literal(value):
+    """
+    Converts a python value into its Lua source representation.
+
+    :param value: str, int, float, bool, None, list, tuple or dict.
+    :returns: Lua literal as a string.
+    """
+    if value is None:
+        return "nil"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, str):
+        return _lua_string(value)
+    if isinstance(value, (list, tuple)):
+        return "{%s}" % ", ".join(lua_literal(v) for v in value)
+    if isinstance(value, dict):
+        return "{%s}" % ", ".join(
+            "[%s] = %s" % (lua_literal(k), lua_literal(v)) for k, v in value.items()
+        )
+    raise TypeError("Can't convert %r to a Lua literal" % (value,))
+
+
+def _lua_string(value):
+    """
+    Quotes a string for Lua, control characters use decimal escapes as Lua
+    5.1 doesn't know about \\x or \\u escapes.
+    """
+    chars = []
+    for char in value:
+        if char in ('"', "\\"):
+            chars.append("\\" + char)
+        elif ord(char) < 32:
+            chars.append("\\%03d" % ord(char))
+        else:
+            chars.append(char)
+    return '"%s"' % "".join(chars)
+
+
+def build_query_script(spec, result_key):
+    """
+    Returns the Lua snippet answering the given query spec.
+
+    :param dict spec: Query spec as built by :func:`query_tools`.
+    :param str result_key: Comp data key the results are stored under.
+    """
+    script = _LUA_TEMPLATE.format(
+        types=lua_literal(spec["types"]),
+        attrs=lua_literal(spec["attrs"]),
+        data_keys=lua_literal(spec["data"]),
+        detail_types=lua_literal(spec["detail"]),
+        positions=lua_literal(spec["positions"]),
+        selected=lua_literal(spec["selected"]),
+        result_key=result_key,
+    )
+    return LUA_HEADER + json.dumps(spec) + "\n" + script
+
+
+def query_tools(
+    comp,
+    tool_types=None,
+    attrs=(),
+    data_keys=(),
+    positions=False,
+    selected=False,
+    detail_types=None,
+):
+    """
+    Fetches attributes, data keys and flow positions of many tools at once.
+
+    :param comp: Fusion Composition object.
+    :param tool_types: List of tool types (ie. ["Loader", "Saver"]) or None
+        for all the tools in the comp.
+    :param attrs: Names of the tool attributes to return.
+    :param data_keys: Names of the tool data keys to return.
+    :param bool positions: Whether to return the flow view positions.
+    :param bool selected: Only query the selected tools.
+    :param detail_types: List of the tool types the attributes and data are
+        returned for, None for all. The other tools only get their type and
+        position.
+    :returns: Dictionary keyed by tool name, in comp order, with one
+        dictionary per tool holding the keys "type", "attrs", "data" and
+        "pos" (a (x, y) tuple or None). Attribute values are returned as
+        Fusion returns them.
+    """
+    spec = {
+        "types": list(tool_types or []),
+        "detail": list(detail_types or []),
+        "attrs": list(attrs),
+        "data": list(data_keys),
+        "positions": bool(positions),
+        "selected": bool(selected),
+    }
+
+    result_key = RESULT_KEY_PREFIX + uuid.uuid4().hex
+    raw = None
+    try:
+        comp.Execute(build_query_script(spec, result_key))
+        raw = comp.GetData(result_key)
+    finally:
+        # remove the temporary data so it isn't saved with the comp
+        comp.SetData(result_key)
+
+    if raw is None:
+        # scripting failed on the Fusion side, fall back to the slow path
+        return query_tools_per_tool(comp, **_spec_kwargs(spec))
+
+    entries = sorted(raw.items(), key=lambda item: item[1].get("index") or 0)
+    return dict((name, _normalize_entry(entry)) for name, entry in entries)
+
+
+def query_tools_per_tool(
+    comp,
+    tool_types=None,
+    attrs=(),
+    data_keys=(),
+    positions=False,
+    selected=False,
+    detail_types=None,
+):
+    """
+    Same as :func:`query_tools` but doing one call per tool and value. Used as
+    fallback and as reference when benchmarking.
+    """
+    flow = None
+    if positions:
+        flow = comp.CurrentFrame.FlowView
+
+    # in comp order, the tool lists are keyed by index
+    if tool_types:
+        tools = []
+        for tool_type in tool_types:
+            tool_list = comp.GetToolList(selected, tool_type)
+            tools.extend(tool for _, tool in sorted(tool_list.items()))
+    else:
+        tool_list = comp.GetToolList(selected)
+        tools = [tool for _, tool in sorted(tool_list.items())]
+
+    result = {}
+    for tool in tools:
+        all_attrs = tool.GetAttrs()
+        pos = None
+        if flow is not None:
+            pos_table = flow.GetPosTable(tool)
+            if pos_table:
+                pos = (pos_table.get(1), pos_table.get(2))
+        tool_type = all_attrs.get("TOOLS_RegID")
+        detail = not detail_types or tool_type in detail_types
+        result[all_attrs["TOOLS_Name"]] = {
+            "type": tool_type,
+            "attrs": dict((key, all_attrs.get(key)) for key in attrs if detail),
+            "data": dict((key, tool.GetData(key)) for key in data_keys if detail),
+            "pos": pos,
+        }
+    return result
+
+
+def _spec_kwargs(spec):
+    return {
+        "tool_types": spec["types"],
+        "attrs": spec["attrs"],
+        "data_keys": spec["data"],
+        "positions": spec["positions"],
+        "selected": spec["selected"],
+        "detail_types": spec["detail"],
+    }
+
+
+def _normalize_entry(entry):
+    """
+    Converts a Lua table entry into the same structure
+    query_tools_per_tool() returns. Lua tables with no values come back as
+    None so they are replaced by empty dictionaries.
+    """
+    pos = entry.get("pos")
+    if pos:
+        pos = (pos.get("x"), pos.get("y"))
+    return {
+        "type": entry.get("type"),
+        "attrs": dict(entry.get("attrs") or {}),
+        "data": dict(entry.get("data") or {}),
+        "pos": pos or None,
+    }
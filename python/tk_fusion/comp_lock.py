@@ -0,0 +1,179 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import time
+import threading
+import contextlib
+
+
+class CompLock(object):
+    """
+    Reentrant manager of the composition lock.
+
+    Locking the comp stops Fusion from popping up dialogs while the engine
+    modifies it. Instead of every caller spinning on
+    ``while not comp.GetAttrs()["COMPB_Locked"]: comp.Lock()``, callers nest
+    ``with engine.comp_lock(comp):`` blocks. The comp is only locked when the
+    outermost block is entered and unlocked when it is left, retrying a
+    bounded amount of times with an exponential back off.
+
+    The time spent holding the lock and the amount of retries are kept in
+    :attr:`stats` and logged whenever the lock is released.
+    """
+
+    def __init__(
+        self,
+        comp_getter,
+        logger=None,
+        max_retries=20,
+        initial_delay=0.001,
+        max_delay=0.1,
+    ):
+        """
+        :param callable comp_getter: Returns the current comp, used when no
+            comp is given explicitly.
+        :param logger: Optional logger.
+        :param int max_retries: Maximum amount of Lock/Unlock retries.
+        :param float initial_delay: Seconds waited before the second retry,
+            the first one happens straight away.
+        :param float max_delay: Upper bound of the wait between retries.
+        """
+        self.comp_getter = comp_getter
+        self.logger = logger
+        self.max_retries = max_retries
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+
+        self.stats = {
+            "acquisitions": 0,
+            "lock_retries": 0,
+            "unlock_retries": 0,
+            "failures": 0,
+            "time_in_lock": 0.0,
+            "max_time_in_lock": 0.0,
+        }
+
+        self._mutex = threading.RLock()
+        self._depth = 0
+        self._comp = None
+        self._acquired_at = None
+
+    @property
+    def depth(self):
+        """
+        Current nesting depth, 0 when the lock isn't held.
+        """
+        return self._depth
+
+    @property
+    def held_for(self):
+        """
+        Seconds the lock has been held for, 0.0 when it isn't held. Safe to
+        read from another thread.
+        """
+        acquired_at = self._acquired_at
+        if not self._depth or acquired_at is None:
+            return 0.0
+        return time.time() - acquired_at
+
+    def __call__(self, comp=None):
+        """
+        Returns a context manager holding the comp lock.
+
+        :param comp: Composition to lock, defaults to the current one. Nested
+            blocks reuse the comp of the outermost block.
+        """
+        return self._hold(comp)
+
+    @contextlib.contextmanager
+    def _hold(self, comp):
+        with self._mutex:
+            if self._depth == 0:
+                self._comp = comp if comp is not None else self.comp_getter()
+                self._acquired_at = time.time()
+                self.stats["acquisitions"] += 1
+                if not self.lock(self._comp):
+                    self.stats["failures"] += 1
+            self._depth += 1
+            try:
+                yield self._comp
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._release()
+
+    def _release(self):
+        comp = self._comp
+        self._comp = None
+
+        if not self.unlock(comp):
+            self.stats["failures"] += 1
+
+        held = time.time() - self._acquired_at
+        self.stats["time_in_lock"] += held
+        self.stats["max_time_in_lock"] = max(self.stats["max_time_in_lock"], held)
+        self._log(
+            "debug",
+            "Comp lock held for %.3fs (lock retries: %s, unlock retries: %s, "
+            "acquisitions: %s)"
+            % (
+                held,
+                self.stats["lock_retries"],
+                self.stats["unlock_retries"],
+                self.stats["acquisitions"],
+            ),
+        )
+
+    def lock(self, comp):
+        """
+        Locks the given comp, without any nesting bookkeeping.
+
+        :returns: True if the comp ended up locked.
+        """
+        return self._retry(comp, comp.Lock, True, "lock_retries")
+
+    def unlock(self, comp):
+        """
+        Fully unlocks the given comp, without any nesting bookkeeping. As
+        Fusion counts the Lock calls, Unlock is called until the comp reports
+        itself as unlocked.
+
+        :returns: True if the comp ended up unlocked.
+        """
+        return self._retry(comp, comp.Unlock, False, "unlock_retries")
+
+    def _retry(self, comp, action, wanted_state, counter):
+        if comp is None:
+            return False
+
+        delay = 0.0
+        for attempt in range(self.max_retries + 1):
+            if bool(comp.GetAttrs("COMPB_Locked")) == wanted_state:
+                return True
+            if attempt:
+                self.stats[counter] += 1
+            action()
+            if delay:
+                time.sleep(delay)
+            delay = min(max(delay * 2, self.initial_delay), self.max_delay)
+
+        if bool(comp.GetAttrs("COMPB_Locked")) == wanted_state:
+            return True
+
+        self._log(
+            "warning",
+            "Couldn't %s the comp after %s retries."
+            % ("lock" if wanted_state else "unlock", self.max_retries),
+        )
+        return False
+
+    def _log(self, level, msg):
+        if self.logger:
+            getattr(self.logger, level)(msg)
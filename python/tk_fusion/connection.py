@@ -0,0 +1,176 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import time
+import importlib
+import threading
+import traceback
+
+from .rpc_stats import RpcProxy
+
+
+class FusionConnection(object):
+    """
+    Engine owned provider of the BlackmagicFusion scriptapp proxy.
+
+    Every scriptapp("Fusion") call is a cross process handshake, so the proxy
+    is created lazily on first use and then reused by the engine, the menu and
+    all the hooks. The proxy is health checked (at most once every
+    ``health_check_interval`` seconds) and transparently recreated when it
+    went stale, ie. after Fusion restarted its script server.
+    """
+
+    def __init__(
+        self,
+        logger=None,
+        app_name="Fusion",
+        health_check_interval=5.0,
+        rpc_stats=None,
+    ):
+        """
+        :param logger: Optional logger used to report (re)connections.
+        :param str app_name: Name of the application passed to scriptapp.
+        :param float health_check_interval: Minimum amount of seconds between
+            two health checks of the cached proxy. Use 0 to check on every
+            access.
+        :param rpc_stats: Optional :class:`RpcStats`. When given, the proxy
+            and all the Fusion objects obtained through it record their calls
+            in it.
+        """
+        self.logger = logger
+        self.app_name = app_name
+        self.health_check_interval = health_check_interval
+        self.rpc_stats = rpc_stats
+
+        # number of scriptapp handshakes done by this provider
+        self.connection_count = 0
+
+        self._bmd = None
+        self._fusion = None
+        self._last_check = 0.0
+        self._lock = threading.RLock()
+
+    @property
+    def fusion(self):
+        """
+        The shared Fusion proxy, connecting or reconnecting if needed.
+        """
+        return self.get()
+
+    @property
+    def is_connected(self):
+        """
+        True if a proxy has already been created.
+        """
+        return self._fusion is not None
+
+    def get(self):
+        """
+        Returns the shared Fusion proxy.
+
+        :returns: BlackmagicFusion scriptapp proxy or None if Fusion can not be
+            reached.
+        """
+        with self._lock:
+            if self._fusion is None:
+                return self._connect()
+
+            now = time.time()
+            if now - self._last_check < self.health_check_interval:
+                return self._fusion
+
+            self._last_check = now
+            if not self._is_alive(self._fusion):
+                self._log("debug", "Fusion proxy went stale, reconnecting...")
+                return self._connect(reload_module=True)
+
+            return self._fusion
+
+    def get_current_comp(self):
+        """
+        Convenience method returning the current composition.
+
+        :returns: Fusion Composition object or None.
+        """
+        fusion = self.get()
+        if fusion is None:
+            return None
+        return fusion.GetCurrentComp()
+
+    def reconnect(self):
+        """
+        Drops the cached proxy and connects again.
+
+        :returns: BlackmagicFusion scriptapp proxy or None.
+        """
+        with self._lock:
+            return self._connect(reload_module=True)
+
+    def invalidate(self):
+        """
+        Drops the cached proxy, the next access will connect again.
+        """
+        with self._lock:
+            self._fusion = None
+
+    def _connect(self, reload_module=False):
+        """
+        Performs the scriptapp handshake.
+
+        When the handshake returns nothing, the BlackmagicFusion module is
+        reloaded and the handshake retried once, same as the Shotgrid.py
+        startup script does.
+        """
+        bmd = self._get_module(reload_module)
+
+        self.connection_count += 1
+        fusion = bmd.scriptapp(self.app_name)
+
+        if fusion is None and not reload_module:
+            bmd = self._get_module(reload=True)
+            self.connection_count += 1
+            fusion = bmd.scriptapp(self.app_name)
+
+        if fusion is not None and self.rpc_stats is not None:
+            fusion = RpcProxy(fusion, self.rpc_stats)
+
+        self._fusion = fusion
+        self._last_check = time.time()
+        self._log(
+            "debug",
+            "Connected to %s (connection #%s): %s"
+            % (self.app_name, self.connection_count, fusion),
+        )
+        return fusion
+
+    def _get_module(self, reload=False):
+        if self._bmd is None:
+            import BlackmagicFusion as bmd
+
+            self._bmd = bmd
+        elif reload:
+            try:
+                self._bmd = importlib.reload(self._bmd)
+            except Exception:
+                self._log(
+                    "debug",
+                    "Couldn't reload BlackmagicFusion:\n%s" % traceback.format_exc(),
+                )
+        return self._bmd
+
+    def _is_alive(self, fusion):
+        try:
+            return fusion.GetAttrs() is not None
+        except Exception:
+            return False
+
+    def _log(self, level, msg):
+        if self.logger:
+            getattr(self.logger, level)(msg)
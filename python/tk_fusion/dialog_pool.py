@@ -0,0 +1,172 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import functools
+import collections
+
+from sgtk.platform.qt import QtCore
+
+from .widget_registry import current_rss
+
+
+class DialogPool(QtCore.QObject):
+    """
+    Keeps the dialogs of the heavy apps alive once closed, so opening them
+    again shows the same dialog instead of building it and its Shotgrid
+    models from scratch.
+
+    Closing a pooled dialog hides it: the close events of the dialog and of
+    the app widget, and the escape key, are filtered before they reach them,
+    so the app doesn't tear its models down. The least recently shown hidden
+    dialogs are really closed when more than ``size`` are pooled, or when
+    the resident memory goes over ``max_rss``. The engine resets a pooled
+    dialog before showing it again.
+    """
+
+    def __init__(self, size=3, max_rss=None, logger=None, parent=None):
+        """
+        :param int size: Amount of dialogs kept alive.
+        :param int max_rss: Resident memory in bytes over which the hidden
+            dialogs are closed, None to not check it.
+        :param logger: Optional logger.
+        :param parent: Optional parent QObject.
+        """
+        super(DialogPool, self).__init__(parent)
+        self.size = size
+        self.max_rss = max_rss
+        self.logger = logger
+        self.stats = collections.Counter()
+        # key: (dialog, widget), the most recently shown last
+        self._dialogs = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._dialogs)
+
+    def get(self, key):
+        """
+        Returns the pooled dialog and widget of a key, or None.
+
+        :param key: Hashable key of the dialog, ie. the app instance and the
+            widget class.
+        :returns: (dialog, widget) tuple or None.
+        """
+        item = self._dialogs.get(key)
+        if item is None:
+            self.stats["misses"] += 1
+            return None
+        try:
+            # deleted behind our back, ie. by the app itself
+            item[0].isVisible()
+        except RuntimeError:
+            self._dialogs.pop(key, None)
+            self.stats["lost"] += 1
+            return None
+        self._dialogs.move_to_end(key)
+        self.stats["hits"] += 1
+        return item
+
+    def holds(self, dialog):
+        """
+        Returns True if a dialog is pooled.
+        """
+        return any(item[0] is dialog for item in self._dialogs.values())
+
+    def add(self, key, dialog, widget):
+        """
+        Pools a dialog shown for the first time.
+        """
+        if key in self._dialogs:
+            self.evict(key)
+        self._dialogs[key] = (dialog, widget)
+        dialog.installEventFilter(self)
+        widget.installEventFilter(self)
+        dialog.destroyed.connect(functools.partial(self._forget, key, id(dialog)))
+        self.stats["added"] += 1
+        self.trim()
+
+    def _forget(self, key, dialog_id, *args):
+        item = self._dialogs.get(key)
+        if item is not None and id(item[0]) == dialog_id:
+            del self._dialogs[key]
+            self.stats["lost"] += 1
+
+    def evict(self, key):
+        """
+        Closes a pooled dialog for good, the app cleans up and the dialog is
+        deleted as if it had never been pooled.
+        """
+        item = self._dialogs.pop(key, None)
+        if item is None:
+            return
+        dialog, widget = item
+        try:
+            widget.removeEventFilter(self)
+            dialog.removeEventFilter(self)
+            dialog.close()
+        except RuntimeError:
+            # deleted already
+            pass
+        self.stats["evicted"] += 1
+
+    def trim(self):
+        """
+        Closes the least recently shown hidden dialogs over the pool size,
+        and one more when the resident memory is over the limit: the memory
+        of a closed dialog isn't given back at once. The visible dialogs are
+        never closed.
+
+        :returns: Amount of dialogs closed.
+        """
+        evicted = 0
+        over_memory = False
+        if self.max_rss:
+            rss = current_rss(peak=False)
+            over_memory = rss is not None and rss > self.max_rss
+        for key in list(self._dialogs):
+            over_size = len(self._dialogs) > self.size
+            if not over_size and not over_memory:
+                break
+            try:
+                if self._dialogs[key][0].isVisible():
+                    continue
+            except RuntimeError:
+                pass
+            if self.logger is not None:
+                self.logger.debug(
+                    "Closing pooled dialog %s, %s",
+                    key,
+                    "pool full" if over_size else "memory over the limit",
+                )
+            self.evict(key)
+            evicted += 1
+            if not over_size:
+                over_memory = False
+        return evicted
+
+    def clear(self):
+        """
+        Closes all the pooled dialogs, ie. when their apps are destroyed.
+        """
+        for key in list(self._dialogs):
+            self.evict(key)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QtCore.QEvent.KeyPress:
+            if event.key() != QtCore.Qt.Key_Escape:
+                return False
+        elif event.type() != QtCore.QEvent.Close:
+            return False
+        # hide instead of closing, the dialog keeps its models
+        event.ignore()
+        obj.window().hide()
+        self.stats["hidden"] += 1
+        # not from the close event of the dialog that may be closed
+        QtCore.QTimer.singleShot(0, self.trim)
+        return True
@@ -0,0 +1,178 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Logging helpers for the hooks.
+
+Messages take %-style arguments so nothing is formatted when their level is
+disabled, and expensive arguments such as a pformat of all the tools are
+wrapped in :func:`lazy`, which only runs when the message is formatted::
+
+    log = engine.hook_logger("tk-multi-breakdown")
+    log.debug("Found references:\\n%s", log.pformat(refs))
+
+Messages logged for every item of a loop are sampled, only the first ones
+are logged and the amount of the others is logged when the loop ends::
+
+    with log.sampled("Scanning loaders") as items:
+        for loader in loaders:
+            items.info("Scanning %s: %s", loader.name, loader.clip_path)
+"""
+
+import pprint
+import logging
+
+
+class Lazy(object):
+    """
+    Message argument computed when the message is formatted, once.
+    """
+
+    __slots__ = ("_func", "_args", "_kwargs", "_value")
+
+    def __init__(self, func, *args, **kwargs):
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+        self._value = None
+
+    def __str__(self):
+        # records can be formatted by several handlers, the value is computed
+        # by the first one
+        if self._value is None:
+            self._value = str(self._func(*self._args, **self._kwargs))
+        return self._value
+
+    __repr__ = __str__
+
+
+def lazy(func, *args, **kwargs):
+    """
+    Returns a message argument calling ``func(*args, **kwargs)`` when the
+    message is formatted.
+    """
+    return Lazy(func, *args, **kwargs)
+
+
+class HookLogger(object):
+    """
+    Logger of a hook, with the level set in the engine ``hook_log_levels``
+    setting and sampling of the messages logged in loops.
+    """
+
+    def __init__(self, logger, level=None, samples=10):
+        """
+        :param logger: Standard logger the messages are logged to.
+        :param level: Level name or number of this hook, None to use the
+            level of the engine logger.
+        :param int samples: Amount of messages logged per sampled loop.
+        """
+        self.logger = logger
+        self.samples = samples
+        if level is not None:
+            if not isinstance(level, int):
+                level = logging.getLevelName(str(level).upper())
+            if isinstance(level, int):
+                logger.setLevel(level)
+
+    def isEnabledFor(self, level):
+        return self.logger.isEnabledFor(level)
+
+    def log(self, level, msg, *args, **kwargs):
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, msg, *args, **kwargs)
+
+    def debug(self, msg, *args, **kwargs):
+        self.log(logging.DEBUG, msg, *args, **kwargs)
+
+    def info(self, msg, *args, **kwargs):
+        self.log(logging.INFO, msg, *args, **kwargs)
+
+    def warning(self, msg, *args, **kwargs):
+        self.log(logging.WARNING, msg, *args, **kwargs)
+
+    def error(self, msg, *args, **kwargs):
+        self.log(logging.ERROR, msg, *args, **kwargs)
+
+    def exception(self, msg, *args, **kwargs):
+        kwargs.setdefault("exc_info", True)
+        self.log(logging.ERROR, msg, *args, **kwargs)
+
+    @staticmethod
+    def pformat(value):
+        """
+        Returns a lazy pretty printed value.
+        """
+        return Lazy(pprint.pformat, value)
+
+    def sampled(self, name, samples=None):
+        """
+        Returns a context manager sampling the debug and info messages of a
+        loop. Warnings and errors are always logged.
+
+        :param str name: Describes the messages in the summary, ie.
+            "Scanning loaders".
+        :param int samples: Amount of messages logged, defaults to the
+            ``hook_log_samples`` engine setting.
+        """
+        return SampledLog(self, name, self.samples if samples is None else samples)
+
+
+class SampledLog(object):
+    """
+    Logs the first debug and info messages of a loop and counts the others,
+    see :meth:`HookLogger.sampled`.
+    """
+
+    def __init__(self, log, name, samples):
+        self._log = log
+        self.name = name
+        self.samples = samples
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.done()
+
+    def done(self):
+        """
+        Logs the amount of messages that weren't logged, for loops that don't
+        use the context manager.
+        """
+        skipped = self.count - self.samples
+        if skipped > 0:
+            self._log.info(
+                "%s: %s more messages not logged, out of %s",
+                self.name,
+                skipped,
+                self.count,
+            )
+        self.count = 0
+
+    def _sample(self, level, msg, args, kwargs):
+        if not self._log.isEnabledFor(level):
+            return
+        self.count += 1
+        if self.count <= self.samples:
+            self._log.log(level, msg, *args, **kwargs)
+
+    def debug(self, msg, *args, **kwargs):
+        self._sample(logging.DEBUG, msg, args, kwargs)
+
+    def info(self, msg, *args, **kwargs):
+        self._sample(logging.INFO, msg, args, kwargs)
+
+    def warning(self, msg, *args, **kwargs):
+        self._log.warning(msg, *args, **kwargs)
+
+    def error(self, msg, *args, **kwargs):
+        self._log.error(msg, *args, **kwargs)
@@ -0,0 +1,110 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import time
+import threading
+import collections
+
+from sgtk.platform.qt import QtGui
+
+
+class IconCache(object):
+    """
+    Process wide cache of the icons of the menu panel, keyed by path and
+    modification time.
+
+    The app icons usually live on network storage, where reading them again
+    for every panel is slow. An icon is read once and shared by all the
+    buttons and actions using it. The modification time of a path is checked
+    at most once every ``recheck`` seconds, an icon changed on disk is read
+    again after that.
+
+    Use :func:`get_icon_cache` to get the shared instance.
+    """
+
+    def __init__(self, recheck=30.0):
+        """
+        :param float recheck: Seconds between two checks of the modification
+            time of a path.
+        """
+        self.recheck = recheck
+        self.stats = collections.Counter()
+        self._lock = threading.Lock()
+        # path: (time checked, mtime)
+        self._mtimes = {}
+        # (path, mtime): QPixmap
+        self._pixmaps = {}
+        # (path, mtime): QIcon
+        self._icons = {}
+
+    def icon(self, path):
+        """
+        Returns the QIcon of a file, an empty one if it doesn't exist.
+        """
+        key = self._key(path)
+        icon = self._icons.get(key)
+        if icon is None:
+            pixmap = self.pixmap(path)
+            icon = QtGui.QIcon(pixmap) if not pixmap.isNull() else QtGui.QIcon()
+            with self._lock:
+                self._icons[key] = icon
+        return icon
+
+    def pixmap(self, path):
+        """
+        Returns the QPixmap of a file, a null one if it doesn't exist.
+        """
+        key = self._key(path)
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self.stats["hits"] += 1
+            return pixmap
+        self.stats["reads"] += 1
+        pixmap = QtGui.QPixmap(path) if key[1] is not None else QtGui.QPixmap()
+        with self._lock:
+            # forget the previous version of a changed file
+            for old_key in [k for k in self._pixmaps if k[0] == path]:
+                self._pixmaps.pop(old_key, None)
+                self._icons.pop(old_key, None)
+            self._pixmaps[key] = pixmap
+        return pixmap
+
+    def clear(self):
+        with self._lock:
+            self._mtimes.clear()
+            self._pixmaps.clear()
+            self._icons.clear()
+
+    def _key(self, path):
+        now = time.time()
+        checked = self._mtimes.get(path)
+        if checked is not None and now - checked[0] < self.recheck:
+            return path, checked[1]
+        self.stats["stats"] += 1
+        try:
+            mtime = os.path.getmtime(path)
+        except (OSError, TypeError):
+            mtime = None
+        self._mtimes[path] = (now, mtime)
+        return path, mtime
+
+
+_icon_cache = None
+
+
+def get_icon_cache():
+    """
+    Returns the :class:`IconCache` shared by the process.
+    """
+    global _icon_cache
+    if _icon_cache is None:
+        _icon_cache = IconCache()
+    return _icon_cache
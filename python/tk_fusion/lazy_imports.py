@@ -0,0 +1,155 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Deferred imports and import timing.
+
+Toolkit reloads the hooks on every context change, so whatever they import
+at module level is paid again and again. Modules only some code paths need
+are imported with :func:`lazy_import`, which returns a stand in importing
+the module the first time one of its attributes is used::
+
+    fileseq = lazy_import("fileseq")
+
+    def find_range(path):
+        return fileseq.findSequenceOnDisk(path).frameRange()
+
+The hooks, which can't import this package at module level, import such
+modules inside the functions using them instead.
+
+:class:`ImportTimer` measures the modules imported while it is active, like
+``python -X importtime`` but limited to a block of code, ie. the load of a
+hook. benchmarks/check_hook_imports.py uses it to report the import time of
+every hook and to fail when one goes over its budget.
+"""
+
+import sys
+import time
+import builtins
+import importlib
+import threading
+
+
+class LazyModule(object):
+    """
+    Stand in for a module, imported on first attribute access.
+    """
+
+    def __init__(self, name):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_module", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _load(self):
+        module = self._module
+        if module is None:
+            with self._lock:
+                module = self._module
+                if module is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    import_times[self._name] = time.perf_counter() - start
+                    object.__setattr__(self, "_module", module)
+        return module
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        if self._module is None:
+            return "<lazy module %r, not imported>" % self._name
+        return repr(self._module)
+
+
+# seconds spent importing the lazy modules, by module name
+import_times = {}
+
+
+def lazy_import(name):
+    """
+    Returns ``name`` if it is imported already, else a :class:`LazyModule`.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
+
+
+class ImportTimer(object):
+    """
+    Times the modules imported while active, by wrapping ``__import__``.
+
+    Only the first import of a module is recorded, later ones are found in
+    ``sys.modules``. For every module the cumulative time includes the
+    modules it imports, the self time doesn't::
+
+        with ImportTimer() as timer:
+            runpy.run_path(hook_path)
+        print(timer.report())
+    """
+
+    def __init__(self):
+        # (name, cumulative seconds, self seconds, depth), in import order
+        self.records = []
+        self.total = 0.0
+        self._stack = []
+        self._original = None
+        self._start = None
+
+    def __enter__(self):
+        self._original = builtins.__import__
+        builtins.__import__ = self._import
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.total = time.perf_counter() - self._start
+        builtins.__import__ = self._original
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original(name, globals, locals, fromlist, level)
+
+        index = len(self.records)
+        self.records.append(None)
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            self.records[index] = (name, elapsed, elapsed - children, len(self._stack))
+
+    def slowest(self, limit=10):
+        """
+        Returns the records of the top level imports taking the most time.
+        """
+        top = [record for record in self.records if record[3] == 0]
+        return sorted(top, key=lambda record: -record[1])[:limit]
+
+    def report(self, limit=10):
+        """
+        Returns the slowest top level imports, as text.
+        """
+        lines = ["%8.1fms total" % (self.total * 1000.0)]
+        for name, cumulative, own, _ in self.slowest(limit):
+            lines.append(
+                "%8.1fms %8.1fms self  %s" % (cumulative * 1000.0, own * 1000.0, name)
+            )
+        return "\n".join(lines)
@@ -0,0 +1,182 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import time
+import logging
+import threading
+import collections
+
+
+class ConsoleLogSink(object):
+    """
+    Buffers the log records shown in the Fusion console and writes them in
+    batches.
+
+    Records are queued as they are, formatting is left to :meth:`flush`,
+    which is scheduled at most once per event loop tick instead of once per
+    record. A flush writes the whole batch to the console in one go:
+
+    - consecutive identical messages are collapsed into one line with a
+      repeat count,
+    - when a batch has more than ``max_lines`` records, only the first and
+      last ones are written, with the warnings and errors in between and the
+      amount of the other records skipped,
+    - when the buffer is full the new info and debug records are dropped,
+      the warnings and errors replace the oldest records, and they are
+      counted.
+    """
+
+    LABELS = (
+        (logging.ERROR, "Error"),
+        (logging.WARNING, "Warning"),
+        (logging.INFO, "Info"),
+        (logging.NOTSET, "Debug"),
+    )
+
+    def __init__(self, schedule, write=None, capacity=10000, max_lines=500):
+        """
+        :param callable schedule: Runs a callable on the next event loop
+            tick of the main thread, ie. ``engine.async_execute_in_main_thread``.
+        :param callable write: Writes a block of text to the console,
+            defaults to printing it.
+        :param int capacity: Maximum amount of buffered records.
+        :param int max_lines: Maximum amount of records written per flush.
+        """
+        self.schedule = schedule
+        self.write = write or self._print
+        self.max_lines = max_lines
+        self.stats = collections.Counter()
+
+        self._lock = threading.Lock()
+        self._records = collections.deque(maxlen=capacity)
+        self._dropped = 0
+        self._scheduled = False
+        self._formatter = logging.Formatter("Shotgrid %(basename)s: %(message)s")
+        self._debug_formatter = logging.Formatter(
+            "Debug: Shotgrid %(basename)s: %(message)s"
+        )
+        self._asctime = (None, None)
+
+    def emit(self, record):
+        """
+        Queues a record and schedules a flush if none is pending.
+        """
+        # debug messages are only shown in the console when asked for
+        if record.levelno < logging.INFO and os.environ.get("TK_DEBUG") != "1":
+            return
+        with self._lock:
+            if len(self._records) == self._records.maxlen:
+                self._dropped += 1
+                # a full buffer drops the lower level records first
+                if record.levelno < logging.WARNING:
+                    return
+            self._records.append(record)
+            self.stats["emitted"] += 1
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self.schedule(self.flush)
+
+    def flush(self):
+        """
+        Writes the queued records to the console.
+        """
+        with self._lock:
+            records = self._records
+            self._records = collections.deque(maxlen=records.maxlen)
+            dropped = self._dropped
+            self._dropped = 0
+            self._scheduled = False
+        if not records and not dropped:
+            return
+
+        self.stats["flushes"] += 1
+        lines = []
+        if dropped:
+            self.stats["dropped"] += dropped
+            lines.append(
+                self._line(
+                    logging.WARNING,
+                    time.time(),
+                    "Shotgrid: %s log messages dropped, the log buffer was full"
+                    % dropped,
+                )
+            )
+
+        skipped = 0
+        if len(records) > self.max_lines:
+            # the first and last messages are written, in between only the
+            # warnings and errors
+            records = list(records)
+            half = self.max_lines // 2
+            head, tail = records[:half], records[len(records) - half:]
+            middle = records[half:len(records) - half]
+            tail = [r for r in middle if r.levelno >= logging.WARNING] + tail
+            skipped = len(records) - len(head) - len(tail)
+        else:
+            head, tail = records, []
+
+        self._format(head, lines)
+        if skipped > 0:
+            self.stats["skipped"] += skipped
+            # tail is empty when max_lines is 1 and nothing was kept
+            created = tail[0].created if tail else records[-1].created
+            lines.append(
+                self._line(
+                    logging.WARNING,
+                    created,
+                    "Shotgrid: %s info and debug log messages skipped" % skipped,
+                )
+            )
+        self._format(tail, lines)
+
+        self.stats["written"] += len(lines)
+        self.write("\n".join(lines))
+
+    def _format(self, records, lines):
+        """
+        Formats records into lines, collapsing consecutive duplicates.
+        """
+        previous = None
+        repeats = 0
+        for record in records:
+            if record.levelno < logging.INFO:
+                msg = self._debug_formatter.format(record)
+            else:
+                msg = self._formatter.format(record)
+            if previous is not None and msg == previous[1] and (
+                record.levelno == previous[0]
+            ):
+                repeats += 1
+                continue
+            if repeats:
+                lines[-1] += " (repeated %s times)" % (repeats + 1)
+                self.stats["collapsed"] += repeats
+                repeats = 0
+            previous = (record.levelno, msg)
+            lines.append(self._line(record.levelno, record.created, msg))
+        if repeats:
+            lines[-1] += " (repeated %s times)" % (repeats + 1)
+            self.stats["collapsed"] += repeats
+
+    def _line(self, levelno, created, msg):
+        # same layout as the display_* functions of the engine
+        for level, label in self.LABELS:
+            if levelno >= level:
+                break
+        second = int(created)
+        if self._asctime[0] != second:
+            self._asctime = (second, time.asctime(time.localtime(second)))
+        return "%s - Shotgrid %s | Fusion engine | %s " % (self._asctime[1], label, msg)
+
+    @staticmethod
+    def _print(text):
+        print(text)
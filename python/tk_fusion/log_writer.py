@@ -0,0 +1,274 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import sys
+import gzip
+import time
+import shutil
+import logging
+import threading
+import collections
+
+
+class AsyncFileLogWriter(logging.Handler):
+    """
+    Log handler writing the engine log to a file from a background thread.
+
+    :meth:`emit` only queues the record, it is formatted, with its traceback
+    if any, and written by the writer thread, so logging from the Fusion main
+    thread doesn't wait on the formatting or on a slow file system. The
+    writer thread wakes up every ``flush_interval`` seconds, or as soon as a
+    record is queued when it is idle, and writes all the queued records at
+    once. As with a QueueHandler, a record's arguments are formatted then,
+    so they shouldn't be modified after logging them.
+
+    The queue is bounded both in records and in bytes, the size of a record
+    being estimated from its message. When it is full the oldest records are
+    dropped and the amount dropped is written to the file with the next
+    batch.
+
+    The file is rotated when it grows over ``max_bytes`` or when it was
+    opened by the writer more than ``rotate_interval`` seconds ago, a file
+    left by a previous session is kept that long again. Rotated files are
+    renamed ``<path>.1``, ``<path>.2``... and gzip compressed by the writer
+    thread, only the ``backup_count`` most recent ones are kept.
+    """
+
+    def __init__(
+        self,
+        path,
+        max_bytes=10 * 1024 * 1024,
+        rotate_interval=24 * 3600,
+        backup_count=5,
+        compress=True,
+        capacity=10000,
+        max_queued_bytes=8 * 1024 * 1024,
+        flush_interval=0.5,
+    ):
+        """
+        :param str path: Path of the log file.
+        :param int max_bytes: Size the file is rotated at, 0 to turn off.
+        :param int rotate_interval: Age in seconds the file is rotated at, 0
+            to turn off.
+        :param int backup_count: Amount of rotated files kept.
+        :param bool compress: Whether rotated files are gzip compressed.
+        :param int capacity: Maximum amount of queued records.
+        :param int max_queued_bytes: Maximum size of the queued records.
+        :param float flush_interval: Seconds between two writes to the file.
+        """
+        logging.Handler.__init__(self)
+        self.setFormatter(
+            logging.Formatter(
+                "%(asctime)s [%(process)d %(levelname)s %(name)s] %(message)s"
+            )
+        )
+        self.path = path
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+        self.compress = compress
+        self.max_queued_bytes = max_queued_bytes
+        self.flush_interval = flush_interval
+        self.stats = collections.Counter()
+
+        self._condition = threading.Condition(threading.Lock())
+        self._lines = collections.deque(maxlen=capacity)
+        self._queued_bytes = 0
+        self._dropped = 0
+        self._closing = False
+        self._file = None
+        self._opened = None
+        self._size = 0
+
+        self._thread = threading.Thread(
+            target=self._run, name="tk-fusion log writer"
+        )
+        self._thread.daemon = True
+        self._thread.start()
+
+    def emit(self, record):
+        """
+        Queues a record, called by :meth:`logging.Handler.handle`. It is
+        formatted by the writer thread.
+        """
+        self._queue(record)
+
+    def write(self, line):
+        """
+        Queues a line of text, without formatting it.
+        """
+        self._queue(line)
+
+    def _queue(self, item):
+        with self._condition:
+            if self._closing:
+                return
+            lines = self._lines
+            if len(lines) == lines.maxlen:
+                self._queued_bytes -= _size(lines[0])
+                self._dropped += 1
+            lines.append(item)
+            self._queued_bytes += _size(item)
+            while self._queued_bytes > self.max_queued_bytes and len(lines) > 1:
+                self._queued_bytes -= _size(lines.popleft())
+                self._dropped += 1
+            if len(lines) == 1:
+                # the thread may be idle, waiting for a first line
+                self._condition.notify()
+
+    def flush(self):
+        """
+        Wakes up the writer thread, the lines are written asynchronously.
+        """
+        with self._condition:
+            self._condition.notify()
+
+    def close(self, timeout=5.0):
+        """
+        Writes the queued lines and stops the writer thread. Waits at most
+        ``timeout`` seconds, lines still queued after it are lost.
+        """
+        with self._condition:
+            self._closing = True
+            self._condition.notify()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        logging.Handler.close(self)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._lines and not self._closing:
+                    self._condition.wait()
+                elif not self._closing:
+                    # batch the lines logged in the next interval
+                    self._condition.wait(self.flush_interval)
+                lines = self._lines
+                self._lines = collections.deque(maxlen=lines.maxlen)
+                self._queued_bytes = 0
+                dropped = self._dropped
+                self._dropped = 0
+                closing = self._closing
+
+            if dropped:
+                self.stats["dropped"] += dropped
+                lines.appendleft(
+                    "%s [%s WARNING %s] %s log lines dropped, the log queue was full"
+                    % (time.strftime("%Y-%m-%d %H:%M:%S"), os.getpid(), __name__, dropped)
+                )
+            if lines:
+                self._write_lines(self._format_lines(lines))
+            if closing:
+                self._close_file()
+                return
+
+    def _format_lines(self, items):
+        """
+        Formats the queued records. Runs in the writer thread.
+        """
+        lines = []
+        for item in items:
+            if isinstance(item, str):
+                lines.append(item)
+                continue
+            try:
+                lines.append(self.format(item))
+            except Exception:
+                self.stats["format_errors"] += 1
+                self.handleError(item)
+        return lines
+
+    def _write_lines(self, lines):
+        """
+        Writes a batch of lines, rotating the file first if needed. Runs in
+        the writer thread.
+        """
+        data = "\n".join(lines) + "\n"
+        try:
+            if self._file is not None and self._should_rotate():
+                self._rotate()
+            if self._file is None:
+                self._open()
+            self._file.write(data)
+            self._file.flush()
+        except Exception as e:
+            # there is nowhere else to log to, keep going with the next batch
+            self.stats["errors"] += 1
+            self.stats["lost"] += len(lines)
+            if self.stats["errors"] == 1:
+                sys.stderr.write("tk-fusion log writer: %s\n" % e)
+            self._close_file()
+            return
+        self._size += len(data)
+        self.stats["written"] += len(lines)
+        self.stats["writes"] += 1
+
+    def _open(self):
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder)
+        self._file = open(self.path, "a", encoding="utf-8", errors="replace")
+        self._size = self._file.tell()
+        # the creation time of a file isn't known on Linux and macOS, ctime is
+        # the time of its last change, the age is counted from opening it
+        self._opened = time.time()
+
+    def _close_file(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+            self._file = None
+
+    def _should_rotate(self):
+        if self.max_bytes and self._size >= self.max_bytes:
+            return True
+        if self.rotate_interval and time.time() - self._opened >= self.rotate_interval:
+            return True
+        return False
+
+    def _backup_path(self, index):
+        path = "%s.%s" % (self.path, index)
+        return path + ".gz" if self.compress else path
+
+    def _rotate(self):
+        """
+        Shifts the rotated files, renames the log file and compresses it.
+        """
+        self._close_file()
+        for index in range(self.backup_count - 1, 0, -1):
+            source = self._backup_path(index)
+            if os.path.exists(source):
+                os.replace(source, self._backup_path(index + 1))
+        if self.backup_count <= 0:
+            os.remove(self.path)
+        elif not self.compress:
+            os.replace(self.path, self._backup_path(1))
+        else:
+            rotated = "%s.rotating" % self.path
+            os.replace(self.path, rotated)
+            with open(rotated, "rb") as source:
+                with gzip.open(self._backup_path(1), "wb") as target:
+                    shutil.copyfileobj(source, target)
+            os.remove(rotated)
+        self.stats["rotations"] += 1
+
+
+def _size(item):
+    """
+    Returns the size of a queued line, estimated for a record not formatted
+    yet, with the length of its header.
+    """
+    if isinstance(item, str):
+        return len(item) + 1
+    msg = item.msg
+    return (len(msg) if isinstance(msg, str) else 100) + 60
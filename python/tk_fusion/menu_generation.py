@@ -7,9 +7,10 @@ import pprint
 import traceback
 import subprocess
 
-import BlackmagicFusion as bmd
 from sgtk.platform.qt import QtGui, QtCore
 
+from .icon_cache import get_icon_cache
+
 pp = pprint.pprint
 pf = pprint.pformat
 
@@ -17,6 +18,9 @@ pf = pprint.pformat
 class ShotgunMenu(QtGui.QWidget):
     """Simple Test"""
 
+    # whether the app buttons are hidden, kept for the next panels
+    collapsed = False
+
     def __init__(self, engine, icon_path):
         self.engine = engine
         self.icon_path = icon_path
@@ -30,7 +34,7 @@ class ShotgunMenu(QtGui.QWidget):
         #self.setGeometry(50, 50, 260, 100)
         self.setMinimumWidth(250)
         self.setWindowTitle("Shotgrid: Menu Panel")
-        icon = QtGui.QIcon(self.icon_path)
+        icon = get_icon_cache().icon(self.icon_path)
         self.setWindowIcon(icon)
 
         # Global layout
@@ -130,7 +134,10 @@ class ShotgunMenu(QtGui.QWidget):
         else: self.show_btn.setText('>')
 
         # Change visibility
-        self.frame_02.setVisible(not self.frame_02.isVisible())
+        ShotgunMenu.collapsed = not self.collapsed
+        if not self.collapsed:
+            self._populate_buttons()
+        self.frame_02.setVisible(not self.collapsed)
 
     def connect_to_engine(self):
         triggered_element = self.sender().objectName()
@@ -143,38 +150,100 @@ class ShotgunMenu(QtGui.QWidget):
         """
         Populate the shotgun menu options
 
+        The context menu actions are created the first time the menu is
+        shown, the app buttons the first time their section is expanded.
+        Icons come from the process wide :class:`IconCache`.
+
         Parameters:
             None
         Returns:
             None
         """
-        eng_dict = {}
+        self._context_menu_built = False
+        self._context_menu_commands = set()
+        self._buttons_built = False
+        # command name: button
+        self._buttons = {}
+        self._separators = []
+        self._footer = []
+        self.context_menu.aboutToShow.connect(self._populate_context_menu)
+
+        if self.collapsed:
+            self.frame_02.setVisible(False)
+            self.show_btn.setText('>')
+
+    def refresh(self):
+        """
+        Updates the panel after a context change. The context button label
+        is updated in place, the buttons of the commands that are gone are
+        removed and buttons are created for the new commands only. The
+        context menu is rebuilt the next time it is shown, if its commands
+        changed.
+        """
+        self.context_button.setText(str(self.engine.context))
+
+        if (self._context_menu_built and
+                self._context_menu_commands != self._context_menu_command_names()):
+            # the actions are children of the menu, clear deletes them
+            self.context_menu.clear()
+            self._context_menu_built = False
+
+        if self._buttons_built:
+            self._sync_buttons()
+
+    def showEvent(self, event):
+        super(ShotgunMenu, self).showEvent(event)
+        if not self.collapsed:
+            self._populate_buttons()
+
+    def _context_options(self):
         # Context options will be displayed under the context button
-        context_engine_options =  [
+        return [
             ['Jump to Shotgun', self._jump_to_sg],
             ['Jump to File System', self._jump_to_fs],
             'Ensure Tasks Folders', 2,
             'Jump to Screening Room in RV',
             'Jump to Screening Room Web Player', 'Work Area Info...', 2,
-            'Reload and Restart', 'Open Log Folder', 'Toggle Debug Logging']
+            'Reload and Restart', 'Open Log Folder', 'Toggle Debug Logging', 2,
+            ['Fusion Calls Report...', self._show_rpc_report],
+            ['Widget Report...', self._show_widget_report]]
+
+    def _context_menu_command_names(self):
+        """
+        Returns the names of the engine commands shown in the context menu.
+        """
+        return set(
+            option for option in self._context_options()
+            if isinstance(option, str) and option in self.engine.commands
+        )
+
+    def _populate_context_menu(self):
+        """
+        Creates the context menu actions, the first time it is shown.
+        """
+        if self._context_menu_built:
+            return
+        self._context_menu_built = True
+        self._context_menu_commands = self._context_menu_command_names()
+        icon_cache = get_icon_cache()
 
-        for ctx_option in context_engine_options:
+        for ctx_option in self._context_options():
             if isinstance(ctx_option, list):
                 # Creating menu button
-                menu_action = QtGui.QAction(ctx_option[0], self)
+                menu_action = QtGui.QAction(ctx_option[0], self.context_menu)
                 menu_action.triggered.connect(ctx_option[1])
                 self.context_menu.addAction(menu_action)
 
             elif ctx_option in self.engine.commands:
                 # Creating menu button
-                menu_action = QtGui.QAction(ctx_option, self)
+                menu_action = QtGui.QAction(ctx_option, self.context_menu)
                 menu_action.setObjectName(ctx_option)
                 menu_action.triggered.connect(self.connect_to_engine)
 
                 # Get app/command extra info
                 icon_path, description_str = self.get_command_info(ctx_option)
                 # Set icon
-                if icon_path: menu_action.setIcon(QtGui.QIcon(icon_path))
+                if icon_path: menu_action.setIcon(icon_cache.icon(icon_path))
                 # Set tooltip
                 if description_str: menu_action.setToolTip(description_str)
 
@@ -184,44 +253,89 @@ class ShotgunMenu(QtGui.QWidget):
                 # Separators
                 for x in range(ctx_option): self.context_menu.addSeparator()
 
-        # Populating menu with engine fuctions
-        counter = 0
-        for cmd_name, cmd_data in self.engine.commands.items():
-            eng_dict[id(cmd_data)] = cmd_data
-            # Skip if the engine app/command  is already in the context menu
-            if cmd_name in context_engine_options: continue
-
-            # Create the button for the main menu
-            if counter % 4 == 0 and counter != 0:
-                line_sep = QtGui.QFrame()
-                line_sep.setFrameShape(QtGui.QFrame.HLine)
-                line_sep.setFrameShadow(QtGui.QFrame.Sunken)
-                self.qvboxLayout.addWidget(line_sep)
-            counter += 1
-            app_button = QtGui.QPushButton('  {}'.format(cmd_name))
-            app_button.setObjectName('{}'.format(cmd_name))
-
-            # updating action
-            app_button.clicked.connect(self.connect_to_engine)
-
-            icon_path, description = self.get_command_info(cmd_name)
-            # If the button has icon
-            if icon_path: app_button.setIcon(QtGui.QIcon(icon_path))
-            # If the button has description
-            if description: app_button.setToolTip(description)
-            self.qvboxLayout.addWidget(app_button)
+    def _populate_buttons(self):
+        """
+        Creates the app buttons, the first time their section is shown.
+        """
+        if self._buttons_built:
+            return
+        self._buttons_built = True
 
         # Regular menu element
-        line_02 = QtGui.QFrame()
+        line_02 = QtGui.QFrame(self.frame_02)
         line_02.setFrameShape(QtGui.QFrame.HLine)
         line_02.setFrameShadow(QtGui.QFrame.Sunken)
-        self.qvboxLayout.addWidget(line_02)
 
-        unlock_comp_btn = QtGui.QPushButton('Unlock comp')
+        unlock_comp_btn = QtGui.QPushButton('Unlock comp', self.frame_02)
         unlock_comp_btn.setObjectName('Unlock_comp')
         unlock_comp_btn.clicked.connect(self.connect_to_engine)
         unlock_comp_btn.setToolTip('Option to unlock fusion when the viewer is freeze')
-        self.qvboxLayout.addWidget(unlock_comp_btn)
+        self._footer = [line_02, unlock_comp_btn]
+
+        self._sync_buttons()
+
+    def _sync_buttons(self):
+        """
+        Creates the buttons of the new engine commands, deletes the ones of
+        the commands that are gone and lays them out in the engine order.
+        The buttons of the commands that didn't change are kept, they look
+        their callback up by name when clicked.
+        """
+        icon_cache = get_icon_cache()
+        context_engine_options = self._context_options()
+        # Skip if the engine app/command  is already in the context menu
+        cmd_names = [
+            cmd_name for cmd_name in self.engine.commands
+            if cmd_name not in context_engine_options
+        ]
+
+        for cmd_name in [name for name in self._buttons if name not in cmd_names]:
+            app_button = self._buttons.pop(cmd_name)
+            self.qvboxLayout.removeWidget(app_button)
+            app_button.deleteLater()
+
+        for cmd_name in cmd_names:
+            app_button = self._buttons.get(cmd_name)
+            if app_button is None:
+                # Create the button for the main menu
+                app_button = QtGui.QPushButton(
+                    '  {}'.format(cmd_name), self.frame_02)
+                app_button.setObjectName('{}'.format(cmd_name))
+
+                # updating action
+                app_button.clicked.connect(self.connect_to_engine)
+                self._buttons[cmd_name] = app_button
+
+            # the same command may come from another app in the new context
+            icon_path, description = self.get_command_info(cmd_name)
+            # If the button has icon
+            app_button.setIcon(
+                icon_cache.icon(icon_path) if icon_path else QtGui.QIcon())
+            # If the button has description
+            app_button.setToolTip(description or '')
+
+        # a separator every 4 buttons
+        separators_count = max(0, (len(cmd_names) - 1) // 4)
+        while len(self._separators) < separators_count:
+            line_sep = QtGui.QFrame(self.frame_02)
+            line_sep.setFrameShape(QtGui.QFrame.HLine)
+            line_sep.setFrameShadow(QtGui.QFrame.Sunken)
+            self._separators.append(line_sep)
+        while len(self._separators) > separators_count:
+            line_sep = self._separators.pop()
+            self.qvboxLayout.removeWidget(line_sep)
+            line_sep.deleteLater()
+
+        # lay the widgets out again, without recreating them
+        while self.qvboxLayout.count():
+            self.qvboxLayout.takeAt(0)
+        separators = iter(self._separators)
+        for counter, cmd_name in enumerate(cmd_names):
+            if counter % 4 == 0 and counter != 0:
+                self.qvboxLayout.addWidget(next(separators))
+            self.qvboxLayout.addWidget(self._buttons[cmd_name])
+        for widget in self._footer:
+            self.qvboxLayout.addWidget(widget)
 
     def _jump_to_sg(self):
         """
@@ -232,19 +346,16 @@ class ShotgunMenu(QtGui.QWidget):
 
     def unlock_comp(self):
         self.logger.info('Unlocking comp action started...'.ljust(80, '-'))
-        fusion = bmd.scriptapp("Fusion")
-        comp = fusion.GetCurrentComp()
+        comp = self.engine.get_current_comp()
         # was_locked_bool = False
 
         # force comp lock
         self.logger.info('Locking comp...')
         comp.Lock()
 
-        # then unlock it through a while loop to ensure it is unlocked
+        # then fully unlock it, Fusion counts the Lock calls
         self.logger.info('Unlocking comp...')
-        while comp.GetAttrs()['COMPB_Locked']:
-            # was_locked_bool = True
-            comp.Unlock()
+        self.engine.comp_lock.unlock(comp)
 
         self.logger.info('Unlock complete')
 
@@ -259,6 +370,32 @@ class ShotgunMenu(QtGui.QWidget):
         msgBox.setText(msg_)
         msgBox.exec_()
 
+    def _show_rpc_report(self):
+        """
+        Show the amount of calls made to Fusion by the last operations
+        """
+        report = self.engine.get_rpc_report()
+        self.logger.info(report)
+
+        msgBox = QtGui.QMessageBox()
+        msgBox.setWindowTitle('Fusion Calls Report')
+        msgBox.setText(report.split('\n')[0])
+        msgBox.setDetailedText(report)
+        msgBox.exec_()
+
+    def _show_widget_report(self):
+        """
+        Show the live widget counts and the memory used by Fusion
+        """
+        report = self.engine.get_widget_report()
+        self.logger.info(report)
+
+        msgBox = QtGui.QMessageBox()
+        msgBox.setWindowTitle('Widget Report')
+        msgBox.setText(report.split('\n')[0])
+        msgBox.setDetailedText(report)
+        msgBox.exec_()
+
     def _jump_to_fs(self):
         """
         Jump from context to FS
@@ -285,8 +422,7 @@ class ShotgunMenu(QtGui.QWidget):
                 self.engine.logger.error("Failed to launch '%s'!", cmd)
 
     def verify_fusion(self):
-        fusion = bmd.scriptapp("Fusion")
-        comp = fusion.GetCurrentComp()
+        fusion = self.engine.fusion
         fusion_exe = fusion.GetAttrs()['FUSIONS_FileName']
 
         # Check if are not using FusionRenderNode
@@ -320,5 +456,5 @@ class ShotgunMenu(QtGui.QWidget):
         except:
             time.sleep(1)
 
-        fusion = bmd.scriptapp("Fusion") # Reload fusion
-        comp = fusion.GetCurrentComp() # Reload comp
+        # Reload fusion
+        self.engine.fusion_connection.reconnect()
@@ -0,0 +1,157 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Idle time warming of the template lookups of the hooks.
+
+Once the menu is shown the engine waits for the artist, a :class:`Prewarmer`
+thread uses that time to resolve the work folders of the context and the
+template of the files they hold, ie. the comps the publish collector and the
+saver update look up. The results go to the :class:`PrewarmCache` used by
+``engine.template_from_path``. The thread never calls Fusion.
+"""
+
+import os
+import time
+import threading
+import collections
+
+
+class PrewarmCache(object):
+    """
+    Thread safe cache of the templates matching the paths. They don't depend
+    on the context and are kept for the session, the least recently used
+    are dropped past ``size`` paths.
+    """
+
+    def __init__(self, size=5000):
+        self.size = size
+        self.stats = collections.Counter()
+        self._lock = threading.Lock()
+        # normalized path: template or None, the most recently used last
+        self._templates = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._templates)
+
+    def template_from_path(self, tk, path):
+        """
+        Returns the template matching a path, as ``tk.template_from_path``
+        but only resolved once per path.
+        """
+        key = os.path.normpath(path)
+        with self._lock:
+            if key in self._templates:
+                self._templates.move_to_end(key)
+                self.stats["hits"] += 1
+                return self._templates[key]
+        self.stats["misses"] += 1
+        template = tk.template_from_path(path)
+        with self._lock:
+            self._templates[key] = template
+            while len(self._templates) > self.size:
+                self._templates.popitem(last=False)
+        return template
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+
+
+class Prewarmer(object):
+    """
+    Background thread filling a :class:`PrewarmCache` for a context.
+    """
+
+    def __init__(self, tk, context, cache, work_templates=None, logger=None,
+                 max_files=1000):
+        """
+        :param tk: The Toolkit api instance.
+        :param context: The context warmed.
+        :param cache: The :class:`PrewarmCache` filled.
+        :param list work_templates: Templates of the work files and folders,
+            the template of the files of their folders is resolved.
+        :param logger: Optional logger.
+        :param int max_files: Amount of work area files whose template is
+            resolved.
+        """
+        self.tk = tk
+        self.context = context
+        self.cache = cache
+        self.work_templates = [t for t in work_templates or [] if t is not None]
+        self.logger = logger
+        self.max_files = max_files
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="tk-fusion prewarm")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the warming, the files left aren't resolved.
+        """
+        self._stop.set()
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        start = time.time()
+        try:
+            resolved = self._warm_work_area(self._work_folders())
+        except Exception as e:
+            if self.logger is not None:
+                self.logger.debug("Prewarming of %s failed: %s", self.context, e)
+            return
+        if self.logger is not None:
+            self.logger.debug(
+                "Prewarmed the templates of %s work files of %s in %.2fs",
+                resolved,
+                self.context,
+                time.time() - start,
+            )
+
+    def _work_folders(self):
+        """
+        Returns the folders of the work templates for the context. The file
+        templates are resolved up to their first parent not needing a field
+        the context doesn't have.
+        """
+        folders = set()
+        for template in self.work_templates:
+            fields = self.context.as_template_fields(template)
+            folder_template = template
+            while folder_template is not None and folder_template.missing_keys(
+                fields, skip_defaults=True
+            ):
+                folder_template = folder_template.parent
+            if folder_template is not None:
+                folders.add(folder_template.apply_fields(fields))
+        return sorted(folders)
+
+    def _warm_work_area(self, folders):
+        """
+        Resolves the template of the files of the work folders.
+
+        :returns: Amount of files resolved.
+        """
+        resolved = 0
+        for folder in folders:
+            if not os.path.isdir(folder):
+                continue
+            for file_name in sorted(os.listdir(folder)):
+                if resolved >= self.max_files or self._stop.is_set():
+                    return resolved
+                self.cache.template_from_path(self.tk, os.path.join(folder, file_name))
+                resolved += 1
+        return resolved
@@ -0,0 +1,139 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import sys
+import json
+import time
+import hashlib
+import tempfile
+
+
+class QtBindingCache(object):
+    """
+    Remembers which Qt binding imported, and from where, so the engine
+    imports it directly on the next launches instead of probing for PySide6
+    and PySide2 again, failed imports of those packages being slow.
+
+    Entries are keyed by a fingerprint of the Fusion version, the Python
+    interpreter and the install paths searched for a binding, including
+    their modification times, so reinstalling Fusion or Shotgun Desktop
+    makes the engine probe again. An entry is also dropped when the folder
+    of the binding it points to changed.
+
+    The cache is a small json file in the local temp folder, shared by the
+    Fusion versions installed.
+    """
+
+    # entries kept, one per Fusion version and interpreter
+    MAX_ENTRIES = 20
+
+    def __init__(self, fusion_version, search_paths, path=None, logger=None):
+        """
+        :param str fusion_version: Version of the running Fusion.
+        :param list search_paths: Folders added to ``sys.path`` to find a
+            binding when none imports as is.
+        :param str path: Path of the cache file, defaults to
+            ``qt_binding.json`` in the tk-fusion temp folder.
+        :param logger: Optional logger.
+        """
+        self.path = path or os.path.join(
+            tempfile.gettempdir(), "tk-fusion", "qt_binding.json"
+        )
+        self.logger = logger
+        self.key = self._fingerprint(fusion_version, search_paths)
+
+    def load(self):
+        """
+        Returns the cached entry, a dictionary with the ``binding`` name and
+        the ``sys_path`` folder it imports from, or None.
+        """
+        entry = self._read().get(self.key)
+        if not entry:
+            return None
+        if self._mtime(entry.get("package")) != entry.get("mtime"):
+            self._debug("Qt binding cache: %s changed", entry.get("package"))
+            self.clear()
+            return None
+        return entry
+
+    def save(self, binding, module, sys_path=None):
+        """
+        Caches the binding that imported.
+
+        :param str binding: Name of the binding, ie. "PySide6".
+        :param module: The binding package imported.
+        :param str sys_path: Folder added to ``sys.path`` to import it, if
+            any.
+        """
+        package = os.path.dirname(os.path.abspath(module.__file__))
+        entries = self._read()
+        entries[self.key] = {
+            "binding": binding,
+            "sys_path": sys_path,
+            "package": package,
+            "mtime": self._mtime(package),
+            "saved": time.time(),
+        }
+        if len(entries) > self.MAX_ENTRIES:
+            for key in sorted(entries, key=lambda k: entries[k].get("saved", 0))[
+                : len(entries) - self.MAX_ENTRIES
+            ]:
+                del entries[key]
+        self._write(entries)
+
+    def clear(self):
+        """
+        Removes the entry of this Fusion and interpreter.
+        """
+        entries = self._read()
+        if entries.pop(self.key, None) is not None:
+            self._write(entries)
+
+    def _fingerprint(self, fusion_version, search_paths):
+        data = [
+            str(fusion_version),
+            sys.executable,
+            sys.version,
+            [[path, self._mtime(path)] for path in search_paths],
+        ]
+        return hashlib.sha1(json.dumps(data).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.path.getmtime(path)
+        except (OSError, TypeError):
+            return None
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def _write(self, entries):
+        # a cache that can't be written only means probing again next time
+        try:
+            folder = os.path.dirname(self.path)
+            if not os.path.isdir(folder):
+                os.makedirs(folder)
+            temp_path = "%s.%s" % (self.path, os.getpid())
+            with open(temp_path, "w") as f:
+                json.dump(entries, f, indent=1)
+            os.replace(temp_path, self.path)
+        except (IOError, OSError) as e:
+            self._debug("Qt binding cache not written: %s", e)
+
+    def _debug(self, msg, *args):
+        if self.logger is not None:
+            self.logger.debug(msg, *args)
@@ -0,0 +1,226 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Recording of the scripting calls made to Fusion, to replay them offline.
+
+A recording is a gzipped json lines file. The first line is a header, the
+other ones are either calls::
+
+    {"t": 1.25, "d": 0.0004, "o": 3, "m": "GetAttrs", "a": ["TOOLS_Name"],
+     "r": {"$str": 12}}
+
+where t is the start time relative to the header, d the call latency, o the
+id of the Fusion object called, m the method (".Name" for attribute reads,
+".Name=" for writes, "[]"/"[]=" for indexing), a the arguments and r the
+shape of the returned value. Fusion objects are written as {"$obj": id},
+returned strings, dictionaries and lists only by their size, unless they
+hold Fusion objects. Or marks of the engine operations::
+
+    {"t": 1.2, "op": "tk-multi-breakdown.scan_scene", "ev": "start"}
+
+benchmarks/replay_session.py replays a recording against the Fusion
+simulator.
+"""
+
+import os
+import gzip
+import json
+import time
+import weakref
+import itertools
+import threading
+import collections
+
+FORMAT = "tk_fusion.rpc_recording"
+VERSION = 1
+
+_SCALARS = (int, float, bool, type(None))
+
+# Amount of objects without weak references support kept alive to keep their
+# id, one recorded again past it gets a new id
+MAX_PINNED = 1000
+
+
+class CallRecorder(object):
+    """
+    Call sink of :class:`RpcProxy` writing every call to a recording file.
+    """
+
+    def __init__(self, path, stats=None, logger=None, meta=None):
+        """
+        :param str path: Recording file, gzipped json lines.
+        :param stats: Optional :class:`RpcStats` the calls are forwarded to,
+            so accounting keeps working while recording.
+        :param logger: Optional logger.
+        :param dict meta: Extra information stored in the header.
+        """
+        self.path = path
+        self.stats = stats
+        self.logger = logger
+        self.call_count = 0
+
+        self._lock = threading.Lock()
+        # id(): recorded id, dropped when the object is collected so a reused
+        # id() gets a new recorded id
+        self._ids = {}
+        self._next_id = itertools.count(1)
+        # the objects not supporting weak references are kept alive instead,
+        # only the most recently recorded ones
+        self._pinned = collections.OrderedDict()
+        self._start = time.time()
+
+        folder = os.path.dirname(path)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder)
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+
+        header = {"format": FORMAT, "version": VERSION, "started": self._start}
+        header.update(meta or {})
+        self._write(header)
+        if logger:
+            logger.info("Recording Fusion calls to %s" % path)
+
+    def record(self, method, elapsed, target=None, args=(), result=None):
+        """
+        Records one call, see :meth:`RpcStats.record`.
+        """
+        if self.stats is not None:
+            self.stats.record(method, elapsed, target, args, result)
+
+        with self._lock:
+            if self._file is None:
+                return
+            self.call_count += 1
+            self._write(
+                {
+                    "t": round(time.time() - elapsed - self._start, 6),
+                    "d": round(elapsed, 6),
+                    "o": self._object_id(target),
+                    "m": method,
+                    "a": [self._encode(arg) for arg in args],
+                    "r": self._shape(result),
+                }
+            )
+
+    def mark(self, operation, event):
+        """
+        Records the start or the end of an engine operation.
+
+        :param str operation: Operation name.
+        :param str event: "start" or "end".
+        """
+        with self._lock:
+            if self._file is None:
+                return
+            self._write(
+                {
+                    "t": round(time.time() - self._start, 6),
+                    "op": operation,
+                    "ev": event,
+                }
+            )
+            if event == "end":
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.close()
+            self._file = None
+            self._pinned.clear()
+        if self.logger:
+            self.logger.info(
+                "Recorded %s Fusion calls to %s" % (self.call_count, self.path)
+            )
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry, separators=(",", ":"), default=repr))
+        self._file.write("\n")
+
+    def _object_id(self, obj):
+        if obj is None:
+            return None
+        key = id(obj)
+        object_id = self._ids.get(key)
+        if object_id is not None:
+            if key in self._pinned:
+                self._pinned.move_to_end(key)
+            return object_id
+        object_id = self._ids[key] = next(self._next_id)
+        try:
+            weakref.finalize(obj, self._ids.pop, key, None)
+        except TypeError:
+            self._pinned[key] = obj
+            if len(self._pinned) > MAX_PINNED:
+                old_key, _ = self._pinned.popitem(last=False)
+                del self._ids[old_key]
+        return object_id
+
+    def _encode(self, value):
+        """
+        Encodes an argument, keeping its value so it can be replayed.
+        """
+        if isinstance(value, _SCALARS) or isinstance(value, str):
+            return value
+        if isinstance(value, dict):
+            return {
+                "$dict": [[self._encode(k), self._encode(v)] for k, v in value.items()]
+            }
+        if isinstance(value, (list, tuple)):
+            return [self._encode(v) for v in value]
+        return {"$obj": self._object_id(value)}
+
+    def _shape(self, value):
+        """
+        Encodes a returned value by its shape, only Fusion objects are kept.
+        """
+        if isinstance(value, _SCALARS):
+            return value
+        if isinstance(value, str):
+            return {"$str": len(value)}
+        if isinstance(value, dict):
+            if any(not _is_plain(v) for v in value.values()):
+                return {
+                    "$dict": [
+                        [self._encode(k), self._shape(v)] for k, v in value.items()
+                    ]
+                }
+            return {"$dict": len(value)}
+        if isinstance(value, (list, tuple)):
+            if any(not _is_plain(v) for v in value):
+                return [self._shape(v) for v in value]
+            return {"$list": len(value)}
+        return {"$obj": self._object_id(value)}
+
+
+def _is_plain(value):
+    if isinstance(value, _SCALARS) or isinstance(value, str):
+        return True
+    if isinstance(value, dict):
+        return all(_is_plain(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return all(_is_plain(v) for v in value)
+    return False
+
+
+def read_recording(path):
+    """
+    Reads a recording.
+
+    :returns: Tuple of the header dictionary and the list of entries.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        if header.get("format") != FORMAT:
+            raise ValueError("%s is not a Fusion calls recording" % path)
+        entries = [json.loads(line) for line in f if line.strip()]
+    return header, entries
@@ -0,0 +1,245 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Accounting of the scripting calls made to Fusion.
+
+Every method call, attribute read or write on a Fusion object is a round
+trip to the Fusion process. RpcProxy wraps the scriptapp and every Fusion
+object obtained through it (comps, tools, inputs, flow views...) and records
+the amount of calls and the time spent per method in an RpcStats instance.
+"""
+
+import time
+import threading
+
+# values returned by Fusion that are plain data and don't need a proxy
+_PLAIN_TYPES = (str, bytes, int, float, bool, type(None))
+
+
+class RpcStats(object):
+    """
+    Call counters and cumulative latencies, per method name.
+
+    The counters are reset at the start of every engine operation, the
+    session totals are kept separately.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._totals = {}
+
+    def record(self, method, elapsed, target=None, args=(), result=None):
+        """
+        Records one call.
+
+        :param str method: Method or attribute name, ie. "GetAttrs".
+        :param float elapsed: Seconds the call took.
+        :param target: Fusion object called, unused.
+        :param args: Call arguments, unused.
+        :param result: Returned value, unused.
+        """
+        with self._lock:
+            for calls in (self._calls, self._totals):
+                entry = calls.get(method)
+                if entry is None:
+                    calls[method] = [1, elapsed]
+                else:
+                    entry[0] += 1
+                    entry[1] += elapsed
+
+    def reset(self):
+        """
+        Resets the counters, but not the session totals.
+        """
+        with self._lock:
+            self._calls = {}
+
+    def snapshot(self, totals=False):
+        """
+        Returns the counters as a dictionary of (calls, seconds) tuples keyed
+        by method name.
+
+        :param bool totals: Return the session totals instead.
+        """
+        with self._lock:
+            calls = self._totals if totals else self._calls
+            return dict(
+                (method, (entry[0], entry[1])) for method, entry in calls.items()
+            )
+
+    def report(self, title=None, limit=None, totals=False):
+        """
+        Returns a text report, most expensive methods first.
+
+        :param str title: First line of the report.
+        :param int limit: Maximum amount of methods listed.
+        :param bool totals: Report the session totals instead.
+        """
+        calls = sorted(
+            self.snapshot(totals).items(), key=lambda item: item[1][1], reverse=True
+        )
+        lines = [
+            "%s: %s Fusion calls in %.3fs"
+            % (
+                title or "Fusion calls",
+                sum(count for _, (count, _) in calls),
+                sum(elapsed for _, (_, elapsed) in calls),
+            )
+        ]
+        for method, (count, elapsed) in calls[:limit]:
+            lines.append(
+                "  %-28s %7d calls %9.3fs %9.3fms/call"
+                % (method, count, elapsed, 1000.0 * elapsed / count)
+            )
+        return "\n".join(lines)
+
+
+class RpcProxy(object):
+    """
+    Wraps a Fusion object and records every call made through it.
+
+    Values returned by the wrapped object are wrapped as well, so the tools
+    returned by ``comp.GetToolList()`` or ``comp.FindTool()`` and the inputs
+    such as ``loader.Clip`` are accounted for too. Proxies are unwrapped when
+    passed back as arguments, ie. to ``flow.GetPosTable(tool)``.
+
+    Calls are reported to ``stats.record(method, elapsed, target, args,
+    result)``, where target is the Fusion object the call was made on. Any
+    object with that method can be used instead of :class:`RpcStats`, ie. a
+    :class:`CallRecorder`.
+    """
+
+    __slots__ = ("_target", "_stats", "_name", "_fetch_time", "_owner")
+
+    def __init__(self, target, stats, name=None, fetch_time=0.0, owner=None):
+        """
+        :param target: Wrapped Fusion object.
+        :param stats: :class:`RpcStats` calls are recorded in.
+        :param str name: Attribute name the object was obtained from.
+        :param float fetch_time: Time spent getting the object, recorded
+            with its first use.
+        :param owner: For methods, the Fusion object they belong to.
+        """
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_stats", stats)
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_fetch_time", fetch_time)
+        object.__setattr__(self, "_owner", owner)
+
+    def _record(self, suffix, elapsed, args=(), result=None):
+        # fold the attribute lookup into the first use of the object, a
+        # GetAttrs call is then accounted for once instead of twice
+        fetch_time = self._fetch_time
+        if fetch_time:
+            object.__setattr__(self, "_fetch_time", 0.0)
+        target = self._owner if self._owner is not None else self._target
+        self._stats.record(
+            (self._name or "") + suffix, elapsed + fetch_time, target, args, result
+        )
+
+    def __getattr__(self, name):
+        stats = self._stats
+        target = self._target
+        start = time.time()
+        value = getattr(target, name)
+        elapsed = time.time() - start
+        if callable(value) and not isinstance(value, _PLAIN_TYPES):
+            return RpcProxy(value, stats, name, elapsed, target)
+        stats.record("." + name, elapsed, target, (), value)
+        return wrap(value, stats, "." + name)
+
+    def __setattr__(self, name, value):
+        value = unwrap(value)
+        start = time.time()
+        setattr(self._target, name, value)
+        self._stats.record(
+            "." + name + "=", time.time() - start, self._target, (value,), None
+        )
+
+    def __call__(self, *args, **kwargs):
+        args = [unwrap(arg) for arg in args]
+        kwargs = dict((key, unwrap(value)) for key, value in kwargs.items())
+        result = None
+        start = time.time()
+        try:
+            result = self._target(*args, **kwargs)
+        finally:
+            self._record(
+                "()" if self._name is None else "",
+                time.time() - start,
+                args + [kwargs] if kwargs else args,
+                result,
+            )
+        return wrap(result, self._stats)
+
+    def __getitem__(self, key):
+        key = unwrap(key)
+        value = None
+        start = time.time()
+        try:
+            value = self._target[key]
+        finally:
+            self._record("[]", time.time() - start, [key], value)
+        return wrap(value, self._stats)
+
+    def __setitem__(self, key, value):
+        key = unwrap(key)
+        value = unwrap(value)
+        start = time.time()
+        try:
+            self._target[key] = value
+        finally:
+            self._record("[]=", time.time() - start, [key, value])
+
+    def __bool__(self):
+        return bool(self._target)
+
+    def __eq__(self, other):
+        return self._target == unwrap(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._target)
+
+    def __repr__(self):
+        return repr(self._target)
+
+
+def wrap(value, stats, name=None):
+    """
+    Wraps the Fusion objects found in a value returned by Fusion, including
+    the ones in dictionaries such as the one returned by GetToolList.
+
+    :param str name: Name the calls made on the value are recorded under.
+    """
+    if isinstance(value, _PLAIN_TYPES) or isinstance(value, RpcProxy):
+        return value
+    if isinstance(value, dict):
+        return dict((key, wrap(item, stats)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return type(value)(wrap(item, stats) for item in value)
+    return RpcProxy(value, stats, name)
+
+
+def unwrap(value):
+    """
+    Returns the Fusion object behind a proxy, or the value itself.
+    """
+    if isinstance(value, RpcProxy):
+        return object.__getattribute__(value, "_target")
+    if isinstance(value, dict):
+        return dict((key, unwrap(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return type(value)(unwrap(item) for item in value)
+    return value
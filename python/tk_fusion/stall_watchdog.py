@@ -0,0 +1,219 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Detection of main thread stalls.
+
+The main thread calls :meth:`StallWatchdog.beat` from a Qt timer, a
+background thread checks the time of the last beat. When the main thread
+didn't process its events for ``threshold`` seconds, the stacks of all the
+threads are written to a ``tk-fusion_stall_*.txt`` file in the log folder,
+with the engine operation and the Fusion call running, so a "Fusion froze"
+report comes with what it was doing.
+"""
+
+import os
+import sys
+import glob
+import time
+import threading
+import traceback
+
+# RpcProxy methods making the Fusion calls, see rpc_stats
+_RPC_METHODS = ("__call__", "__getattr__", "__setattr__", "__getitem__", "__setitem__")
+
+
+class StallWatchdog(object):
+    """
+    Watches the heartbeat of the main thread and dumps the thread stacks
+    when it stops.
+    """
+
+    def __init__(self, folder, threshold=2.0, repeat=30.0, context=None,
+                 logger=None, keep=20):
+        """
+        :param str folder: Folder the stall reports are written to.
+        :param float threshold: Seconds without a beat reported as a stall.
+        :param float repeat: Seconds between two reports of the same stall.
+        :param callable context: Returns a dictionary describing what the
+            engine is doing, added to the reports. Called from the watchdog
+            thread, it must not call Fusion.
+        :param logger: Optional logger.
+        :param int keep: Amount of reports kept in the folder.
+        """
+        self.folder = folder
+        self.threshold = threshold
+        self.repeat = repeat
+        self.context = context
+        self.logger = logger
+        self.keep = keep
+        # paths of the reports written this session
+        self.reports = []
+
+        self._main_thread_id = threading.current_thread().ident
+        self._last_beat = time.time()
+        self._stall_start = None
+        self._last_report = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Starts the watchdog thread. Call it from the main thread.
+        """
+        self._main_thread_id = threading.current_thread().ident
+        self._last_beat = time.time()
+        self._thread = threading.Thread(
+            target=self._run, name="tk-fusion stall watchdog"
+        )
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(1.0)
+
+    def beat(self):
+        """
+        Called from the main thread event loop, ie. by a QTimer.
+        """
+        now = time.time()
+        stall_start = self._stall_start
+        if stall_start is not None:
+            self._stall_start = None
+            if self.logger is not None:
+                self.logger.warning(
+                    "The main thread was stalled for %.1fs, see %s",
+                    now - stall_start,
+                    self.reports[-1] if self.reports else "the log folder",
+                )
+        self._last_beat = now
+
+    def _run(self):
+        interval = min(self.threshold / 4.0, 0.5)
+        while not self._stop.wait(interval):
+            now = time.time()
+            last_beat = self._last_beat
+            if now - last_beat < self.threshold:
+                continue
+            if self._stall_start is None:
+                self._stall_start = last_beat
+                self._last_report = None
+            if self._last_report is None or now - self._last_report >= self.repeat:
+                self._last_report = now
+                try:
+                    self._write_report(now - last_beat)
+                except Exception as e:
+                    if self.logger is not None:
+                        self.logger.debug("Stall report not written: %s", e)
+
+    def _write_report(self, stalled):
+        """
+        Writes the thread stacks and the engine context.
+        """
+        frames = sys._current_frames()
+        names = dict((t.ident, t.name) for t in threading.enumerate())
+        main_frame = frames.get(self._main_thread_id)
+
+        lines = [
+            "Main thread stalled for %.1fs, at %s, pid %s"
+            % (stalled, time.strftime("%Y-%m-%d %H:%M:%S"), os.getpid()),
+            "",
+        ]
+        context = {}
+        if self.context is not None:
+            try:
+                context = self.context() or {}
+            except Exception as e:
+                context = {"error": "context not available: %s" % e}
+        if main_frame is not None:
+            context.setdefault("fusion_call", self._fusion_call(main_frame))
+            context.setdefault("hook", self._hook_frame(main_frame))
+        for key in sorted(context):
+            lines.append("%-16s %s" % (key + ":", context[key]))
+
+        # main thread first
+        for ident in sorted(frames, key=lambda i: i != self._main_thread_id):
+            lines.append("")
+            lines.append(
+                "Thread %s (%s)%s"
+                % (
+                    names.get(ident, "unknown"),
+                    ident,
+                    ", main thread" if ident == self._main_thread_id else "",
+                )
+            )
+            lines.extend(
+                line.rstrip("\n")
+                for line in traceback.format_stack(frames[ident])
+            )
+        del frames, main_frame
+
+        if not os.path.isdir(self.folder):
+            os.makedirs(self.folder)
+        path = os.path.join(
+            self.folder,
+            "tk-fusion_stall_%s_%s.txt" % (time.strftime("%Y%m%d_%H%M%S"), os.getpid()),
+        )
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        self.reports.append(path)
+        self._prune()
+        if self.logger is not None:
+            self.logger.warning(
+                "The main thread is stalled for %.1fs, thread stacks written to %s",
+                stalled,
+                path,
+            )
+
+    def _prune(self):
+        paths = sorted(
+            glob.glob(os.path.join(self.folder, "tk-fusion_stall_*.txt")),
+            key=os.path.getmtime,
+        )
+        for path in paths[: max(0, len(paths) - self.keep)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _fusion_call(frame):
+        """
+        Returns the Fusion call running in a stack, as recorded by the
+        RpcProxy, when the rpc accounting or recording is on.
+        """
+        while frame is not None:
+            code = frame.f_code
+            if code.co_name in _RPC_METHODS and code.co_filename.endswith(
+                "rpc_stats.py"
+            ):
+                proxy = frame.f_locals.get("self")
+                name = getattr(proxy, "_name", None)
+                if code.co_name == "__getattr__":
+                    name = "." + str(frame.f_locals.get("name"))
+                # the Fusion object itself isn't printed, its repr would be
+                # another call to the stalled Fusion
+                return name or "()"
+            frame = frame.f_back
+        return "none recorded, turn on rpc_accounting to see it"
+
+    @staticmethod
+    def _hook_frame(frame):
+        """
+        Returns the innermost hook code of a stack.
+        """
+        while frame is not None:
+            path = frame.f_code.co_filename
+            if "%shooks%s" % (os.sep, os.sep) in path or "/hooks/" in path:
+                return "%s:%s in %s" % (path, frame.f_lineno, frame.f_code.co_name)
+            frame = frame.f_back
+        return None
@@ -0,0 +1,258 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import time
+import traceback
+
+
+class StartupCommand(object):
+    """
+    A command of the ``run_at_startup`` setting, see :class:`StartupScheduler`.
+    """
+
+    def __init__(self, app_instance, name, callback, priority=0,
+                 defer_until_idle=False, depends_on=None, index=0):
+        self.app_instance = app_instance
+        self.name = name
+        self.callback = callback
+        self.priority = priority
+        self.defer_until_idle = defer_until_idle
+        self.depends_on = list(depends_on or [])
+        self.index = index
+        # None until run, then True or False
+        self.succeeded = None
+        self.started = None
+        self.duration = None
+
+    @property
+    def label(self):
+        return "%s: %s" % (self.app_instance, self.name)
+
+    def __repr__(self):
+        return "<StartupCommand %s>" % self.label
+
+
+class StartupScheduler(object):
+    """
+    Runs the ``run_at_startup`` commands in order of priority, the ones that
+    can wait after the Fusion event loop is idle.
+
+    Every command has:
+
+    - ``priority``: commands with a higher priority run first, commands of
+      the same priority run in the order of the setting.
+    - ``defer_until_idle``: the command is run from the Qt event queue once
+      the engine finished starting, so the menu is shown before it.
+      Deferred commands run one per event loop tick.
+    - ``depends_on``: app instances or "app_instance: command" labels that
+      have to run before the command. A command depending on a deferred one
+      is deferred as well, a command whose dependency failed or isn't
+      scheduled is skipped.
+
+    Usage::
+
+        scheduler = StartupScheduler(logger, post=QtCore.QTimer.singleShot)
+        scheduler.add("tk-multi-workfiles2", "File Open...", callback,
+                      defer_until_idle=True)
+        scheduler.run_now()
+        create_menu()
+        scheduler.run_deferred()
+    """
+
+    def __init__(self, logger, post, span=None, on_finished=None):
+        """
+        :param logger: Logger the timings are logged to.
+        :param callable post: Runs a callable from the event loop, called as
+            ``post(0, callable)`` like :meth:`QTimer.singleShot`.
+        :param callable span: Optional context manager factory called with the
+            label of a command, ie. the engine ``_startup_span``.
+        :param callable on_finished: Called without arguments once all the
+            deferred commands ran.
+        """
+        self.logger = logger
+        self.post = post
+        self.span = span
+        self.on_finished = on_finished
+        self.commands = []
+        self._pending = []
+
+    def add(self, app_instance, name, callback, priority=0,
+            defer_until_idle=False, depends_on=None):
+        """
+        Schedules a command.
+
+        :returns: The :class:`StartupCommand`.
+        """
+        command = StartupCommand(
+            app_instance,
+            name,
+            callback,
+            priority=priority or 0,
+            defer_until_idle=bool(defer_until_idle),
+            depends_on=depends_on,
+            index=len(self.commands),
+        )
+        self.commands.append(command)
+        return command
+
+    def run_now(self):
+        """
+        Runs the commands that aren't deferred, in order, and queues the
+        others for :meth:`run_deferred`.
+        """
+        ordered = self._order()
+        now = [command for command in ordered if not command.defer_until_idle]
+        self._pending = [command for command in ordered if command.defer_until_idle]
+        for command in now:
+            self._run(command)
+
+    def run_deferred(self):
+        """
+        Runs the deferred commands from the event loop, one per tick.
+        """
+        if self._pending:
+            self.logger.debug(
+                "Deferring %s startup commands until Fusion is idle: %s",
+                len(self._pending),
+                ", ".join(command.label for command in self._pending),
+            )
+            self.post(0, self._run_next)
+        else:
+            self._finish()
+
+    def report(self):
+        """
+        Returns a line per command with its timing.
+        """
+        lines = []
+        for command in sorted(self.commands, key=lambda c: c.index):
+            if command.succeeded is None:
+                state = "not run"
+            elif command.duration is None:
+                state = "skipped"
+            elif command.succeeded:
+                state = "%.3fs" % command.duration
+            else:
+                state = "failed after %.3fs" % command.duration
+            lines.append(
+                "%-50s %-8s %s"
+                % (command.label, "deferred" if command.defer_until_idle else "",
+                   state)
+            )
+        return "\n".join(lines)
+
+    def _run_next(self):
+        command = self._pending.pop(0)
+        self._run(command)
+        if self._pending:
+            self.post(0, self._run_next)
+        else:
+            self._finish()
+
+    def _finish(self):
+        if self.commands:
+            self.logger.debug("Startup commands:\n%s", self.report())
+        if self.on_finished is not None:
+            self.on_finished()
+
+    def _run(self, command):
+        dependencies, missing = self._dependencies(command)
+        if missing:
+            self.logger.warning(
+                "Startup command '%s' skipped, it depends on %s, which isn't "
+                "a run_at_startup command.",
+                command.label,
+                ", ".join("'%s'" % name for name in missing),
+            )
+            command.succeeded = False
+            return
+        for dependency in dependencies:
+            if not dependency.succeeded:
+                self.logger.warning(
+                    "Startup command '%s' skipped, it depends on '%s', which %s.",
+                    command.label,
+                    dependency.label,
+                    "failed" if dependency.succeeded is False else "didn't run",
+                )
+                command.succeeded = False
+                return
+
+        self.logger.debug("Startup running '%s'.", command.label)
+        command.started = start = time.time()
+        try:
+            if self.span is not None:
+                with self.span(command.label):
+                    command.callback()
+            else:
+                command.callback()
+        except Exception:
+            command.succeeded = False
+            self.logger.error(
+                "Startup command '%s' failed:\n%s",
+                command.label,
+                traceback.format_exc(),
+            )
+        else:
+            command.succeeded = True
+        command.duration = time.time() - start
+        self.logger.debug(
+            "Startup command '%s' ran in %.3fs%s.",
+            command.label,
+            command.duration,
+            " (deferred)" if command.defer_until_idle else "",
+        )
+
+    def _dependencies(self, command):
+        """
+        Returns the commands a command depends on and the names in its
+        ``depends_on`` that match no command.
+        """
+        dependencies = []
+        missing = []
+        for name in command.depends_on:
+            matches = [
+                other
+                for other in self.commands
+                if other is not command and name in (other.app_instance, other.label)
+            ]
+            if not matches:
+                missing.append(name)
+            dependencies.extend(matches)
+        return dependencies, missing
+
+    def _order(self):
+        """
+        Sorts the commands by priority and setting order, then moves every
+        command after its dependencies. Commands depending on a deferred
+        command are deferred as well.
+        """
+        remaining = sorted(self.commands, key=lambda c: (-c.priority, c.index))
+        ordered = []
+        done = set()
+        while remaining:
+            for command in remaining:
+                dependencies = self._dependencies(command)[0]
+                if all(dependency in done for dependency in dependencies):
+                    if any(d.defer_until_idle for d in dependencies):
+                        command.defer_until_idle = True
+                    break
+            else:
+                # dependency cycle, run the rest in priority order, _run
+                # skips the commands whose dependencies didn't run
+                self.logger.warning(
+                    "Startup commands depend on each other: %s",
+                    ", ".join(command.label for command in remaining),
+                )
+                ordered.extend(remaining)
+                break
+            remaining.remove(command)
+            ordered.append(command)
+            done.add(command)
+        return ordered
@@ -0,0 +1,179 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Tracing of the startup phases of Fusion and the engine.
+
+Spans are written in the Chrome trace event format, the files can be opened
+in chrome://tracing or https://ui.perfetto.dev to compare the startups of
+different engine versions or workstations.
+
+The phases that happen before the engine exists, the launch and the
+startup/Scripts/Shotgrid/Shotgrid.py script, hand their spans over in the
+TK_FUSION_STARTUP_TRACE environment variable, as a json list of
+[name, start, end] entries with times in seconds since the epoch. An end of
+null means the span is still open.
+"""
+
+import os
+import sys
+import json
+import time
+import glob
+import threading
+import contextlib
+
+ENV_VAR = "TK_FUSION_STARTUP_TRACE"
+FILE_PREFIX = "tk-fusion_startup_"
+
+
+class StartupTracer(object):
+    """
+    Collects startup spans and writes them as a Chrome trace.
+    """
+
+    def __init__(self, logger=None, metadata=None):
+        """
+        :param logger: Optional logger.
+        :param dict metadata: Information stored in the trace, ie. the
+            engine and Fusion versions.
+        """
+        self.logger = logger
+        self.metadata = dict(metadata or {})
+        self._lock = threading.Lock()
+        self._events = []
+        self._pid = os.getpid()
+        self.path = None
+
+    @property
+    def events(self):
+        with self._lock:
+            return list(self._events)
+
+    @contextlib.contextmanager
+    def span(self, name, category="engine", **args):
+        """
+        Traces the time spent in the block::
+
+            with tracer.span("init_pyside"):
+                ...
+
+        :param str name: Phase name.
+        :param str category: Category, shown as a color in the viewers.
+        :param args: Extra values shown with the span.
+        """
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add_span(name, start, time.time(), category, args)
+
+    def add_span(self, name, start, end, category="engine", args=None, tid=None):
+        """
+        Adds a span measured elsewhere.
+
+        :param float start: Start time, in seconds since the epoch.
+        :param float end: End time, in seconds since the epoch.
+        """
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": int(start * 1e6),
+            "dur": max(0, int((end - start) * 1e6)),
+            "pid": self._pid,
+            "tid": tid or threading.current_thread().ident,
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self._events.append(event)
+
+    def load_environment(self, category="bootstrap"):
+        """
+        Adds the spans handed over in the TK_FUSION_STARTUP_TRACE environment
+        variable and clears it, so they're only reported once.
+        """
+        value = os.environ.pop(ENV_VAR, None)
+        if not value:
+            return
+        try:
+            spans = json.loads(value)
+        except ValueError:
+            if self.logger:
+                self.logger.debug("Ignoring invalid %s value: %r", ENV_VAR, value)
+            return
+        for name, start, end in spans:
+            self.add_span(name, start, end or time.time(), category)
+
+    def summary(self):
+        """
+        Returns a text summary, one line per span in start order.
+        """
+        events = sorted(self.events, key=lambda event: event["ts"])
+        if not events:
+            return "No startup spans recorded"
+        origin = events[0]["ts"]
+        lines = ["Startup phases:"]
+        for event in events:
+            lines.append(
+                "  +%8.3fs %8.3fs  %s"
+                % (
+                    (event["ts"] - origin) / 1e6,
+                    event["dur"] / 1e6,
+                    event["name"],
+                )
+            )
+        return "\n".join(lines)
+
+    def write(self, folder, keep=10):
+        """
+        Writes the trace to a timestamped file in the given folder, removing
+        the oldest traces so at most ``keep`` of them are left. Later writes
+        update the same file.
+
+        :returns: Path of the written file.
+        """
+        if self.path is None:
+            self.path = os.path.join(
+                folder,
+                "%s%s_%s.json"
+                % (FILE_PREFIX, time.strftime("%Y%m%d_%H%M%S"), self._pid),
+            )
+        path = self.path
+        events = [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": self._pid,
+                "args": {"name": "Fusion %s" % self._pid},
+            }
+        ]
+        events.extend(self.events)
+        metadata = {"platform": sys.platform}
+        metadata.update(self.metadata)
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "traceEvents": events,
+                    "displayTimeUnit": "ms",
+                    "otherData": metadata,
+                },
+                f,
+            )
+
+        traces = sorted(glob.glob(os.path.join(folder, FILE_PREFIX + "*.json")))
+        for old_path in traces[:-keep] if keep else []:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+        return path
+
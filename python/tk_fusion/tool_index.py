@@ -0,0 +1,295 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import itertools
+
+from .bulk_query import query_tools
+
+
+class ToolRecord(object):
+    """
+    Compact description of one tool of the comp.
+    """
+
+    __slots__ = ("name", "type", "clip_path", "sg_metadata", "pos", "attrs", "data")
+
+    def __init__(
+        self,
+        name,
+        type,
+        clip_path=None,
+        sg_metadata=None,
+        pos=None,
+        attrs=None,
+        data=None,
+    ):
+        """
+        :param str name: Tool name.
+        :param str type: Tool type, ie. "Loader".
+        :param str clip_path: First clip path of Loaders and Savers.
+        :param dict sg_metadata: Publish information stored in the tool.
+        :param tuple pos: (x, y) flow view position.
+        :param dict attrs: Other tool attributes fetched by the index.
+        :param dict data: Other tool data keys fetched by the index.
+        """
+        self.name = name
+        self.type = type
+        self.clip_path = clip_path
+        self.sg_metadata = sg_metadata
+        self.pos = pos
+        self.attrs = attrs or {}
+        self.data = data or {}
+
+    @property
+    def publish_id(self):
+        """
+        Id of the publish the tool was loaded from, if known.
+        """
+        if self.sg_metadata:
+            return self.sg_metadata.get("id")
+        return None
+
+    def __repr__(self):
+        return "<ToolRecord %s (%s): %s>" % (self.name, self.type, self.clip_path)
+
+
+class ToolIndex(object):
+    """
+    In memory index of the comp tools, shared by the breakdown, the loader,
+    the publish collector and the saver update.
+
+    The index is built with a single bulk query and then kept current by the
+    code that modifies the comp (:meth:`add`, :meth:`update`, :meth:`remove`),
+    so lookups by type, name, clip path or publish id are dictionary hits.
+    They return the records in comp order, the tools added later last.
+    Changes made in Fusion by the artist are picked up the next time the
+    engine marks the index as stale.
+    """
+
+    # the types of the tools the attributes and data are fetched for, the
+    # others only have their type and position, ie. to place new tools
+    DETAIL_TYPES = ["Loader", "Saver"]
+
+    # attributes and data fetched for every tool when the index is built
+    ATTRS = [
+        "TOOLST_Clip_Name",
+        "TOOLIT_Clip_StartFrame",
+        "TOOLIT_Clip_Length",
+        "TOOLIT_Clip_TrimIn",
+        "TOOLIT_Clip_TrimOut",
+        "TOOLIT_Clip_ExtendFirst",
+        "TOOLIT_Clip_ExtendLast",
+    ]
+    DATA_KEYS = [
+        "sg_metadata",
+        "sg_buffer",
+        "Shotgun_Saver_Node",
+        "Shotgrid_Saver_Node",
+        "Current_template",
+    ]
+
+    # class of the records, exposed so hooks can add records without
+    # importing tk_fusion
+    record_class = ToolRecord
+
+    def __init__(self, logger=None):
+        self.logger = logger
+        self.comp = None
+        self.stale = True
+        self.build_count = 0
+
+        self._by_name = {}
+        self._by_type = {}
+        self._by_path = {}
+        self._by_publish_id = {}
+        # name: position of the tool in the comp
+        self._order = {}
+        self._counter = itertools.count()
+
+    def build(self, comp):
+        """
+        (Re)builds the index from the given comp with one bulk query.
+        """
+        tools_info = query_tools(
+            comp,
+            attrs=self.ATTRS,
+            data_keys=self.DATA_KEYS,
+            positions=True,
+            detail_types=self.DETAIL_TYPES,
+        )
+
+        self.clear()
+        self.comp = comp
+        for name, info in tools_info.items():
+            attrs = info["attrs"]
+            clip_names = attrs.pop("TOOLST_Clip_Name", None) or {}
+            clip_path = next(iter(clip_names.values()), None)
+            data = info["data"]
+            self.add(
+                ToolRecord(
+                    name,
+                    info["type"],
+                    clip_path=clip_path,
+                    sg_metadata=data.pop("sg_metadata", None),
+                    pos=info["pos"],
+                    attrs=attrs,
+                    data=data,
+                )
+            )
+
+        self.stale = False
+        self.build_count += 1
+        if self.logger:
+            self.logger.debug(
+                "Tool index built with %s tools (build #%s)",
+                len(self._by_name),
+                self.build_count,
+            )
+
+    def clear(self):
+        self._by_name = {}
+        self._by_type = {}
+        self._by_path = {}
+        self._by_publish_id = {}
+        self._order = {}
+        self._counter = itertools.count()
+
+    def invalidate(self):
+        """
+        Marks the index as stale, it will be rebuilt on next use.
+        """
+        self.stale = True
+
+    def notify(self, event, tool_name=None):
+        """
+        Keeps the index current from a Fusion notification name.
+        """
+        if event == "Tool_Deleted" and tool_name:
+            self.remove(tool_name)
+        elif event in ("Comp_Save", "Comp_SaveAs", "Comp_SaveVersion"):
+            # saving doesn't change the tools
+            return
+        else:
+            self.invalidate()
+
+    # lookups -------------------------------------------------------------------
+
+    def __len__(self):
+        return len(self._by_name)
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def get(self, name):
+        """
+        Returns the :class:`ToolRecord` of the given tool name or None.
+        """
+        return self._by_name.get(name)
+
+    def records(self):
+        """
+        Returns all the records.
+        """
+        return self._records(self._by_name)
+
+    def by_type(self, tool_type):
+        """
+        Returns the records of the given tool type, ie. "Loader".
+        """
+        return self._records(self._by_type.get(tool_type, ()))
+
+    def by_path(self, path):
+        """
+        Returns the records whose clip path matches the given path.
+        """
+        key = self._path_key(path)
+        return self._records(self._by_path.get(key, ()))
+
+    def by_publish_id(self, publish_id):
+        """
+        Returns the records loaded from the given publish id.
+        """
+        return self._records(self._by_publish_id.get(publish_id, ()))
+
+    def _records(self, names):
+        """
+        Returns the records of the given names, in comp order.
+        """
+        return [self._by_name[n] for n in sorted(names, key=self._order.get)]
+
+    # incremental updates -------------------------------------------------------
+
+    def add(self, record):
+        """
+        Adds or replaces a record.
+        """
+        if record.name in self._by_name:
+            self.remove(record.name)
+        self._by_name[record.name] = record
+        self._order[record.name] = next(self._counter)
+        self._link(record)
+
+    def update(self, tool_name, **fields):
+        """
+        Updates fields of a record, ie. ``update("Loader1", clip_path=path)``.
+        Passing ``name`` renames the record.
+
+        :returns: The updated record or None if the tool isn't indexed.
+        """
+        record = self._by_name.get(tool_name)
+        if record is None:
+            return None
+
+        # an updated or renamed tool keeps its place
+        order = self._order[tool_name]
+        self.remove(tool_name)
+        for field, value in fields.items():
+            setattr(record, field, value)
+        self.add(record)
+        self._order[record.name] = order
+        return record
+
+    def remove(self, name):
+        """
+        Removes a record.
+        """
+        record = self._by_name.pop(name, None)
+        if record is not None:
+            self._order.pop(name, None)
+            self._unlink(record)
+        return record
+
+    def _link(self, record):
+        self._by_type.setdefault(record.type, set()).add(record.name)
+        if record.clip_path:
+            key = self._path_key(record.clip_path)
+            self._by_path.setdefault(key, set()).add(record.name)
+        if record.publish_id is not None:
+            self._by_publish_id.setdefault(record.publish_id, set()).add(record.name)
+
+    def _unlink(self, record):
+        self._discard(self._by_type, record.type, record.name)
+        if record.clip_path:
+            key = self._path_key(record.clip_path)
+            self._discard(self._by_path, key, record.name)
+        if record.publish_id is not None:
+            self._discard(self._by_publish_id, record.publish_id, record.name)
+
+    @staticmethod
+    def _discard(mapping, key, name):
+        names = mapping.get(key)
+        if names is not None:
+            names.discard(name)
+            if not names:
+                del mapping[key]
+
+    @staticmethod
+    def _path_key(path):
+        return path.replace("\\", "/").lower()
@@ -0,0 +1,329 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Batched writes of tool inputs, attributes and data.
+
+Setting ``loader.Clip``, ``loader.GlobalIn``, ``SetInput``, ``SetAttrs`` and
+``SetData`` one by one costs one IPC round trip per call. ToolWriter queues
+the writes of many tools and applies them with a single Lua snippet run
+through comp:Execute(), inside one undo block. Errors are caught per write
+inside Fusion and reported back per tool.
+"""
+
+import json
+import uuid
+
+from .bulk_query import lua_literal
+
+# first line of every generated snippet, followed by the json list of the
+# queued writes, see bulk_query.LUA_HEADER
+LUA_HEADER = "-- tk_fusion.tool_writer "
+
+# comp data key used to hand the results back to python
+RESULT_KEY_PREFIX = "tk_fusion_write_"
+
+# time value resolved to comp.CurrentTime inside Fusion, saves a round trip
+# to read it first
+CURRENT_TIME = "current"
+
+_LUA_TEMPLATE = """
+local entries = {entries}
+local result = {{failures = {{}}, names = {{}}}}
+comp:StartUndo({undo_name})
+for _, entry in ipairs(entries) do
+    local tool = nil
+    local ok, err = pcall(function()
+        if entry.add then
+            tool = comp:AddTool(entry.add[1], entry.add[2], entry.add[3])
+        else
+            tool = comp:FindTool(entry.tool)
+        end
+    end)
+    if not tool then
+        result.failures[entry.tool] = {{tostring(err or "tool not found")}}
+    else
+        local errors = {{}}
+        for _, write in ipairs(entry.writes) do
+            local kind, key, value, time = write[1], write[2], write[3], write[4]
+            if time == "{current_time}" then
+                time = comp.CurrentTime
+            end
+            local ok, err = pcall(function()
+                if kind == "property" then
+                    if time == nil then
+                        tool[key] = value
+                    else
+                        tool[key][time] = value
+                    end
+                elseif kind == "input" then
+                    if time == nil then
+                        tool:SetInput(key, value)
+                    else
+                        tool:SetInput(key, value, time)
+                    end
+                elseif kind == "attrs" then
+                    tool:SetAttrs(value)
+                elseif kind == "data" then
+                    tool:SetData(key, value)
+                end
+            end)
+            if not ok then
+                errors[#errors + 1] = kind .. " " .. tostring(key) .. ": " .. tostring(err)
+            end
+        end
+        if #errors > 0 then
+            result.failures[entry.tool] = errors
+        end
+        result.names[entry.tool] = tool:GetAttrs().TOOLS_Name
+    end
+end
+comp:EndUndo(true)
+comp:SetData("{result_key}", result)
+"""
+
+
+class ToolWriter(object):
+    """
+    Queues writes on many tools and flushes them in one round trip::
+
+        writer = ToolWriter(comp, logger, "Update loaders")
+        writer.set_property("Loader1", "Clip", path, CURRENT_TIME)
+        writer.set_attrs("Loader1", {"TOOLS_Name": "plate_v002"})
+        writer.set_data("Loader1", "sg_metadata", metadata)
+        failures = writer.flush()
+
+    Writes are applied per tool in the order they were queued. Tools are
+    referred to by name, a rename done through :meth:`set_attrs` doesn't
+    affect the writes queued after it. New tools can be created in the same
+    round trip with :meth:`add_tool`.
+
+    After a flush, :attr:`failures` holds the error messages per tool name
+    and :attr:`names` the final name of every tool written to, which is how
+    the names of tools created or renamed by the flush are found.
+    """
+
+    CURRENT_TIME = CURRENT_TIME
+
+    def __init__(self, comp, logger=None, undo_name="ShotGrid"):
+        """
+        :param comp: Composition the tools belong to.
+        :param logger: Optional logger.
+        :param str undo_name: Name of the undo block shown in Fusion.
+        """
+        self.comp = comp
+        self.logger = logger
+        self.undo_name = undo_name
+
+        self.failures = {}
+        self.names = {}
+
+        self._entries = {}
+        self._new_tools = 0
+
+    def __len__(self):
+        """
+        Amount of queued writes.
+        """
+        return sum(len(entry["writes"]) for entry in self._entries.values())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        # don't apply half of the writes if the caller failed
+        if exc_type is None:
+            self.flush()
+        else:
+            self.clear()
+
+    def add_tool(self, tool_type, x=None, y=None):
+        """
+        Queues the creation of a tool.
+
+        :param str tool_type: Tool type, ie. "Loader".
+        :param x: Flow view x position.
+        :param y: Flow view y position.
+        :returns: Key to queue writes on the new tool with. The name Fusion
+            gives to the tool is found in :attr:`names` after the flush.
+        """
+        self._new_tools += 1
+        key = "%s%s_%s" % (RESULT_KEY_PREFIX, tool_type, self._new_tools)
+        self._entry(key)["add"] = [tool_type, x, y]
+        return key
+
+    def set_property(self, tool_name, name, value, time=None):
+        """
+        Queues ``tool.<name> = value``, or ``tool.<name>[time] = value``.
+
+        :param time: Frame to set the value at, :data:`CURRENT_TIME` or None.
+        """
+        self._queue(tool_name, "property", name, value, time)
+
+    def set_input(self, tool_name, name, value, time=None):
+        """
+        Queues ``tool.SetInput(name, value[, time])``.
+        """
+        self._queue(tool_name, "input", name, value, time)
+
+    def set_attrs(self, tool_name, attrs):
+        """
+        Queues ``tool.SetAttrs(attrs)``.
+        """
+        self._queue(tool_name, "attrs", None, dict(attrs))
+
+    def set_data(self, tool_name, key, value):
+        """
+        Queues ``tool.SetData(key, value)``.
+        """
+        self._queue(tool_name, "data", key, value)
+
+    def clear(self):
+        """
+        Drops the queued writes.
+        """
+        self._entries = {}
+
+    def flush(self):
+        """
+        Applies the queued writes. When applying them raises, ie. a value
+        that can't be sent to Fusion, the writes stay queued so the caller
+        can fix them and flush again, or :meth:`clear` them.
+
+        :returns: Dictionary of error messages lists, keyed by tool name. Empty
+            when all the writes succeeded.
+        """
+        entries = list(self._entries.values())
+        self.failures = {}
+        self.names = {}
+        if not entries:
+            return self.failures
+
+        result_key = RESULT_KEY_PREFIX + uuid.uuid4().hex
+        script = self.build_script(entries, result_key)
+        raw = None
+        try:
+            self.comp.Execute(script)
+            raw = self.comp.GetData(result_key)
+        finally:
+            # remove the temporary data so it isn't saved with the comp
+            self.comp.SetData(result_key)
+
+        if raw is None:
+            # scripting failed on the Fusion side, fall back to the slow path
+            raw = apply_per_call(self.comp, entries, self.undo_name)
+        self._entries = {}
+
+        self.failures = dict(
+            (name, _lua_list(errors))
+            for name, errors in (raw.get("failures") or {}).items()
+        )
+        self.names = dict(raw.get("names") or {})
+
+        if self.logger:
+            self.logger.debug(
+                "Tool writer flushed %s writes on %s tools, %s failed",
+                sum(len(entry["writes"]) for entry in entries),
+                len(entries),
+                len(self.failures),
+            )
+            for name, errors in self.failures.items():
+                self.logger.error(
+                    "Failed to update tool %s: %s" % (name, "; ".join(errors))
+                )
+        return self.failures
+
+    def build_script(self, entries, result_key):
+        """
+        Returns the Lua snippet applying the given entries.
+        """
+        script = _LUA_TEMPLATE.format(
+            entries=lua_literal(entries),
+            undo_name=lua_literal(self.undo_name),
+            current_time=CURRENT_TIME,
+            result_key=result_key,
+        )
+        return LUA_HEADER + json.dumps(entries, default=repr) + "\n" + script
+
+    def _entry(self, tool_name):
+        entry = self._entries.get(tool_name)
+        if entry is None:
+            entry = self._entries[tool_name] = {"tool": tool_name, "writes": []}
+        return entry
+
+    def _queue(self, tool_name, kind, key, value, time=None):
+        self._entry(tool_name)["writes"].append([kind, key, value, time])
+
+
+def apply_per_call(comp, entries, undo_name="ShotGrid"):
+    """
+    Applies queued writes with one call per write. Used as fallback and as
+    reference when benchmarking.
+
+    :returns: Dictionary with the "failures" and "names" keys, as returned
+        by the Lua snippet.
+    """
+    result = {"failures": {}, "names": {}}
+    comp.StartUndo(undo_name)
+    try:
+        for entry in entries:
+            name = entry["tool"]
+            try:
+                if entry.get("add"):
+                    tool = comp.AddTool(*entry["add"])
+                else:
+                    tool = comp.FindTool(name)
+            except Exception as e:
+                result["failures"][name] = [str(e)]
+                continue
+            if not tool:
+                result["failures"][name] = ["tool not found"]
+                continue
+
+            errors = []
+            current_time = None
+            for kind, key, value, time in entry["writes"]:
+                if time == CURRENT_TIME:
+                    if current_time is None:
+                        current_time = comp.CurrentTime
+                    time = current_time
+                try:
+                    if kind == "property":
+                        if time is None:
+                            setattr(tool, key, value)
+                        else:
+                            getattr(tool, key)[time] = value
+                    elif kind == "input":
+                        if time is None:
+                            tool.SetInput(key, value)
+                        else:
+                            tool.SetInput(key, value, time)
+                    elif kind == "attrs":
+                        tool.SetAttrs(value)
+                    elif kind == "data":
+                        tool.SetData(key, value)
+                except Exception as e:
+                    errors.append("%s %s: %s" % (kind, key, e))
+            if errors:
+                result["failures"][name] = errors
+            result["names"][name] = tool.GetAttrs("TOOLS_Name")
+    finally:
+        comp.EndUndo(True)
+    return result
+
+
+def _lua_list(value):
+    """
+    Lua arrays come back as dictionaries keyed by 1.0, 2.0..., returns them
+    as python lists.
+    """
+    if isinstance(value, dict):
+        return [value[key] for key in sorted(value)]
+    return list(value or [])
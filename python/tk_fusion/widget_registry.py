@@ -0,0 +1,241 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import sys
+import time
+import functools
+import collections
+
+from sgtk.platform.qt import QtGui
+
+
+def current_rss(peak=True):
+    """
+    Returns the resident memory of the process in bytes, or None when it
+    can't be read. On macOS this is the peak resident memory.
+
+    :param bool peak: Whether the peak memory is returned when it's the only
+        one known, None is returned otherwise.
+    """
+    try:
+        if sys.platform.startswith("linux"):
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+
+            class ProcessMemoryCounters(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            counters = ProcessMemoryCounters()
+            counters.cb = ctypes.sizeof(counters)
+            process = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(
+                process, ctypes.byref(counters), counters.cb
+            ):
+                return counters.WorkingSetSize
+            return None
+
+        if not peak:
+            return None
+        import resource
+
+        # bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except Exception:
+        return None
+
+
+class WidgetRegistry(object):
+    """
+    Owner of the Qt objects created by the engine, so they are deleted when
+    they are not needed anymore instead of piling up over a session of
+    several days.
+
+    Objects are registered with a scope:
+
+    - "context": torn down on every context change,
+    - "engine": torn down when the engine is destroyed.
+
+    Registered objects are kept alive by the registry until they are torn
+    down or deleted, ie. by ``WA_DeleteOnClose``.
+    """
+
+    SCOPES = ("context", "engine")
+
+    def __init__(self, logger=None):
+        self.logger = logger
+        self.stats = collections.Counter()
+        # scope: {id: (object, name)}
+        self._objects = dict((scope, {}) for scope in self.SCOPES)
+        self._start_rss = current_rss()
+        self._last_rss = self._start_rss
+        self._start_time = time.time()
+
+    def register(self, obj, scope="engine", name=None):
+        """
+        Registers a QObject.
+
+        :param obj: The QObject, usually a widget.
+        :param str scope: "context" or "engine".
+        :param str name: Name used in the report, defaults to the class name.
+        :returns: The object.
+        """
+        if scope not in self._objects:
+            raise ValueError("Unknown widget scope '%s'" % scope)
+        key = id(obj)
+        self._objects[scope][key] = (obj, name or type(obj).__name__)
+        obj.destroyed.connect(functools.partial(self._forget, scope, key))
+        self.stats["registered"] += 1
+        return obj
+
+    def _forget(self, scope, key, *args):
+        if self._objects[scope].pop(key, None) is not None:
+            self.stats["destroyed"] += 1
+
+    def release(self, obj, scope="engine"):
+        """
+        Unregisters an object that was closed and deletes it, ie. a dialog
+        once finished.
+
+        :returns: True if the object was registered.
+        """
+        if self._objects[scope].pop(id(obj), None) is None:
+            return False
+        try:
+            obj.deleteLater()
+        except RuntimeError:
+            # the Qt object was deleted already
+            pass
+        self.stats["released"] += 1
+        return True
+
+    def objects(self, scope=None):
+        """
+        Returns the registered objects of a scope, or of all the scopes.
+        """
+        scopes = [scope] if scope else self.SCOPES
+        return [obj for s in scopes for obj, _ in self._objects[s].values()]
+
+    def teardown(self, scope):
+        """
+        Closes and deletes the objects of a scope.
+
+        :returns: Amount of objects deleted.
+        """
+        objects = list(self._objects[scope].values())
+        self._objects[scope] = {}
+        for obj, name in objects:
+            try:
+                if obj.isWidgetType():
+                    obj.close()
+                obj.deleteLater()
+            except RuntimeError:
+                # the Qt object was deleted already
+                pass
+        self.stats["torn_down"] += len(objects)
+        if objects and self.logger is not None:
+            self.logger.debug(
+                "Deleted %s %s scope Qt objects: %s",
+                len(objects),
+                scope,
+                ", ".join(name for _, name in objects),
+            )
+        return len(objects)
+
+    def prune_dialogs(self, dialogs):
+        """
+        Removes the dialogs that were closed from a list, ie. the engine
+        ``created_qt_dialogs``, and deletes them. The open ones are kept.
+
+        :returns: Amount of dialogs removed.
+        """
+        closed = []
+        for dialog in list(dialogs):
+            try:
+                if dialog.isVisible():
+                    continue
+                dialog.deleteLater()
+            except RuntimeError:
+                # deleted already, only the python wrapper is left
+                pass
+            closed.append(dialog)
+        for dialog in closed:
+            dialogs.remove(dialog)
+        self.stats["pruned_dialogs"] += len(closed)
+        return len(closed)
+
+    def report(self, dialogs=None):
+        """
+        Returns the live widget counts and the resident memory, as text.
+
+        :param list dialogs: The engine ``created_qt_dialogs``.
+        """
+        app = QtGui.QApplication.instance()
+        widgets = app.allWidgets() if app is not None else []
+        by_class = collections.Counter(type(widget).__name__ for widget in widgets)
+        top_level = app.topLevelWidgets() if app is not None else []
+
+        rss = current_rss()
+        lines = ["Qt widgets: %s, %s top level" % (len(widgets), len(top_level))]
+        if rss is not None:
+            mb = 1024.0 * 1024.0
+            lines.append(
+                "Resident memory: %.1fMB, %+.1fMB since the engine started %s "
+                "ago, %+.1fMB since the last report"
+                % (
+                    rss / mb,
+                    (rss - (self._start_rss or rss)) / mb,
+                    _duration(time.time() - self._start_time),
+                    (rss - (self._last_rss or rss)) / mb,
+                )
+            )
+            self._last_rss = rss
+        for scope in self.SCOPES:
+            names = collections.Counter(name for _, name in self._objects[scope].values())
+            lines.append(
+                "Engine %s objects: %s %s"
+                % (
+                    scope,
+                    sum(names.values()),
+                    ", ".join("%s x%s" % item for item in names.most_common()),
+                )
+            )
+        if dialogs is not None:
+            lines.append("Toolkit dialogs: %s" % len(dialogs))
+        lines.append(
+            "Registered %(registered)s, destroyed %(destroyed)s, torn down "
+            "%(torn_down)s, closed dialogs pruned %(pruned_dialogs)s"
+            % self.stats
+        )
+        lines.append("")
+        lines.append("Widgets by class:")
+        for name, count in by_class.most_common(20):
+            lines.append("  %-40s %6d" % (name, count))
+        return "\n".join(lines)
+
+
+def _duration(seconds):
+    hours, seconds = divmod(int(seconds), 3600)
+    return "%sh%02dm" % (hours, seconds // 60)
@@ -10,6 +10,10 @@
 
 import os
 import sys
+import json
+import time
+import uuid
+import tempfile
 
 import sgtk
 from sgtk.util.filesystem  import copy_folder
@@ -110,14 +114,92 @@ class FusionLauncher(SoftwareLauncher):
         self.logger.debug("Preparing Fusion Launch via Toolkit Classic methodology ...")
         required_env["SGTK_ENGINE"] = self.engine_name
         required_env["SGTK_CONTEXT"] = sgtk.context.serialize(self.context)
+        # identifies this Fusion instance for the single instance lock of the
+        # Shotgrid.py startup script
+        required_env["TK_FUSION_INSTANCE"] = uuid.uuid4().hex
+        # open span closed by the Shotgrid.py startup script, see
+        # tk_fusion.startup_trace
+        required_env["TK_FUSION_STARTUP_TRACE"] = json.dumps(
+            [["launch", time.time(), None]]
+        )
 
         if file_to_open:
             # Add the file name to open to the launch environment
             required_env["SGTK_FILE_TO_OPEN"] = file_to_open
 
+        bundle_path = self._write_bootstrap_bundle(
+            required_env["TK_FUSION_INSTANCE"],
+            required_env["SGTK_CONTEXT"],
+            file_to_open,
+        )
+        if bundle_path:
+            required_env["TK_FUSION_BOOTSTRAP"] = bundle_path
+
         args = ""
         return LaunchInformation(exec_path, args, required_env)
 
+    def _write_bootstrap_bundle(self, instance, serialized_context, file_to_open):
+        """
+        Writes what the Shotgrid.py startup script needs to start the engine,
+        so it doesn't have to resolve the pipeline configuration and the
+        context from the comp path again, which may query Shotgrid.
+
+        The bundle holds the serialized context and the modification times
+        and sizes of the configuration files. Shotgrid.py only trusts
+        it when the comp opened is the one given here and none of those files
+        changed since.
+
+        :param str instance: Id of the launched Fusion instance.
+        :param str serialized_context: The launch context, serialized.
+        :param str file_to_open: Comp opened on launch, if any.
+        :returns: Path of the bundle or None.
+        """
+        try:
+            config_root = self.sgtk.pipeline_configuration.get_path()
+            config_files = {}
+            for folder in ("core", "env"):
+                top = os.path.join(config_root, "config", folder)
+                for root, dirs, files in os.walk(top):
+                    # folder times change when files are added or removed
+                    for path in [root] + [
+                        os.path.join(root, name)
+                        for name in files
+                        if name.endswith(".yml")
+                    ]:
+                        stat = os.stat(path)
+                        config_files[path] = [stat.st_mtime, stat.st_size]
+
+            bundle = {
+                "version": 1,
+                "created": time.time(),
+                "context": serialized_context,
+                "engine": self.engine_name,
+                "file_to_open": file_to_open or "",
+                "config_files": config_files,
+            }
+
+            folder = os.path.join(tempfile.gettempdir(), "tk-fusion")
+            if not os.path.isdir(folder):
+                os.makedirs(folder)
+            # bundles are only read on launch, remove the ones of old launches
+            for name in os.listdir(folder):
+                old_path = os.path.join(folder, name)
+                if (
+                    name.startswith("bootstrap_")
+                    and time.time() - os.path.getmtime(old_path) > 7 * 24 * 3600
+                ):
+                    os.remove(old_path)
+
+            path = os.path.join(folder, "bootstrap_{}.json".format(instance))
+            with open(path, "w") as f:
+                json.dump(bundle, f, default=str)
+        except Exception as e:
+            self.logger.warning("Couldn't write the bootstrap bundle: %s", e)
+            return None
+
+        self.logger.debug("Wrote bootstrap bundle %s", path)
+        return path
+
     def _icon_from_engine(self):
         """
         Use the default engine icon as fusion does not supply
@@ -1,110 +1,290 @@
+import time
+
+script_start = time.time()
+
 import os
+import json
 import sgtk
 import sys
 import BlackmagicFusion as bmd
-import time
 import pprint
-import random
+import tempfile
 import importlib
 import traceback
-from datetime import datetime
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
 
 pp = pprint.pprint
 pf = pprint.pformat
 
+# startup spans handed over to the engine tracer, see tk_fusion.startup_trace
+TRACE_ENV = "TK_FUSION_STARTUP_TRACE"
+
+
+def trace(name, start, end=None):
+    """
+    Adds a startup span, closing the ones still open such as the launch.
+    """
+    end = end or time.time()
+    try:
+        spans = json.loads(os.environ.get(TRACE_ENV) or "[]")
+    except ValueError:
+        spans = []
+    for span in spans:
+        if span[2] is None:
+            span[2] = start
+    spans.append([name, start, end])
+    os.environ[TRACE_ENV] = json.dumps(spans)
+
+
+trace("Shotgrid.py imports", script_start)
 
-# lock file to avoid run engine creation twice!!
-# Fusion issues...
-lockfile = os.path.join(os.environ["APPDATA"], "Mighty", "FusionEngine", "Lock")
-container = os.path.dirname(lockfile)
-mighty_folder = os.path.dirname(container)
+
+# Fusion may run this script more than once at startup, the engine must only
+# be started once per Fusion instance. The lock is held by the OS for as long
+# as this process lives, so it is released even if the process crashes, and
+# the file records the pid of its owner.
+LOCK_OFFSET = 1024
+ENGINE_DATA_KEY = "tk_fusion.engine"
+instance = os.environ.get("TK_FUSION_INSTANCE", "default")
+container = os.path.join(
+    os.environ.get("APPDATA") or tempfile.gettempdir(), "Mighty", "FusionEngine"
+)
+lockfile = os.path.join(container, "Lock_{}".format(instance))
 
 # Check if folder exists
 if not os.path.exists(container):
     os.makedirs(container, exist_ok=True)
 
-# Validate old lock files
-if os.path.exists(lockfile):
-    print("Old lock file found")
-    created_time = time.ctime(os.path.getctime(lockfile))
-    created_time2 = datetime.strptime(created_time, "%a %b %d %H:%M:%S %Y")
-    current_time = datetime.now()
-    time_difference = current_time - created_time2
-    dif_seconds = time_difference.total_seconds()
-    # If the lock file is older than 12 seconds,
-    # then we will erase it
-    if dif_seconds > 12:
-        # delete file
+
+def pid_alive(pid):
+    """
+    Returns whether a process with the given pid is running.
+    """
+    if pid <= 0:
+        return False
+    if sys.platform == "win32":
+        # os.kill would terminate the process on Windows
+        import ctypes
+
+        kernel32 = ctypes.windll.kernel32
+        # PROCESS_QUERY_LIMITED_INFORMATION
+        handle = kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            # access denied means the process exists
+            return kernel32.GetLastError() == 5
+        code = ctypes.c_ulong()
         try:
-            os.remove(lockfile)
-        except:
-            print(
-                "Old lock file can not be removed, delete manually\n{}".format(lockfile)
-            )
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)):
+                return True
+        finally:
+            kernel32.CloseHandle(handle)
+        # STILL_ACTIVE
+        return code.value == 259
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
 
-# Getting time to create the lock file
-time.sleep(random.uniform(0.0, 2.0))
-if not os.path.exists(lockfile):
-    print("Creating new lock file")
-    with open(lockfile, "w"):
+
+def acquire_lock(path, timeout=2.0):
+    """
+    Takes the single instance lock without blocking.
+
+    When the lock is busy but its recorded owner is gone, ie. an engine that
+    is shutting down while a new one starts, retries until the timeout.
+
+    :returns: Tuple of the locked file object or None, and the owner pid.
+        The pid is 0 when the lock file can't be opened, ie. a read-only
+        folder, the engine is then started without the lock.
+    """
+    deadline = time.time() + timeout
+    while True:
+        try:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT)
+            f = os.fdopen(fd, "r+")
+        except OSError as e:
+            print("Warning: could not open the startup lock {}: {}".format(path, e))
+            return None, 0
+        try:
+            if sys.platform == "win32":
+                # lock a byte past the pid, locked bytes can't be read
+                f.seek(LOCK_OFFSET)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.seek(0)
+            owner = f.read().strip()
+            f.close()
+            # -1 when the owner didn't write its pid yet
+            owner = int(owner) if owner.isdigit() else -1
+            if pid_alive(owner) or time.time() > deadline:
+                return None, owner
+            time.sleep(0.1)
+            continue
+
+        f.seek(0)
+        previous = f.read().strip()
+        if previous.isdigit() and int(previous) != os.getpid():
+            print("Taking over the lock of exited process {}".format(previous))
+        f.seek(0)
+        f.truncate()
+        f.write(str(os.getpid()))
+        f.flush()
+        return f, os.getpid()
+
+
+def release_lock(f):
+    """
+    Releases the lock and removes its file, there is one per launch.
+    """
+    path = f.name
+    try:
+        if sys.platform == "win32":
+            f.seek(LOCK_OFFSET)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        f.seek(0)
+        f.truncate()
+    finally:
+        f.close()
+    try:
+        os.remove(path)
+    except OSError:
+        # taken again meanwhile, or removed already
         pass
 
-    fusion = bmd.scriptapp("Fusion")
-    comp = fusion.GetCurrentComp()
-    if comp is None:
-        importlib.reload(bmd)
+
+def load_bootstrap_bundle(comp_path):
+    """
+    Returns the bootstrap bundle written by the launcher, see
+    FusionLauncher._write_bootstrap_bundle in startup.py, or None when there
+    isn't any, it's for another comp or the configuration changed since.
+    """
+    bundle_path = os.environ.get("TK_FUSION_BOOTSTRAP")
+    if not bundle_path or not os.path.exists(bundle_path):
+        return None
+    try:
+        with open(bundle_path) as f:
+            bundle = json.load(f)
+    except ValueError as e:
+        print("Invalid bootstrap bundle {}: {}".format(bundle_path, e))
+        return None
+
+    def normalize(path):
+        return os.path.normcase(os.path.normpath(path)) if path else ""
+
+    # an unsaved comp has no path to resolve a context from, the launch
+    # context is used for it anyway
+    if comp_path and normalize(bundle.get("file_to_open")) != normalize(comp_path):
+        print("Bootstrap bundle is for another comp, ignoring it")
+        return None
+    for path, (mtime, size) in bundle.get("config_files", {}).items():
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stat = None
+        if stat is None or stat.st_mtime != mtime or stat.st_size != size:
+            print("Configuration changed since launch: {}".format(path))
+            return None
+    return bundle
+
+
+lock_start = time.time()
+lock, owner = acquire_lock(lockfile)
+trace("startup lock", lock_start)
+if lock is None and owner:
+    print(
+        "The Shotgrid engine is already running for this Fusion "
+        "(pid {}), not starting it again.".format(owner if owner > 0 else "unknown")
+    )
+else:
+    if lock is None:
+        print("Starting without the startup lock")
+    else:
+        print("Acquired startup lock {}".format(lockfile))
+    fusion = None
+    try:
+        scriptapp_start = time.time()
         fusion = bmd.scriptapp("Fusion")
         comp = fusion.GetCurrentComp()
+        if comp is None:
+            importlib.reload(bmd)
+            fusion = bmd.scriptapp("Fusion")
+            comp = fusion.GetCurrentComp()
 
-    print("fusion: {}".format(fusion))
-    print("comp: {}".format(comp))
+        trace("scriptapp", scriptapp_start)
+        # tells sg_startup.scriptlib the engine is running, see there
+        fusion.SetData(ENGINE_DATA_KEY, "{}:{}".format(instance, os.getpid()))
+        print("fusion: {}".format(fusion))
+        print("comp: {}".format(comp))
 
-    print("Launching toolkit in classic mode.")
+        print("Launching toolkit in classic mode.")
 
-    env_engine = os.environ.get("SGTK_ENGINE")
-    env_context = os.environ.get("SGTK_CONTEXT")
-    context = sgtk.context.deserialize(env_context)
+        env_engine = os.environ.get("SGTK_ENGINE")
+        env_context = os.environ.get("SGTK_CONTEXT")
 
-    # if comp is not None:
-    try:
-        path = comp.GetAttrs()["COMPS_FileName"]
+        path = comp.GetAttrs()["COMPS_FileName"] if comp is not None else ""
         print("comp path: {}".format(path))
-        tk = sgtk.sgtk_from_path(path)
-        print("tk from path: {}".format(tk))
-        context = tk.context_from_path(path)
-        print("context from path: {}".format(context))
-    except Exception as e:
-        # print(traceback.format_exc())
-        # pass
-        msg = (
-            "Couldn't get context from path: {}, error: {}, "
-            "full traceback:\n{}"
-        ).format(path, e, traceback.format_exc())
-        print("Couldn't get context from path: {}".format(path))
-
-    print("Initializing Fusion engine")
-    # try:
-    engine = sgtk.platform.start_engine(env_engine, context.sgtk, context)
-    if os.path.exists(lockfile):
-        os.remove(lockfile)
-
-    engine.logger.info("Before calling _qt_app.exec()")
+        bundle = load_bootstrap_bundle(path)
+        if bundle is not None:
+            # the launcher resolved the context already, no Shotgrid round trip
+            context = sgtk.context.deserialize(bundle["context"])
+            print("context from bootstrap bundle: {}".format(context))
+        else:
+            context = sgtk.context.deserialize(env_context)
+            try:
+                span_start = time.time()
+                tk = sgtk.sgtk_from_path(path)
+                trace("sgtk_from_path", span_start)
+                print("tk from path: {}".format(tk))
+                span_start = time.time()
+                context = tk.context_from_path(path)
+                trace("context_from_path", span_start)
+                print("context from path: {}".format(context))
+            except Exception as e:
+                # print(traceback.format_exc())
+                # pass
+                msg = (
+                    "Couldn't get context from path: {}, error: {}, "
+                    "full traceback:\n{}"
+                ).format(path, e, traceback.format_exc())
+                print("Couldn't get context from path: {}".format(path))
 
-    try:
-        engine._qt_app.exec()
-        engine.logger.info("After calling _qt_app.exec()")
-    except Exception as e:
-        msg = "Error starting engine: {}, full traceback:\n{}".format(
-            e, traceback.format_exc()
-        )
-        print(msg)
-        engine.logger.error(msg)
-        raise Exception(msg)
-    # except Exception as e:
-    #     if os.path.exists(lockfile):
-    #         os.remove(lockfile)
-    #     engine.logger.error(
-    #         "Error starting engine: {},\nfull traceback:\n{}".format(
-    #             e, traceback.format_exc()
-    #         )
-    #     )
+        print("Initializing Fusion engine")
+        # try:
+        span_start = time.time()
+        engine = sgtk.platform.start_engine(env_engine, context.sgtk, context)
+
+        tracer = getattr(engine, "startup_tracer", None)
+        if tracer is not None:
+            tracer.add_span("start_engine", span_start, time.time(), "bootstrap")
+            engine.write_startup_trace()
+
+        engine.logger.info("Before calling _qt_app.exec()")
+        try:
+            engine._qt_app.exec()
+            engine.logger.info("After calling _qt_app.exec()")
+        except Exception as e:
+            msg = "Error starting engine: {}, full traceback:\n{}".format(
+                e, traceback.format_exc()
+            )
+            print(msg)
+            engine.logger.error(msg)
+            raise Exception(msg)
+    finally:
+        # whatever failed, the marker and the lock must not outlive the
+        # engine or it couldn't be started again in this Fusion
+        if fusion is not None:
+            try:
+                fusion.SetData(ENGINE_DATA_KEY)
+            except Exception:
+                pass
+        if lock is not None:
+            release_lock(lock)